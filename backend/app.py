@@ -1,15 +1,27 @@
-from flask import Flask, jsonify, request
+from dotenv import load_dotenv
+
+# Load environment variables from .env first: configuration and several services read them at import time
+load_dotenv()
+
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
+from flask_migrate import Migrate
 from models import db, User, StudioClass, SlidingScaleOption, Payment, ClassInstance, ClassEnrollment, Announcement, BulletinBoard
 from datetime import datetime, timedelta
 import os
-from dotenv import load_dotenv
 import stripe
 
 # Import services
 from services.user_service import UserService
 from services.class_service import ClassService
 from services.payment_service import PaymentService
+from services.webhook_queue_service import WebhookQueueService
+from services.announcement_service import AnnouncementService
+from services.events import announcement_changed
+from services.event_stream import broadcaster, relay, TooManySubscribersError
+from services.stripe_gateway import StripeUnavailableError
+from services.sqlite_tuning import apply_sqlite_pragmas
+from services.database_config import database_uri, engine_options
 
 # Import controllers
 from controllers.user_controller import UserController
@@ -18,23 +30,26 @@ from controllers.payment_controller import PaymentController
 from controllers.membership_controller import MembershipController
 from controllers.attendance_controller import AttendanceController
 from controllers.credit_controller import CreditController
+from controllers.report_controller import ReportController
 
 # Import DTOs
 from dtos.user_dto import UserDTO
 from dtos.class_dto import StudioClassDTO, ClassInstanceDTO
 
 app = Flask(__name__)
-# Use absolute path to database
-db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'db.sqlite3')
-app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+# SQLite file in backend/instance unless DATABASE_URL points elsewhere (e.g. postgresql://...)
+app.config['SQLALCHEMY_DATABASE_URI'] = database_uri()
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev')
 
 db.init_app(app)
+migrate = Migrate(app, db)
 CORS(app)
 
-# Load environment variables from .env
-load_dotenv()
+# WAL and cache PRAGMAs on every SQLite connection (SQLITE_PROFILE=default keeps driver defaults)
+with app.app_context():
+    apply_sqlite_pragmas(db.engine)
 
 stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
 STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET")
@@ -46,6 +61,9 @@ payment_controller = PaymentController()
 membership_controller = MembershipController()
 attendance_controller = AttendanceController()
 credit_controller = CreditController()
+report_controller = ReportController()
+webhook_queue_service = WebhookQueueService()
+announcement_service = AnnouncementService()
 
 @app.route('/api/ping')
 def ping():
@@ -68,6 +86,14 @@ def get_all_users():
 def search_instructors():
     return user_controller.search_instructors()
 
+@app.route('/api/users/search', methods=['GET'])
+def search_users():
+    return user_controller.search_users()
+
+@app.route('/api/users/import', methods=['POST'])
+def import_users():
+    return user_controller.import_users()
+
 # Class routes using ClassController
 @app.route('/api/studio-classes/create', methods=['POST'])
 def create_studio_class():
@@ -93,6 +119,10 @@ def book_studio_class_for_staff():
 def check_booking_eligibility():
     return class_controller.check_booking_eligibility()
 
+@app.route('/api/studio-classes/check-eligibility-batch', methods=['POST'])
+def check_booking_eligibility_batch():
+    return class_controller.check_booking_eligibility_batch()
+
 @app.route('/api/students/enrolled-classes')
 def get_student_enrolled_classes():
     return class_controller.get_student_enrolled_classes()
@@ -169,6 +199,10 @@ def debug_assigned_classes():
 def mark_attendance():
     return attendance_controller.mark_attendance()
 
+@app.route('/api/attendance/mark-bulk', methods=['POST'])
+def mark_bulk_attendance():
+    return attendance_controller.mark_bulk_attendance()
+
 @app.route('/api/attendance/roster/<instance_id>', methods=['GET'])
 def get_class_roster(instance_id):
     return attendance_controller.get_class_roster(instance_id)
@@ -252,6 +286,16 @@ def create_checkout_session():
         option, amount = PaymentService.validate_payment_option(option_id, custom_amount)
         print(f"[create-checkout-session] ✅ Payment option validated - tier: {option.tier_name}, amount: {amount}")
         
+        # Reuse the student's still-open checkout for the same class and option
+        open_payment = PaymentService.find_open_checkout(student.id, option_id, amount, instance_id)
+        if open_payment:
+            print(f"[create-checkout-session] ♻️ Reusing open Stripe session for payment_id: {open_payment.id}")
+            return jsonify({
+                "success": True,
+                "session_id": open_payment.stripe_session_id,
+                "url": open_payment.checkout_url
+            })
+        
         # Create payment record
         payment = PaymentService.create_payment(
             student.id, 
@@ -282,6 +326,9 @@ def create_checkout_session():
     except ValueError as e:
         print(f"[create-checkout-session] ❌ ValueError: {e}")
         return jsonify({"success": False, "error": str(e)}), 400
+    except StripeUnavailableError as e:
+        print(f"[create-checkout-session] ❌ Stripe unavailable: {e}")
+        return jsonify({"success": False, "error": "Payment provider is temporarily unavailable, please try again"}), 503
     except Exception as e:
         print(f"[create-checkout-session] ❌ Exception: {e}")
         import traceback
@@ -319,6 +366,9 @@ def verify_payment():
             print(f"[verify-payment endpoint] ❌ Payment not found or not completed")
             return jsonify({"success": False, "error": "Payment not found or not completed"}), 404
             
+    except StripeUnavailableError as e:
+        print(f"[verify-payment endpoint] ❌ Stripe unavailable: {e}")
+        return jsonify({"success": False, "error": "Payment provider is temporarily unavailable, please try again"}), 503
     except Exception as e:
         print(f"[verify-payment endpoint] ❌ Exception: {e}")
         import traceback
@@ -342,21 +392,16 @@ def stripe_webhook():
         print(f"❌ Webhook signature verification failed: {e}")
         return jsonify({"error": "Invalid signature"}), 400
 
-    # Handle the event
+    # Queue the event and acknowledge right away; webhook_worker.py applies it
     try:
-        print("[webhook] Event data:", event)
-        if event['type'] == 'checkout.session.completed':
-            session = event['data']['object']
-            print("[webhook] Stripe session completed. Session data:", session)
-            print("[webhook] Metadata received:", session.get('metadata'))
-        success = PaymentService.handle_webhook_event(event)
-        if success:
-            print("✅ Payment processed successfully!")
+        is_new = webhook_queue_service.enqueue(event['id'], event['type'], payload.decode('utf-8'))
+        if is_new:
+            print(f"📥 Queued Stripe event {event['id']}")
         else:
-            print(f"ℹ️ Received event type: {event['type']}")
+            print(f"ℹ️ Stripe event {event['id']} already queued")
     except Exception as e:
-        print(f"❌ Error processing event: {e}")
-        return jsonify({"error": "Invalid event payload"}), 400
+        print(f"❌ Error queueing event: {e}")
+        return jsonify({"error": "Could not store event"}), 500
 
     return jsonify({"success": True}), 200
 
@@ -365,31 +410,26 @@ def stripe_webhook():
 def get_announcements():
     try:
         board_types = request.args.get('board_types', 'student').split(',')
-        all_announcements = []
-        
-        for board_type in board_types:
-            bulletin_board = BulletinBoard.query.filter_by(board_type=board_type.strip()).first()
-            
-            if bulletin_board:
-                announcements = bulletin_board.get_announcements()
-                for announcement in announcements:
-                    all_announcements.append({
-                        "id": announcement.id,
-                        "title": announcement.title,
-                        "body": announcement.body,
-                        "date_created": announcement.date_created.isoformat(),
-                        "author_name": announcement.author.name if announcement.author else 'Unknown',
-                        "author_role": announcement.author.role if announcement.author else 'Unknown',
-                        "board_type": board_type.strip()
-                    })
-        
-        # Sort by date created (newest first)
-        all_announcements.sort(key=lambda x: x['date_created'], reverse=True)
+        cursor = request.args.get('cursor')
+        try:
+            if 'limit' in request.args:
+                limit = int(request.args['limit'])
+            elif cursor:
+                limit = AnnouncementService.DEFAULT_PAGE_SIZE
+            else:
+                limit = None  # No paging asked for: the whole feed, as the dashboards expect
+        except ValueError:
+            return jsonify({"success": False, "error": "limit must be an integer"}), 400
+        
+        feed = announcement_service.get_feed(board_types, limit, cursor)
         
         return jsonify({
             "success": True,
-            "announcements": all_announcements
+            "announcements": feed["announcements"],
+            "next_cursor": feed["next_cursor"]
         })
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -424,6 +464,7 @@ def create_announcement():
         )
         db.session.add(announcement)
         db.session.commit()
+        announcement_changed.send(None, change='created', announcement_id=announcement.id, board_type=board_type)
         
         return jsonify({
             "success": True,
@@ -448,8 +489,10 @@ def delete_announcement(announcement_id):
         if not announcement:
             return jsonify({"success": False, "error": "Announcement not found"}), 404
         
+        board_type = announcement.bulletin_board.board_type
         db.session.delete(announcement)
         db.session.commit()
+        announcement_changed.send(None, change='deleted', announcement_id=announcement_id, board_type=board_type)
         
         return jsonify({
             "success": True,
@@ -460,6 +503,38 @@ def delete_announcement(announcement_id):
         db.session.rollback()
         return jsonify({"success": False, "error": str(e)}), 500
 
+# Server-Sent Events: dashboards refetch when the schedule, attendance, memberships or announcements change
+@app.route('/api/events')
+def stream_events():
+    clerk_user_id = request.args.get('clerk_user_id')
+    if not clerk_user_id:
+        return jsonify({"success": False, "error": "clerk_user_id is required"}), 400
+    
+    identity = user_controller.user_service.get_identity_by_clerk_id(clerk_user_id)
+    if not identity:
+        return jsonify({"success": False, "error": "User not found"}), 404
+    
+    # EventSource sends Last-Event-ID when it reconnects
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return jsonify({"success": False, "error": "Last-Event-ID must be an integer"}), 400
+    
+    # Relays events recorded by every process (requests, scheduler, webhook worker)
+    relay.start(app)
+    try:
+        subscription = broadcaster.subscribe(identity.discriminator, last_event_id)
+    except TooManySubscribersError as e:
+        return jsonify({"success": False, "error": str(e)}), 503
+    
+    heartbeat = float(os.getenv('EVENT_STREAM_HEARTBEAT', '15'))
+    return Response(
+        broadcaster.stream(subscription, heartbeat),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # Credit routes using CreditController
 @app.route('/api/credits/student', methods=['GET'])
 def get_student_credits():
@@ -473,5 +548,22 @@ def get_credit_history():
 def use_credit_for_booking():
     return credit_controller.use_credit_for_booking()
 
+# Reporting routes using ReportController
+@app.route('/api/reports/attendance', methods=['GET'])
+def get_attendance_report():
+    return report_controller.get_attendance_report()
+
+@app.route('/api/reports/revenue', methods=['GET'])
+def get_revenue_report():
+    return report_controller.get_revenue_report()
+
+@app.route('/api/admin/reconcile', methods=['POST'])
+def reconcile_payments():
+    return report_controller.reconcile_payments()
+
+@app.route('/api/exports/<dataset>', methods=['GET'])
+def export_dataset(dataset):
+    return report_controller.export_dataset(dataset)
+
 if __name__ == '__main__':
     app.run(debug=True) 
\ No newline at end of file
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Benchmark concurrent reads and booking writes against SQLite with each engine profile
+
+Builds a throwaway database per profile (see services/sqlite_tuning.py), then runs reader
+threads that load the class schedule with booking counts while writer threads book and
+cancel enrollments, and reports throughput and read latency. With the default rollback
+journal every commit locks readers out; with the tuned WAL profile they keep reading.
+
+Single runs on a busy machine vary a lot, so each profile is run --repeat times (profiles
+interleaved, so drift hits both alike) and the median and min-max spread are reported.
+
+Usage:
+    python benchmark_sqlite.py
+    python benchmark_sqlite.py --readers 8 --writers 2 --seconds 10 --repeat 7 --profiles default tuned
+"""
+
+import sys
+import os
+import argparse
+import tempfile
+import threading
+import time
+from statistics import median
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, func, insert, select, update
+from sqlalchemy.exc import OperationalError
+from models import db, User, StudioClass, ClassInstance, ClassEnrollment
+from services.sqlite_tuning import SQLITE_PROFILES, apply_sqlite_pragmas
+
+
+def create_benchmark_engine(profile, pool_size):
+    db_path = os.path.join(tempfile.mkdtemp(), f'benchmark_{profile}.sqlite3')
+    engine = create_engine(f'sqlite:///{db_path}', pool_size=pool_size, max_overflow=0)
+    apply_sqlite_pragmas(engine, SQLITE_PROFILES[profile])
+    db.metadata.create_all(engine)
+    return engine
+
+
+def seed(engine, classes, students):
+    start = datetime.utcnow() + timedelta(days=1)
+    with engine.begin() as connection:
+        connection.execute(insert(User.__table__).values(
+            clerk_user_id='bench_instructor', email='instructor@example.com', name='Instructor', role='staff'
+        ))
+        connection.execute(insert(User.__table__), [
+            {'clerk_user_id': f'bench_student_{i}', 'email': f'student{i}@example.com', 'name': f'Student {i}', 'role': 'student'}
+            for i in range(students)
+        ])
+        instructor_id = connection.execute(select(User.id).where(User.role == 'staff')).scalar_one()
+        student_ids = connection.execute(select(User.id).where(User.role == 'student')).scalars().all()
+        instance_ids = []
+        for i in range(classes):
+            class_id = connection.execute(insert(StudioClass.__table__).values(
+                class_name=f'Benchmark Class {i}', start_time=start, duration=60, instructor_id=instructor_id,
+                max_capacity=students, recurrence_pattern='one-time'
+            )).inserted_primary_key[0]
+            instance_id = f'{class_id}_bench'
+            connection.execute(insert(ClassInstance.__table__).values(
+                instance_id=instance_id, class_id=class_id, start_time=start + timedelta(hours=i),
+                end_time=start + timedelta(hours=i + 1), max_capacity=students
+            ))
+            instance_ids.append(instance_id)
+    return student_ids, instance_ids
+
+
+def schedule_query():
+    # The schedule page: upcoming instances with how many students are booked
+    booked = (
+        select(ClassEnrollment.instance_id, func.count().label('booked'))
+        .where(ClassEnrollment.status == 'enrolled')
+        .group_by(ClassEnrollment.instance_id)
+        .subquery()
+    )
+    return (
+        select(ClassInstance.instance_id, StudioClass.class_name, ClassInstance.start_time,
+               func.coalesce(booked.c.booked, 0))
+        .join(StudioClass, StudioClass.id == ClassInstance.class_id)
+        .outerjoin(booked, booked.c.instance_id == ClassInstance.instance_id)
+        .where(ClassInstance.is_cancelled == False)
+        .order_by(ClassInstance.start_time)
+    )
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def run(profile, args):
+    engine = create_benchmark_engine(profile, args.readers + args.writers)
+    student_ids, instance_ids = seed(engine, args.classes, args.students)
+    query = schedule_query()
+    stop = threading.Event()
+    results = {'reads': [], 'writes': 0, 'errors': 0}
+    lock = threading.Lock()
+
+    def reader():
+        latencies, errors = [], 0
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                with engine.connect() as connection:
+                    connection.execute(query).all()
+                latencies.append(time.perf_counter() - started)
+            except OperationalError:
+                errors += 1
+        with lock:
+            results['reads'].extend(latencies)
+            results['errors'] += errors
+
+    def writer(offset):
+        writes, errors, i = 0, 0, offset
+        while not stop.is_set():
+            student_id = student_ids[i % len(student_ids)]
+            instance_id = instance_ids[i % len(instance_ids)]
+            i += args.writers
+            try:
+                # Book, then cancel: two short transactions like the booking endpoints
+                with engine.begin() as connection:
+                    enrollment_id = connection.execute(insert(ClassEnrollment.__table__).values(
+                        student_id=student_id, instance_id=instance_id, payment_type='drop-in', status='enrolled'
+                    )).inserted_primary_key[0]
+                with engine.begin() as connection:
+                    connection.execute(update(ClassEnrollment.__table__)
+                                       .where(ClassEnrollment.id == enrollment_id)
+                                       .values(status='cancelled', cancelled_at=datetime.utcnow()))
+                writes += 2
+            except OperationalError:
+                errors += 1
+        with lock:
+            results['writes'] += writes
+            results['errors'] += errors
+
+    threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(n,)) for n in range(args.writers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+
+    reads = results['reads']
+    return {
+        'reads_per_second': len(reads) / elapsed,
+        'writes_per_second': results['writes'] / elapsed,
+        'read_p50_ms': percentile(reads, 0.5) * 1000,
+        'read_p95_ms': percentile(reads, 0.95) * 1000,
+        'errors': results['errors'],
+    }
+
+
+METRICS = (
+    ('reads_per_second', 'reads/s', '{:.0f}'),
+    ('writes_per_second', 'writes/s', '{:.0f}'),
+    ('read_p50_ms', 'read p50 ms', '{:.1f}'),
+    ('read_p95_ms', 'read p95 ms', '{:.1f}'),
+    ('errors', 'lock errors', '{:.0f}'),
+)
+
+
+def spread(values, fmt='{:.1f}'):
+    """Median with the min-max range, e.g. '812 (790-845)'"""
+    return f"{fmt.format(median(values))} ({fmt.format(min(values))}-{fmt.format(max(values))})"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare SQLite engine profiles under concurrent reads and writes")
+    parser.add_argument('--profiles', nargs='+', choices=sorted(SQLITE_PROFILES), default=['default', 'tuned'])
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--repeat', type=int, default=5, help="runs per profile; the median is reported")
+    parser.add_argument('--classes', type=int, default=50)
+    parser.add_argument('--students', type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"🧪 {args.readers} readers, {args.writers} writers, {args.repeat} x {args.seconds:.0f}s per profile")
+    runs = {profile: [] for profile in args.profiles}
+    for round_number in range(1, args.repeat + 1):
+        for profile in args.profiles:
+            runs[profile].append(run(profile, args))
+        print(f"⏱️ round {round_number}/{args.repeat} done")
+
+    for profile, results in runs.items():
+        print(f"✅ {profile:>8}: " + "  ".join(
+            f"{label} {spread([result[key] for result in results], fmt)}" for key, label, fmt in METRICS
+        ))
+
+    if 'default' in runs and 'tuned' in runs:
+        # Ratios are taken round by round, so each compares runs made under the same conditions
+        pairs = list(zip(runs['default'], runs['tuned']))
+        read_gains = [tuned['reads_per_second'] / baseline['reads_per_second']
+                      for baseline, tuned in pairs if baseline['reads_per_second']]
+        write_gains = [tuned['writes_per_second'] / baseline['writes_per_second']
+                       for baseline, tuned in pairs if baseline['writes_per_second']]
+        if read_gains and write_gains:
+            print(f"📈 tuned vs default (median, min-max): {spread(read_gains)}x reads, {spread(write_gains)}x writes")
@@ -130,6 +130,55 @@ class AttendanceController:
         except Exception as e:
             return jsonify({"success": False, "error": str(e)}), 500
     
+    def mark_bulk_attendance(self):
+        """Handle bulk mark attendance request for one class instance"""
+        try:
+            data = request.get_json()
+            if not data:
+                return jsonify({"success": False, "error": "Missing JSON body"}), 400
+            
+            instance_id = data.get('instance_id')
+            marks = data.get('marks')
+            staff_id = data.get('staff_id')
+            clerk_user_id = data.get('clerk_user_id')
+            
+            if not instance_id or not isinstance(marks, list):
+                return jsonify({"success": False, "error": "instance_id and a list of marks are required"}), 400
+            
+            if not staff_id and not clerk_user_id:
+                return jsonify({"success": False, "error": "staff_id or clerk_user_id is required"}), 400
+            
+            # Find staff member
+            from services.user_service import UserService
+            user_service = UserService()
+            
+            staff_member = None
+            if staff_id:
+                staff_member = user_service.get_user_by_id(staff_id)
+                if staff_member and staff_member.discriminator != 'staff':
+                    staff_member = None
+            elif clerk_user_id:
+                staff_member = user_service.get_user_by_clerk_id(clerk_user_id)
+                if staff_member and staff_member.discriminator != 'staff':
+                    staff_member = None
+            
+            if not staff_member:
+                return jsonify({"success": False, "error": "Staff member not found"}), 404
+            
+            # Mark attendance for the whole roster
+            updated = self.attendance_service.mark_bulk_attendance(instance_id, marks, staff_member.id)
+            
+            return jsonify({
+                "success": True,
+                "updated": updated,
+                "message": f"Attendance marked for {updated} students"
+            })
+            
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        except Exception as e:
+            return jsonify({"success": False, "error": str(e)}), 500
+    
     def get_class_roster(self, instance_id):
         """Handle get class roster request"""
         try:
@@ -156,8 +205,18 @@ class AttendanceController:
             if not staff_member:
                 return jsonify({"success": False, "error": "Staff member not found"}), 404
             
+            # Optional delta-sync cursor from a previous roster response
+            since = request.args.get('since')
+            if since is not None:
+                try:
+                    since = int(since)
+                except ValueError:
+                    return jsonify({"success": False, "error": "since must be a cursor returned by a previous roster request"}), 400
+                if since < 0:
+                    return jsonify({"success": False, "error": "since must be a cursor returned by a previous roster request"}), 400
+            
             # Get roster
-            roster = self.attendance_service.get_class_roster(instance_id, staff_member.id)
+            roster = self.attendance_service.get_class_roster(instance_id, staff_member.id, since=since)
             
             return jsonify({
                 "success": True,
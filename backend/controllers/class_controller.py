@@ -5,11 +5,14 @@ from services.membership_service import MembershipService
 from dtos.class_dto import StudioClassDTO, ClassInstanceDTO
 from dtos.user_dto import UserDTO
 from typing import Dict, Any
+from datetime import datetime
 
 
 class ClassController:
     """Controller for class-related HTTP requests"""
     
+    MAX_ELIGIBILITY_BATCH = 200
+    
     def __init__(self):
         self.class_service = ClassService()
         self.user_service = UserService()
@@ -98,7 +101,7 @@ class ClassController:
                 print("[book_class] ❌ Missing instance_id")
                 return jsonify({"success": False, "error": "Missing instance_id"}), 400
             
-            # Get student
+            # Get student (a clerk_user_id resolves through the identity cache, not a full user load)
             student = None
             if student_id:
                 print(f"[book_class] Looking up student by student_id: {student_id}")
@@ -107,9 +110,12 @@ class ClassController:
                 if student and student.discriminator != 'student':
                     print(f"[book_class] ❌ User with id {student_id} is not a student")
                     student = None
+                if student:
+                    clerk_user_id = student.clerk_user_id
+                    self.user_service.remember_identity(student)
             elif clerk_user_id:
                 print(f"[book_class] Looking up student by clerk_user_id: {clerk_user_id}")
-                student = self.user_service.get_user_by_clerk_id(clerk_user_id)
+                student = self.user_service.get_identity_by_clerk_id(clerk_user_id)
                 print(f"[book_class] Student lookup result by clerk_user_id: {student}")
                 if student and student.discriminator != 'student':
                     print(f"[book_class] ❌ User with clerk_user_id {clerk_user_id} is not a student")
@@ -118,11 +124,11 @@ class ClassController:
             if not student:
                 print(f"[book_class] ❌ Student not found for clerk_user_id: {clerk_user_id} or student_id: {student_id}")
                 return jsonify({"success": False, "error": "Student not found"}), 404
-            print(f"[book_class] ✅ Found student: id={student.id}, clerk_user_id={student.clerk_user_id}, membership_id={student.membership_id}, type={getattr(student, 'discriminator', None)}")
+            print(f"[book_class] ✅ Found student: id={student.id}, clerk_user_id={clerk_user_id}, membership_id={student.membership_id}, type={getattr(student, 'discriminator', None)}")
             
             # If payment_type is 'membership', check membership status
             if payment_type == 'membership':
-                membership_status = self.membership_service.get_membership_status(student.clerk_user_id)
+                membership_status = self.membership_service.get_membership_status(clerk_user_id)
                 print(f"[book_class] Membership status: {membership_status}")
                 if not membership_status.get('has_membership', False) or not membership_status.get('is_active', False):
                     print("[book_class] ❌ Membership expired or inactive. Requires drop-in payment.")
@@ -532,6 +538,58 @@ class ClassController:
         except Exception as e:
             return jsonify({"success": False, "error": str(e)}), 500
     
+    def check_booking_eligibility_batch(self):
+        """Check booking eligibility, credits and capacity for many class instances at once"""
+        try:
+            data = request.get_json()
+            if not data:
+                return jsonify({"success": False, "error": "Missing JSON body"}), 400
+            
+            clerk_user_id = data.get('clerk_user_id')
+            instance_ids = data.get('instance_ids')
+            
+            if not clerk_user_id or not isinstance(instance_ids, list) or not instance_ids:
+                return jsonify({"success": False, "error": "Missing clerk_user_id or instance_ids"}), 400
+            if len(instance_ids) > self.MAX_ELIGIBILITY_BATCH:
+                return jsonify({"success": False, "error": f"At most {self.MAX_ELIGIBILITY_BATCH} instance_ids per request"}), 400
+            
+            # Find student and membership once for the whole batch
+            student = self.user_service.get_identity_by_clerk_id(clerk_user_id)
+            if not student or student.discriminator != 'student':
+                return jsonify({"success": False, "error": "Student not found"}), 404
+            membership = self.membership_service.get_membership_window(clerk_user_id)
+            available_credits = self.class_service.credit_service.get_credit_count(student.id)
+            
+            # Start times and capacity for every instance in one query
+            unique_ids = list(dict.fromkeys(str(instance_id) for instance_id in instance_ids))
+            states = self.class_service.get_booking_states(unique_ids, student.id)
+            
+            now = datetime.utcnow()
+            eligibility = {}
+            for instance_id, state in states.items():
+                start_time = state.pop('start_time')
+                eligibility[instance_id] = {
+                    "booking_eligibility": self.membership_service.eligibility_for_window(membership, start_time, now),
+                    "can_book_with_credit": available_credits > 0,
+                    "capacity": state,
+                    "class_info": {
+                        "instance_id": instance_id,
+                        "class_name": state.pop('class_name') or "Unknown",
+                        "start_time": start_time.isoformat()
+                    }
+                }
+                del state['instance_id']
+            
+            return jsonify({
+                "success": True,
+                "available_credits": available_credits,
+                "eligibility": eligibility,
+                "not_found": [instance_id for instance_id in unique_ids if instance_id not in states]
+            })
+            
+        except Exception as e:
+            return jsonify({"success": False, "error": str(e)}), 500
+    
     def cancel_staff_booking(self):
         """Handle staff booking cancellation request"""
         try:
@@ -669,6 +727,7 @@ class ClassController:
                     status='enrolled'
                 )
                 db.session.add(enrollment)
+                self.class_service.rollup_service.record_transition(instance_id, None, 'enrolled')
                 db.session.commit()
                 print(f"[book_class_with_credit] ✅ Booking confirmed with credit - enrollment_id: {enrollment.id}")
                 return jsonify({
@@ -1,4 +1,4 @@
-from flask import request, jsonify
+from flask import request, jsonify, Response
 from services.membership_service import MembershipService
 from services.user_service import UserService
 
@@ -89,23 +89,7 @@ class MembershipController:
     def get_membership_options(self):
         """Handle get membership options request"""
         try:
-            options = self.membership_service.get_membership_options()
-            
-            return jsonify({
-                "success": True,
-                "options": [
-                    {
-                        "id": option.id,
-                        "tier_name": option.tier_name,
-                        "price_min": option.price_min,
-                        "price_max": option.price_max,
-                        "description": option.description,
-                        "category": option.category,
-                        "stripe_price_id": option.stripe_price_id
-                    }
-                    for option in options
-                ]
-            })
+            return Response(self.membership_service.get_membership_options_body(), mimetype='application/json')
             
         except Exception as e:
             return jsonify({"success": False, "error": str(e)}), 500 
\ No newline at end of file
@@ -1,4 +1,4 @@
-from flask import request, jsonify
+from flask import request, jsonify, Response
 from services.payment_service import PaymentService
 
 class PaymentController:
@@ -10,23 +10,7 @@ class PaymentController:
     def get_sliding_scale_options(self):
         """Handle get sliding scale options request"""
         try:
-            options = self.payment_service.get_sliding_scale_options()
-            
-            return jsonify({
-                "success": True,
-                "options": [
-                    {
-                        "id": option.id,
-                        "tier_name": option.tier_name,
-                        "price_min": option.price_min,
-                        "price_max": option.price_max,
-                        "description": option.description,
-                        "category": option.category,
-                        "stripe_price_id": option.stripe_price_id
-                    }
-                    for option in options
-                ]
-            })
+            return Response(self.payment_service.get_options_body('drop-in'), mimetype='application/json')
             
         except Exception as e:
             return jsonify({"success": False, "error": str(e)}), 500
@@ -34,24 +18,7 @@ class PaymentController:
     def get_all_sliding_scale_options(self):
         """Handle get all sliding scale options request"""
         try:
-            options = self.payment_service.get_all_sliding_scale_options()
-            
-            return jsonify({
-                "success": True,
-                "options": [
-                    {
-                        "id": option.id,
-                        "tier_name": option.tier_name,
-                        "price_min": option.price_min,
-                        "price_max": option.price_max,
-                        "description": option.description,
-                        "category": option.category,
-                        "stripe_price_id": option.stripe_price_id,
-                        "is_active": option.is_active
-                    }
-                    for option in options
-                ]
-            })
+            return Response(self.payment_service.get_options_body('all'), mimetype='application/json')
             
         except Exception as e:
             return jsonify({"success": False, "error": str(e)}), 500
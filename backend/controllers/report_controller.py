@@ -0,0 +1,124 @@
+from flask import request, jsonify, Response, stream_with_context
+from datetime import datetime
+from services.attendance_rollup_service import AttendanceRollupService
+from services.export_service import ExportService, EXPORT_EXTENSIONS, EXPORT_MIMETYPES
+from services.reconciliation_service import ReconciliationService
+from services.revenue_rollup_service import RevenueRollupService
+
+class ReportController:
+    """Controller for management reporting requests"""
+    
+    def __init__(self):
+        self.attendance_rollup_service = AttendanceRollupService()
+        self.export_service = ExportService()
+        self.reconciliation_service = ReconciliationService()
+        self.revenue_rollup_service = RevenueRollupService()
+    
+    def get_attendance_report(self):
+        """Handle attendance report request (reads only the attendance rollups)"""
+        try:
+            group_by = request.args.get('group_by', 'class')
+            start_date = request.args.get('start_date')
+            end_date = request.args.get('end_date')
+            
+            try:
+                start_date = datetime.strptime(start_date, "%Y-%m-%d").date() if start_date else None
+                end_date = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else None
+            except ValueError:
+                return jsonify({"success": False, "error": "Dates must be in YYYY-MM-DD format"}), 400
+            
+            report = self.attendance_rollup_service.get_report(group_by, start_date, end_date)
+            
+            return jsonify({
+                "success": True,
+                "group_by": group_by,
+                "report": report
+            })
+            
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        except Exception as e:
+            return jsonify({"success": False, "error": str(e)}), 500
+    
+    def get_revenue_report(self):
+        """Handle revenue report request (reads only the revenue rollups)"""
+        try:
+            group_by = request.args.get('group_by', 'day')
+            start_date = request.args.get('start_date')
+            end_date = request.args.get('end_date')
+            
+            try:
+                start_date = datetime.strptime(start_date, "%Y-%m-%d").date() if start_date else None
+                end_date = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else None
+            except ValueError:
+                return jsonify({"success": False, "error": "Dates must be in YYYY-MM-DD format"}), 400
+            
+            report = self.revenue_rollup_service.get_report(group_by, start_date, end_date, request.args.get('category'))
+            
+            return jsonify({
+                "success": True,
+                "group_by": group_by,
+                "report": report
+            })
+            
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        except Exception as e:
+            return jsonify({"success": False, "error": str(e)}), 500
+    
+    def reconcile_payments(self):
+        """Handle payment/enrollment/credit reconciliation request (dry run unless "apply" is true)"""
+        try:
+            data = request.get_json(silent=True) or {}
+            apply = data.get('apply', False)
+            if not isinstance(apply, bool):
+                return jsonify({"success": False, "error": "apply must be true or false"}), 400
+            checks = data.get('checks')
+            if checks is not None and not isinstance(checks, list):
+                return jsonify({"success": False, "error": "checks must be a list"}), 400
+            
+            report = self.reconciliation_service.reconcile(apply=apply, checks=checks)
+            
+            return jsonify({
+                "success": True,
+                "reconciliation": report
+            })
+            
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        except Exception as e:
+            return jsonify({"success": False, "error": str(e)}), 500
+    
+    def export_dataset(self, dataset):
+        """Handle bookkeeping export request (payments, class_enrollments or class_credits)
+        
+        The file is streamed as it is read, so large date ranges use constant memory.
+        """
+        try:
+            fmt = request.args.get('format', 'csv')
+            start_date = request.args.get('start_date')
+            end_date = request.args.get('end_date')
+            
+            try:
+                start_date = datetime.strptime(start_date, "%Y-%m-%d").date() if start_date else None
+                end_date = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else None
+            except ValueError:
+                return jsonify({"success": False, "error": "Dates must be in YYYY-MM-DD format"}), 400
+            try:
+                chunk_size = int(request.args.get('chunk_size', 5000))
+            except ValueError:
+                return jsonify({"success": False, "error": "chunk_size must be an integer"}), 400
+            
+            chunks = self.export_service.stream(dataset, fmt, start_date, end_date, chunk_size)
+            filename = f"{dataset}_{datetime.utcnow():%Y%m%d}.{EXPORT_EXTENSIONS[fmt]}"
+            
+            return Response(
+                stream_with_context(chunks),
+                mimetype=EXPORT_MIMETYPES[fmt],
+                headers={"Content-Disposition": f"attachment; filename={filename}"}
+            )
+            
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        except Exception as e:
+            return jsonify({"success": False, "error": str(e)}), 500
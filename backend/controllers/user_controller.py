@@ -1,5 +1,6 @@
 from flask import jsonify, request
 from services.user_service import UserService
+from services.user_import_service import UserImportService, read_rows
 from dtos.user_dto import UserDTO
 from typing import Dict, Any
 
@@ -51,16 +52,49 @@ class UserController:
             return jsonify({"success": False, "error": str(e)}), 500
     
     def get_all_users(self):
-        """Handle get all users request"""
+        """Handle get all users request (keyset paginated)
+        
+        Query parameters: cursor (next_cursor of the previous page), limit (default 100),
+        role, type, and fields (comma-separated subset of the user fields).
+        """
         try:
-            users = self.user_service.get_all_users()
-            user_dtos = UserDTO.from_user_list(users)
+            try:
+                cursor = request.args.get('cursor')
+                cursor = int(cursor) if cursor else None
+                limit = int(request.args.get('limit', 100))
+            except ValueError:
+                return jsonify({"success": False, "error": "cursor and limit must be integers"}), 400
+            
+            fields = None
+            if request.args.get('fields'):
+                fields = [field.strip() for field in request.args['fields'].split(',') if field.strip()]
+                unknown = [field for field in fields if field not in UserDTO.FIELDS]
+                if unknown:
+                    return jsonify({"success": False, "error": f"Unknown fields: {', '.join(unknown)}"}), 400
+                if 'id' not in fields:
+                    fields.insert(0, 'id')
+            
+            page = self.user_service.get_users_page(
+                cursor=cursor,
+                limit=limit,
+                role=request.args.get('role'),
+                user_type=request.args.get('type'),
+                fields=fields
+            )
+            
+            if fields:
+                users = [UserDTO.project(user, fields) for user in page["users"]]
+            else:
+                users = [dto.to_dict() for dto in UserDTO.from_user_list(page["users"])]
             
             return jsonify({
                 "success": True,
-                "users": [dto.to_dict() for dto in user_dtos]
+                "users": users,
+                "next_cursor": page["next_cursor"]
             })
             
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
         except Exception as e:
             return jsonify({"success": False, "error": str(e)}), 500
     
@@ -68,8 +102,12 @@ class UserController:
         """Handle instructor search request"""
         try:
             query = request.args.get('query', '')
+            try:
+                limit = int(request.args.get('limit', 20))
+            except ValueError:
+                return jsonify({"success": False, "error": "limit must be an integer"}), 400
             # Allow empty query to return all instructors
-            instructors = self.user_service.search_instructors(query)
+            instructors = self.user_service.search_instructors(query, limit)
             instructor_dtos = UserDTO.from_user_list(instructors)
             
             return jsonify({
@@ -77,6 +115,61 @@ class UserController:
                 "instructors": [dto.to_dict() for dto in instructor_dtos]
             })
             
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        except Exception as e:
+            return jsonify({"success": False, "error": str(e)}), 500
+    
+    def import_users(self):
+        """Handle bulk user import request
+        
+        The body is a CSV file (header: clerk_user_id,email,name,role) or NDJSON, sent raw or
+        as a multipart 'file' upload. The format comes from ?format=, else the content type.
+        """
+        try:
+            upload = request.files.get('file')
+            stream = upload.stream if upload else request.stream
+            content_type = (upload.mimetype if upload else request.mimetype) or ''
+            
+            fmt = request.args.get('format')
+            if not fmt:
+                fmt = 'ndjson' if 'ndjson' in content_type or 'jsonl' in content_type else 'csv'
+            
+            summary = UserImportService().import_users(
+                read_rows(stream, fmt),
+                chunk_size=int(request.args.get('chunk_size', 1000)),
+                on_conflict=request.args.get('on_conflict', 'skip')
+            )
+            
+            return jsonify({
+                "success": True,
+                "import": summary
+            })
+            
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        except Exception as e:
+            return jsonify({"success": False, "error": str(e)}), 500
+    
+    def search_users(self):
+        """Handle user search request (prefix match on name and email)"""
+        try:
+            query = request.args.get('query', '')
+            try:
+                limit = int(request.args.get('limit', 20))
+            except ValueError:
+                return jsonify({"success": False, "error": "limit must be an integer"}), 400
+            
+            users = self.user_service.search_users(query, request.args.get('type'), limit)
+            user_dtos = UserDTO.from_user_list(users)
+            
+            return jsonify({
+                "success": True,
+                "users": [dto.to_dict() for dto in user_dtos]
+            })
+            
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
         except Exception as e:
             return jsonify({"success": False, "error": str(e)}), 500
     
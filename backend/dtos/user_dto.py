@@ -5,6 +5,18 @@ from models import User
 class UserDTO:
     """Data Transfer Object for User data"""
     
+    # Public field name -> User attribute, in response order
+    FIELDS = {
+        "id": "id",
+        "clerk_user_id": "clerk_user_id",
+        "email": "email",
+        "name": "name",
+        "role": "role",
+        "type": "discriminator",
+        "created_at": "created_at",
+        "updated_at": "updated_at",
+    }
+    
     def __init__(self, user: User):
         self.id = user.id
         self.clerk_user_id = user.clerk_user_id
@@ -36,4 +48,13 @@ class UserDTO:
     @classmethod
     def from_user_list(cls, users: list[User]) -> list['UserDTO']:
         """Create list of DTOs from User models"""
-        return [cls(user) for user in users] 
\ No newline at end of file
+        return [cls(user) for user in users]
+    
+    @classmethod
+    def project(cls, user: User, fields: list[str]) -> Dict[str, Any]:
+        """Serialize only the requested fields (reads no other attributes, so deferred columns stay unloaded)"""
+        data = {}
+        for field in fields:
+            value = getattr(user, cls.FIELDS[field])
+            data[field] = value.isoformat() if hasattr(value, 'isoformat') else value
+        return data 
\ No newline at end of file
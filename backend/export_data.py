@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Export payments, class enrollments or class credits for bookkeeping
+
+Rows are joined with student and class names and written chunk by chunk, so multi-year
+exports use constant memory. Parquet and Arrow output need pyarrow (pip install pyarrow).
+
+Usage:
+    python export_data.py payments > payments.csv
+    python export_data.py class_enrollments --start-date 2024-01-01 --end-date 2024-12-31 -o enrollments.csv
+    python export_data.py class_credits --format parquet -o credits.parquet
+"""
+
+import sys
+import os
+import argparse
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from services.export_service import ExportService, EXPORT_DATASETS, EXPORT_FORMATS
+
+def parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export payments, enrollments or credits as CSV, Parquet or Arrow")
+    parser.add_argument('dataset', choices=EXPORT_DATASETS)
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+    parser.add_argument('--start-date', type=parse_date, help="first day to include (YYYY-MM-DD)")
+    parser.add_argument('--end-date', type=parse_date, help="last day to include (YYYY-MM-DD)")
+    parser.add_argument('--chunk-size', type=int, default=5000, help="rows read and written per chunk")
+    parser.add_argument('-o', '--output', help="file to write (default: stdout)")
+    args = parser.parse_args()
+
+    if args.format != 'csv' and not args.output and sys.stdout.isatty():
+        parser.error(f"refusing to write {args.format} to a terminal; use --output")
+
+    with app.app_context():
+        try:
+            chunks = ExportService().stream(args.dataset, args.format, args.start_date, args.end_date, args.chunk_size)
+        except ValueError as e:
+            parser.error(str(e))
+        output = open(args.output, 'wb') if args.output else sys.stdout.buffer
+        try:
+            written = 0
+            for chunk in chunks:
+                output.write(chunk)
+                written += len(chunk)
+        finally:
+            if args.output:
+                output.close()
+
+    if args.output:
+        print(f"✅ Exported {args.dataset} to {args.output} ({written} bytes)")
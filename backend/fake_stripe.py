@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+In-process fake of the Stripe Checkout API for offline development and load tests
+
+It serves the endpoints the backend uses (create and retrieve Checkout Sessions) and, when
+a session is paid, sends a signed checkout.session.completed event just like Stripe does.
+Point the backend at it with STRIPE_API_BASE (or a StripeGateway(api_base=fake.url)).
+
+Standalone usage:
+    python fake_stripe.py --port 12111 --webhook-url http://127.0.0.1:5000/webhook/stripe
+
+    then run the backend with STRIPE_API_BASE=http://127.0.0.1:12111 and
+    STRIPE_WEBHOOK_SECRET=whsec_fake. Opening a session's `url` pays it and redirects
+    to its success_url.
+"""
+
+import hashlib
+import hmac
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qsl
+import requests
+
+_KEY_PART = re.compile(r'\[([^\]]*)\]')
+
+
+def _decode_form(body: str) -> Dict[str, Any]:
+    """Turn Stripe's form encoding (metadata[payment_id]=1, line_items[0][quantity]=1) into nested dicts"""
+    params = {}
+    for key, value in parse_qsl(body, keep_blank_values=True):
+        bracket = key.find('[')
+        parts = [key] if bracket < 0 else [key[:bracket]] + _KEY_PART.findall(key[bracket:])
+        target = params
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = value
+    return params
+
+
+class FakeStripe:
+    """Threaded HTTP server that behaves like the slice of Stripe the backend uses
+
+    latency (seconds) and failure_rate (0..1, answered with HTTP 500) can be changed at
+    any time to exercise timeouts, retries and the circuit breaker.
+    """
+
+    def __init__(self, webhook_secret: str = 'whsec_fake', webhook_url: Optional[str] = None,
+                 on_event: Optional[Callable[[bytes, str], Any]] = None, latency: float = 0.0,
+                 failure_rate: float = 0.0, host: str = '127.0.0.1', port: int = 0):
+        self.webhook_secret = webhook_secret
+        self.webhook_url = webhook_url
+        self.on_event = on_event
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.sessions = {}
+        self.requests_served = 0
+        self.connections = set()  # Client (host, port) pairs; stays small when keep-alive works
+        self._idempotent_responses = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'FakeStripe':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'FakeStripe':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def pay(self, session_id: str) -> Tuple[bytes, str]:
+        """Mark a session paid and deliver its signed checkout.session.completed event
+
+        The event goes to on_event(payload, signature) and/or is POSTed to webhook_url.
+        Returns the payload and Stripe-Signature header either way.
+        """
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                raise ValueError("Checkout session not found")
+            session.update(status='complete', payment_status='paid')
+            event = {
+                'id': f"evt_{uuid.uuid4().hex[:24]}",
+                'object': 'event',
+                'type': 'checkout.session.completed',
+                'created': int(time.time()),
+                'livemode': False,
+                'data': {'object': dict(session)},
+            }
+
+        payload = json.dumps(event).encode('utf-8')
+        signature = self.sign(payload)
+        if self.on_event:
+            self.on_event(payload, signature)
+        if self.webhook_url:
+            requests.post(self.webhook_url, data=payload, headers={
+                'Content-Type': 'application/json',
+                'Stripe-Signature': signature,
+            }, timeout=10)
+        return payload, signature
+
+    def sign(self, payload: bytes) -> str:
+        """A Stripe-Signature header for payload, valid for webhook_secret"""
+        timestamp = int(time.time())
+        signed = f"{timestamp}.".encode('utf-8') + payload
+        digest = hmac.new(self.webhook_secret.encode('utf-8'), signed, hashlib.sha256).hexdigest()
+        return f"t={timestamp},v1={digest}"
+
+    def _create_session(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        session_id = f"cs_test_{uuid.uuid4().hex}"
+        amount_total = sum(
+            int(item.get('price_data', {}).get('unit_amount', 0)) * int(item.get('quantity', 1))
+            for item in params.get('line_items', {}).values()
+        )
+        session = {
+            'id': session_id,
+            'object': 'checkout.session',
+            'url': f"{self.url}/pay/{session_id}",
+            'mode': params.get('mode', 'payment'),
+            'status': 'open',
+            'payment_status': 'unpaid',
+            'amount_total': amount_total,
+            'currency': 'usd',
+            'success_url': params.get('success_url'),
+            'cancel_url': params.get('cancel_url'),
+            'metadata': params.get('metadata', {}),
+            'created': int(time.time()),
+            'expires_at': int(time.time()) + 24 * 3600,
+            'livemode': False,
+        }
+        self.sessions[session_id] = session
+        return session
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep connections open between requests
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0)).decode('utf-8')
+                if self.path != '/v1/checkout/sessions':
+                    return self._error(404, 'invalid_request_error', f"Unrecognized request URL (POST: {self.path})")
+                if self._inject_faults():
+                    return
+                key = self.headers.get('Idempotency-Key')
+                with fake._lock:
+                    if key and key in fake._idempotent_responses:
+                        return self._json(200, fake._idempotent_responses[key])
+                    session = dict(fake._create_session(_decode_form(body)))
+                    if key:
+                        fake._idempotent_responses[key] = session
+                self._json(200, session)
+
+            def do_GET(self):
+                match = re.fullmatch(r'/v1/checkout/sessions/([\w-]+)', self.path)
+                if match:
+                    if self._inject_faults():
+                        return
+                    with fake._lock:
+                        session = fake.sessions.get(match.group(1))
+                        session = dict(session) if session else None
+                    if session is None:
+                        return self._error(404, 'invalid_request_error', f"No such checkout.session: '{match.group(1)}'")
+                    return self._json(200, session)
+
+                match = re.fullmatch(r'/pay/([\w-]+)', self.path)
+                if match and match.group(1) in fake.sessions:
+                    fake.pay(match.group(1))
+                    success_url = (fake.sessions[match.group(1)]['success_url'] or '/').replace('{CHECKOUT_SESSION_ID}', match.group(1))
+                    self.send_response(303)
+                    self.send_header('Location', success_url)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                self._error(404, 'invalid_request_error', f"Unrecognized request URL (GET: {self.path})")
+
+            def _inject_faults(self) -> bool:
+                with fake._lock:
+                    fake.requests_served += 1
+                    fake.connections.add(self.client_address)
+                if fake.latency:
+                    time.sleep(fake.latency)
+                if fake.failure_rate and random.random() < fake.failure_rate:
+                    self._error(500, 'api_error', "Injected failure")
+                    return True
+                return False
+
+            def _json(self, status: int, data: Dict[str, Any]) -> None:
+                body = json.dumps(data).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('Request-Id', f"req_{uuid.uuid4().hex[:14]}")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _error(self, status: int, error_type: str, message: str) -> None:
+                self._json(status, {'error': {'type': error_type, 'message': message}})
+
+        return Handler
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Run a fake Stripe Checkout API")
+    parser.add_argument('--port', type=int, default=12111)
+    parser.add_argument('--webhook-url', help="where to POST checkout.session.completed events")
+    parser.add_argument('--webhook-secret', default='whsec_fake')
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every API call")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="fraction of API calls answered with HTTP 500")
+    args = parser.parse_args()
+
+    fake = FakeStripe(args.webhook_secret, args.webhook_url, latency=args.latency,
+                      failure_rate=args.failure_rate, port=args.port)
+    print(f"🧪 Fake Stripe listening on {fake.url} (webhook secret {args.webhook_secret})")
+    try:
+        fake._server.serve_forever()
+    except KeyboardInterrupt:
+        fake.stop()
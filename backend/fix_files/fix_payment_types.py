@@ -8,6 +8,7 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from app import app, db
+from datetime import datetime
 from sqlalchemy import text
 
 def fix_payment_types():
@@ -25,8 +26,9 @@ def fix_payment_types():
                 """))
                 
                 fixed_count = 0
+                now = datetime.utcnow()  # UTC, like datetime('now'), but bound so any database accepts it
                 
-                for row in result:
+                for row in result.fetchall():
                     enrollment_id = row[0]
                     student_id = row[1]
                     payment_id = row[2]
@@ -37,9 +39,9 @@ def fix_payment_types():
                         FROM memberships m 
                         JOIN users u ON u.membership_id = m.id 
                         WHERE u.id = :student_id AND u.type = 'student' 
-                        AND m.start_date <= datetime('now') 
-                        AND (m.end_date IS NULL OR m.end_date >= datetime('now'))
-                    """), {"student_id": student_id})
+                        AND m.start_date <= :now 
+                        AND (m.end_date IS NULL OR m.end_date >= :now)
+                    """), {"student_id": student_id, "now": now})
                     
                     if membership_result.fetchone():
                         payment_type = 'membership'
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Bulk-create users from a CSV or NDJSON file
+
+CSV files need a header row with clerk_user_id and role (email and name are optional);
+NDJSON files have one JSON object with the same keys per line.
+
+Usage:
+    python import_users.py students.csv
+    python import_users.py users.ndjson --on-conflict update
+"""
+
+import sys
+import os
+import argparse
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from services.user_import_service import UserImportService, read_rows, CONFLICT_MODES, IMPORT_FORMATS
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-create users from a CSV or NDJSON file")
+    parser.add_argument('path', help="file to import ('-' for stdin)")
+    parser.add_argument('--format', choices=IMPORT_FORMATS, help="file format (default: from the file extension)")
+    parser.add_argument('--on-conflict', choices=CONFLICT_MODES, default='skip', help="what to do with existing clerk_user_ids")
+    parser.add_argument('--chunk-size', type=int, default=1000, help="rows per insert batch and transaction")
+    args = parser.parse_args()
+
+    fmt = args.format or ('ndjson' if args.path.endswith(('.ndjson', '.jsonl')) else 'csv')
+    stream = sys.stdin.buffer if args.path == '-' else open(args.path, 'rb')
+
+    with app.app_context():
+        print(f"🔄 Importing users from {args.path} ({fmt})...")
+        try:
+            summary = UserImportService().import_users(read_rows(stream, fmt), args.chunk_size, args.on_conflict)
+        finally:
+            stream.close()
+
+    for error in summary['errors']:
+        print(f"❌ Row {error['row']} ({error['clerk_user_id']}): {error['error']}")
+    if summary['errors_truncated']:
+        print(f"ℹ️ Only the first {len(summary['errors'])} of {summary['failed']} errors were listed")
+    print(f"✅ Processed {summary['processed']} rows: {summary['inserted']} inserted, "
+          f"{summary['updated']} updated, {summary['skipped']} skipped, {summary['failed']} failed")
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Offline load test of the paid drop-in flow: checkout -> Stripe webhook -> enrollment
+
+Runs against a throwaway SQLite database and the in-process fake Stripe server, so no
+network access or Stripe account is needed. Each simulated student creates a payment and
+a Checkout Session through the Stripe gateway, pays it, and the signed webhook is queued
+exactly like /webhook/stripe does; the webhook worker then books the classes.
+
+Usage:
+    python load_test_checkout.py --students 200 --concurrency 16
+    python load_test_checkout.py --latency 0.2 --failure-rate 0.05   # slow and flaky Stripe
+"""
+
+import sys
+import os
+import io
+import argparse
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import stripe
+from flask import Flask
+from models import db, Staff, Student, StudioClass, ClassInstance, ClassEnrollment, SlidingScaleOption, Payment
+from fake_stripe import FakeStripe
+from services.payment_service import PaymentService
+from services.stripe_gateway import StripeGateway, StripeUnavailableError, set_stripe_gateway
+from services.webhook_queue_service import WebhookQueueService
+
+
+def create_load_test_app():
+    app = Flask(__name__)
+    db_path = os.path.join(tempfile.mkdtemp(), 'load_test.sqlite3')
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': 30}}
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def seed(app, students):
+    with app.app_context():
+        instructor = Staff(clerk_user_id='load_instructor', email='instructor@example.com', name='Instructor', role='staff')
+        db.session.add(instructor)
+        db.session.flush()
+        start = datetime.utcnow() + timedelta(days=1)
+        studio_class = StudioClass(class_name='Load Test Class', start_time=start, duration=60, instructor_id=instructor.id,
+                                   max_capacity=students, recurrence_pattern='one-time')
+        db.session.add(studio_class)
+        db.session.flush()
+        instance = ClassInstance(instance_id=f'{studio_class.id}_load', class_id=studio_class.id, start_time=start,
+                                 end_time=start + timedelta(hours=1), max_capacity=students)
+        option = SlidingScaleOption(tier_name='Drop-in', price_min=10, price_max=20, category='drop-in')
+        db.session.add_all([instance, option] + [
+            Student(clerk_user_id=f'load_student_{i}', email=f'student{i}@example.com', role='student')
+            for i in range(students)
+        ])
+        db.session.commit()
+        student_ids = [s.id for s in Student.query.order_by(Student.id)]
+        return student_ids, instance.instance_id, option.id
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test checkout -> webhook -> enrollment against a fake Stripe")
+    parser.add_argument('--students', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds the fake Stripe adds to each API call")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="fraction of fake Stripe API calls that fail with HTTP 500")
+    parser.add_argument('--verbose', action='store_true', help="show the services' debug output")
+    args = parser.parse_args()
+
+    app = create_load_test_app()
+    student_ids, instance_id, option_id = seed(app, args.students)
+    queue = WebhookQueueService()
+
+    def receive_webhook(payload, signature):
+        # Same steps as the /webhook/stripe route
+        event = stripe.Webhook.construct_event(payload, signature, fake.webhook_secret)
+        queue.enqueue(event['id'], event['type'], payload.decode('utf-8'))
+
+    def checkout(student_id):
+        started = time.perf_counter()
+        with app.app_context():
+            payment = PaymentService.create_payment(student_id, 10, option_id, instance_id, 'Load Test Class')
+            session = PaymentService.create_stripe_checkout_session(payment.id, 'http://localhost/success', 'http://localhost/cancel')
+            fake.pay(session.id)
+        return time.perf_counter() - started
+
+    fake = FakeStripe(on_event=receive_webhook, latency=args.latency, failure_rate=args.failure_rate).start()
+    set_stripe_gateway(StripeGateway('sk_test_fake', api_base=fake.url, pool_size=args.concurrency))
+    print(f"🧪 {args.students} checkouts, concurrency {args.concurrency}, fake Stripe latency {args.latency}s, failure rate {args.failure_rate}")
+
+    latencies, unavailable = [], 0
+    output = sys.stdout if args.verbose else io.StringIO()
+    try:
+        with redirect_stdout(output):
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                futures = [pool.submit(checkout, student_id) for student_id in student_ids]
+                for future in futures:
+                    try:
+                        latencies.append(future.result())
+                    except StripeUnavailableError:
+                        unavailable += 1
+            checkout_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            with app.app_context():
+                applied = 0
+                while True:
+                    counts = queue.process_pending()
+                    if not sum(counts.values()):
+                        break
+                    applied += counts['processed']
+            worker_seconds = time.perf_counter() - started
+    finally:
+        fake.stop()
+        set_stripe_gateway(None)
+
+    with app.app_context():
+        enrolled = ClassEnrollment.query.filter_by(instance_id=instance_id, status='enrolled').count()
+        completed = Payment.query.filter_by(status='completed').count()
+
+    print(f"✅ Checkouts: {len(latencies)} ok, {unavailable} failed in {checkout_seconds:.2f}s "
+          f"({len(latencies) / checkout_seconds:.1f}/s, p50 {percentile(latencies, 0.5) * 1000:.0f}ms, "
+          f"p95 {percentile(latencies, 0.95) * 1000:.0f}ms)")
+    print(f"✅ Stripe API calls: {fake.requests_served} over {len(fake.connections)} connections")
+    print(f"✅ Worker applied {applied} webhook events in {worker_seconds:.2f}s ({applied / worker_seconds if worker_seconds else 0:.1f}/s)")
+    print(f"{'✅' if enrolled == completed == len(latencies) else '❌'} Payments completed: {completed}, students enrolled: {enrolled}")
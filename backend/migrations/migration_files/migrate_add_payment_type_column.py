@@ -8,6 +8,7 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from app import app, db
+from datetime import datetime
 from sqlalchemy import text
 
 def migrate_update_payment_type_values():
@@ -23,8 +24,9 @@ def migrate_update_payment_type_values():
                 """))
                 
                 updated_count = 0
+                now = datetime.utcnow()  # UTC, like datetime('now'), but bound so any database accepts it
                 
-                for row in result:
+                for row in result.fetchall():
                     enrollment_id = row[0]
                     payment_id = row[1]
                     student_id = row[2]
@@ -39,9 +41,9 @@ def migrate_update_payment_type_values():
                             FROM memberships m 
                             JOIN users u ON u.membership_id = m.id 
                             WHERE u.id = :student_id AND u.type = 'student' 
-                            AND m.start_date <= datetime('now') 
-                            AND (m.end_date IS NULL OR m.end_date >= datetime('now'))
-                        """), {"student_id": student_id})
+                            AND m.start_date <= :now 
+                            AND (m.end_date IS NULL OR m.end_date >= :now)
+                        """), {"student_id": student_id, "now": now})
                         
                         if membership_result.fetchone():
                             payment_type = 'membership'
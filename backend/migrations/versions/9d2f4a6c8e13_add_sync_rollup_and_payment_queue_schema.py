@@ -0,0 +1,182 @@
+"""Add sync, rollup and payment queue schema
+
+Revision ID: 9d2f4a6c8e13
+Revises: 6e7d89532235
+Create Date: 2026-10-19 16:05:21.804133
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d2f4a6c8e13'
+down_revision = '6e7d89532235'
+branch_labels = None
+depends_on = None
+
+
+# Everything here may already exist on databases built by create_db.py, so each step
+# checks first (or uses if_not_exists)
+
+# (table, column name, type, column options)
+COLUMNS = [
+    ('class_enrollments', 'change_seq', sa.Integer(), {'nullable': False, 'server_default': '0'}),
+    ('memberships', 'status', sa.String(length=32), {'nullable': False, 'server_default': 'active'}),
+    ('payments', 'stripe_session_id', sa.String(length=255), {'nullable': True}),
+    ('payments', 'checkout_url', sa.Text(), {'nullable': True}),
+    ('payments', 'checkout_expires_at', sa.DateTime(), {'nullable': True}),
+]
+
+# (index name, table, columns, unique)
+INDEXES = [
+    ('idx_class_enrollments_status_instance', 'class_enrollments', ['status', 'instance_id'], False),
+    ('idx_class_enrollments_instance_change_seq', 'class_enrollments', ['instance_id', 'change_seq'], False),
+    ('idx_class_instances_end_time', 'class_instances', ['end_time'], False),
+    ('idx_users_type_id', 'users', ['type', 'id'], False),
+    ('idx_users_membership_id', 'users', ['membership_id'], False),
+    ('idx_memberships_status_end_date', 'memberships', ['status', 'end_date'], False),
+    ('idx_payments_stripe_session_id', 'payments', ['stripe_session_id'], True),
+    ('idx_payments_status_date', 'payments', ['status', 'date'], False),
+]
+
+TABLE_INDEXES = {
+    'attendance_rollups': [
+        ('idx_attendance_rollups_class_week', ['class_id', 'week_start']),
+        ('idx_attendance_rollups_instructor_week', ['instructor_id', 'week_start']),
+        ('idx_attendance_rollups_week', ['week_start']),
+    ],
+    'revenue_rollups': [
+        ('idx_revenue_rollups_category_day', ['category', 'day']),
+        ('idx_revenue_rollups_option_day', ['sliding_scale_option_id', 'day']),
+    ],
+    'stripe_webhook_events': [
+        ('idx_stripe_webhook_events_status_available', ['status', 'available_at']),
+    ],
+}
+
+# dialect: user search DDL, inlined so this revision doesn't change with models.py
+USER_SEARCH_DDL = {
+    'sqlite': [
+        """CREATE VIRTUAL TABLE IF NOT EXISTS users_fts
+           USING fts5(name, email, content='users', content_rowid='id', tokenize='unicode61 remove_diacritics 2')""",
+        """CREATE TRIGGER IF NOT EXISTS users_fts_ai AFTER INSERT ON users BEGIN
+               INSERT INTO users_fts(rowid, name, email) VALUES (new.id, new.name, new.email);
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS users_fts_ad AFTER DELETE ON users BEGIN
+               INSERT INTO users_fts(users_fts, rowid, name, email) VALUES ('delete', old.id, old.name, old.email);
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS users_fts_au AFTER UPDATE OF name, email ON users BEGIN
+               INSERT INTO users_fts(users_fts, rowid, name, email) VALUES ('delete', old.id, old.name, old.email);
+               INSERT INTO users_fts(rowid, name, email) VALUES (new.id, new.name, new.email);
+           END""",
+    ],
+    'postgresql': [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX IF NOT EXISTS idx_users_name_trgm ON users USING gin (lower(name) gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS idx_users_email_trgm ON users USING gin (lower(email) gin_trgm_ops)",
+    ],
+}
+
+
+def create_tables(existing):
+    if 'change_counters' not in existing:
+        op.create_table(
+            'change_counters',
+            sa.Column('name', sa.String(length=64), primary_key=True),
+            sa.Column('value', sa.Integer(), nullable=False, server_default='0'),
+        )
+    if 'attendance_rollups' not in existing:
+        op.create_table(
+            'attendance_rollups',
+            sa.Column('instance_id', sa.String(length=50), sa.ForeignKey('class_instances.instance_id'), primary_key=True),
+            sa.Column('class_id', sa.Integer(), sa.ForeignKey('studio_classes.id'), nullable=False),
+            sa.Column('instructor_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=True),
+            sa.Column('week_start', sa.Date(), nullable=False),
+            sa.Column('enrolled_count', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('attended_count', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('missed_count', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('cancelled_count', sa.Integer(), nullable=False, server_default='0'),
+        )
+    if 'revenue_rollups' not in existing:
+        op.create_table(
+            'revenue_rollups',
+            sa.Column('day', sa.Date(), primary_key=True),
+            sa.Column('sliding_scale_option_id', sa.Integer(), sa.ForeignKey('sliding_scale_options.id'), primary_key=True),
+            sa.Column('category', sa.String(length=64), primary_key=True),
+            sa.Column('payment_count', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('amount_total', sa.Float(), nullable=False, server_default='0'),
+        )
+    if 'stripe_webhook_events' not in existing:
+        op.create_table(
+            'stripe_webhook_events',
+            sa.Column('event_id', sa.String(length=255), primary_key=True),
+            sa.Column('event_type', sa.String(length=128), nullable=False),
+            sa.Column('payload', sa.Text(), nullable=False),
+            sa.Column('status', sa.String(length=32), nullable=False, server_default='pending'),
+            sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('last_error', sa.Text(), nullable=True),
+            sa.Column('received_at', sa.DateTime(), nullable=False),
+            sa.Column('available_at', sa.DateTime(), nullable=False),
+            sa.Column('processed_at', sa.DateTime(), nullable=True),
+        )
+    for table, indexes in TABLE_INDEXES.items():
+        for name, columns in indexes:
+            op.create_index(name, table, columns, unique=False, if_not_exists=True)
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    create_tables(set(inspector.get_table_names()))
+
+    added = set()
+    for table, name, type_, options in COLUMNS:
+        if name not in {column['name'] for column in inspector.get_columns(table)}:
+            with op.batch_alter_table(table, schema=None) as batch_op:
+                batch_op.add_column(sa.Column(name, type_, **options))
+            added.add((table, name))
+
+    # Backfills: existing enrollments keep their id as change_seq, lapsed memberships are expired
+    if ('class_enrollments', 'change_seq') in added:
+        op.execute(sa.text("UPDATE class_enrollments SET change_seq = id WHERE change_seq = 0"))
+    if not bind.execute(sa.text("SELECT 1 FROM change_counters WHERE name = 'class_enrollments'")).first():
+        op.execute(sa.text(
+            "INSERT INTO change_counters (name, value) "
+            "SELECT 'class_enrollments', COALESCE(MAX(change_seq), 0) FROM class_enrollments"
+        ))
+    if ('memberships', 'status') in added:
+        bind.execute(
+            sa.text("UPDATE memberships SET status = 'expired' WHERE end_date IS NOT NULL AND end_date < :now"),
+            {'now': datetime.utcnow()}
+        )
+
+    for name, table, columns, unique in INDEXES:
+        op.create_index(name, table, columns, unique=unique, if_not_exists=True)
+
+    # Full-text user search (FTS5 table and triggers, or trigram indexes)
+    for statement in USER_SEARCH_DDL.get(bind.dialect.name, []):
+        op.execute(sa.text(statement))
+    if bind.dialect.name == 'sqlite':
+        op.execute(sa.text("INSERT INTO users_fts(users_fts) VALUES ('rebuild')"))
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        for trigger in ('users_fts_ai', 'users_fts_ad', 'users_fts_au'):
+            op.execute(sa.text(f"DROP TRIGGER IF EXISTS {trigger}"))
+        op.execute(sa.text("DROP TABLE IF EXISTS users_fts"))
+    elif bind.dialect.name == 'postgresql':
+        op.execute(sa.text("DROP INDEX IF EXISTS idx_users_name_trgm"))
+        op.execute(sa.text("DROP INDEX IF EXISTS idx_users_email_trgm"))
+
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
+    for table, name, _, _ in reversed(COLUMNS):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column(name)
+    for table in ('stripe_webhook_events', 'revenue_rollups', 'attendance_rollups', 'change_counters'):
+        op.drop_table(table)
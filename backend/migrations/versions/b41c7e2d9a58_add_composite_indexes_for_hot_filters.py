@@ -0,0 +1,46 @@
+"""Add composite indexes for hot filters
+
+Revision ID: b41c7e2d9a58
+Revises: 9d2f4a6c8e13
+Create Date: 2026-10-19 10:12:44.318207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b41c7e2d9a58'
+down_revision = '9d2f4a6c8e13'
+branch_labels = None
+depends_on = None
+
+
+# (index name, table, columns); databases built by create_db.py may already have some of
+# these, hence if_not_exists throughout
+# (instance_id, status) roster lookups are already served by idx_class_enrollments_status_instance
+INDEXES = [
+    ('idx_class_enrollments_student_instance_status', 'class_enrollments', ['student_id', 'instance_id', 'status']),
+    ('idx_class_credits_student_used_created', 'class_credits', ['student_id', 'used', 'created_at']),
+    ('idx_class_instances_class_start', 'class_instances', ['class_id', 'start_time']),
+    ('idx_class_instances_cancelled_start', 'class_instances', ['is_cancelled', 'start_time']),
+    ('idx_payments_student_id', 'payments', ['student_id']),
+    ('idx_announcements_board_date_created', 'announcements', ['board_id', 'date_created']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False, if_not_exists=True)
+
+    # Give the query planner statistics for the new indexes (no-op outside SQLite/Postgres)
+    bind = op.get_bind()
+    if bind.dialect.name in ('sqlite', 'postgresql'):
+        op.execute(sa.text('ANALYZE'))
+
+
+def downgrade():
+    # The announcement feed index predates this revision on most databases, so it stays
+    for name, table, _ in reversed(INDEXES):
+        if name != 'idx_announcements_board_date_created':
+            op.drop_index(name, table_name=table, if_exists=True)
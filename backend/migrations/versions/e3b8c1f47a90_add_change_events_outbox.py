@@ -0,0 +1,36 @@
+"""Add change_events outbox for live updates
+
+Revision ID: e3b8c1f47a90
+Revises: b41c7e2d9a58
+Create Date: 2026-10-19 18:42:07.516390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3b8c1f47a90'
+down_revision = 'b41c7e2d9a58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The table may already exist on databases built by create_db.py
+    if 'change_events' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            'change_events',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('event_type', sa.String(length=32), nullable=False),
+            sa.Column('data', sa.Text(), nullable=False),
+            sa.Column('roles', sa.String(length=64), nullable=False),
+            sa.Column('board_type', sa.String(length=32), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+        )
+    op.create_index('idx_change_events_created_at', 'change_events', ['created_at'], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('idx_change_events_created_at', table_name='change_events')
+    op.drop_table('change_events')
@@ -1,5 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from sqlalchemy import DDL, event, insert, inspect, select
 from sqlalchemy.exc import IntegrityError
 
 
@@ -104,6 +105,9 @@ class StudioClass(db.Model):
 
 class User(db.Model):
     __tablename__ = 'users'
+    __table_args__ = (
+        db.Index('idx_users_type_id', 'type', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     clerk_user_id = db.Column(db.String(128), unique=True, nullable=False)
@@ -158,19 +162,34 @@ class User(db.Model):
 
 class Membership(db.Model):
     __tablename__ = 'memberships'
+    __table_args__ = (
+        db.Index('idx_memberships_status_end_date', 'status', 'end_date'),
+    )
+    
+    # Statuses that still grant membership benefits; 'expired' is set by the scheduler sweep
+    CURRENT_STATUSES = ('active', 'pending_renewal')
+    
     id = db.Column(db.Integer, primary_key=True)
     membership_type = db.Column(db.String(64), nullable=False)  # e.g., 'monthly', 'annual', etc.
     start_date = db.Column(db.DateTime, nullable=False)
     end_date = db.Column(db.DateTime, nullable=True)
     cancelled = db.Column(db.Boolean, default=False, nullable=False)  # Track if membership was cancelled
+    status = db.Column(db.String(32), default='active', nullable=False)  # 'active', 'pending_renewal', 'expired'
 
     # Relationships - no backrefs to avoid conflicts
     students = db.relationship('Student', backref='membership')
 
     def is_active(self):
         from datetime import datetime
+        if self.status == 'expired':
+            return False
         now = datetime.utcnow()
         return self.start_date <= now and (self.end_date is None or self.end_date >= now)
+    
+    @classmethod
+    def current_predicate(cls):
+        """Indexed SQL filter for memberships not yet swept to 'expired'"""
+        return cls.status.in_(cls.CURRENT_STATUSES)
 
     def get_membership_id(self):
         return self.id
@@ -218,6 +237,9 @@ class Student(User):
         ).all()
         return [enrollment.class_instance for enrollment in past_enrollments]
 
+# Looks up the students holding swept memberships
+db.Index('idx_users_membership_id', Student.membership_id)
+
 class Staff(User):
     __mapper_args__ = {'polymorphic_identity': 'staff'}
     staff_type = db.Column(db.String(64), nullable=True)  # e.g., 'instructor', 'admin', 'management'
@@ -233,6 +255,34 @@ class Management(User):
     def __repr__(self):
         return f"<Management id={self.id} clerk_user_id={self.clerk_user_id} email={self.email} name={self.name} role={self.role}>"
 
+# Full-text index over users.name and users.email for instructor/user search. SQLite gets an
+# external-content FTS5 table kept in sync by triggers; PostgreSQL gets trigram GIN indexes.
+USER_SEARCH_DDL = {
+    'sqlite': [
+        """CREATE VIRTUAL TABLE IF NOT EXISTS users_fts
+           USING fts5(name, email, content='users', content_rowid='id', tokenize='unicode61 remove_diacritics 2')""",
+        """CREATE TRIGGER IF NOT EXISTS users_fts_ai AFTER INSERT ON users BEGIN
+               INSERT INTO users_fts(rowid, name, email) VALUES (new.id, new.name, new.email);
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS users_fts_ad AFTER DELETE ON users BEGIN
+               INSERT INTO users_fts(users_fts, rowid, name, email) VALUES ('delete', old.id, old.name, old.email);
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS users_fts_au AFTER UPDATE OF name, email ON users BEGIN
+               INSERT INTO users_fts(users_fts, rowid, name, email) VALUES ('delete', old.id, old.name, old.email);
+               INSERT INTO users_fts(rowid, name, email) VALUES (new.id, new.name, new.email);
+           END""",
+    ],
+    'postgresql': [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX IF NOT EXISTS idx_users_name_trgm ON users USING gin (lower(name) gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS idx_users_email_trgm ON users USING gin (lower(email) gin_trgm_ops)",
+    ],
+}
+
+for _dialect, _statements in USER_SEARCH_DDL.items():
+    for _statement in _statements:
+        event.listen(User.__table__, 'after_create', DDL(_statement).execute_if(dialect=_dialect))
+
 class BulletinBoard(db.Model):
     __tablename__ = 'bulletin_boards'
     id = db.Column(db.Integer, primary_key=True)
@@ -244,6 +294,10 @@ class BulletinBoard(db.Model):
 
 class Announcement(db.Model):
     __tablename__ = 'announcements'
+    __table_args__ = (
+        db.Index('idx_announcements_board_date_created', 'board_id', 'date_created'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
     body = db.Column(db.Text, nullable=False)
@@ -295,6 +349,12 @@ class SlidingScaleOption(db.Model):
 
 class Payment(db.Model):
     __tablename__ = 'payments'
+    __table_args__ = (
+        db.Index('idx_payments_stripe_session_id', 'stripe_session_id', unique=True),
+        db.Index('idx_payments_status_date', 'status', 'date'),
+        db.Index('idx_payments_student_id', 'student_id'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     amount = db.Column(db.Float, nullable=False)
     date = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
@@ -303,6 +363,9 @@ class Payment(db.Model):
     sliding_scale_option_id = db.Column(db.Integer, db.ForeignKey('sliding_scale_options.id'), nullable=False)
     instance_id = db.Column(db.String(50), db.ForeignKey('class_instances.instance_id'), nullable=True)
     class_name = db.Column(db.String(255), nullable=True)  # Store class name for reference
+    stripe_session_id = db.Column(db.String(255), nullable=True)  # Checkout Session that collects this payment
+    checkout_url = db.Column(db.Text, nullable=True)  # Hosted page of that session, handed out again while it is open
+    checkout_expires_at = db.Column(db.DateTime, nullable=True)  # When Stripe expires that session
 
     # Relationships - no backrefs to avoid conflicts
     sliding_scale_option = db.relationship('SlidingScaleOption')
@@ -328,6 +391,11 @@ class Payment(db.Model):
 
 class ClassInstance(db.Model):
     __tablename__ = 'class_instances'
+    __table_args__ = (
+        db.Index('idx_class_instances_end_time', 'end_time'),
+        db.Index('idx_class_instances_class_start', 'class_id', 'start_time'),
+        db.Index('idx_class_instances_cancelled_start', 'is_cancelled', 'start_time'),
+    )
     
     instance_id = db.Column(db.String(50), primary_key=True)  # Format: {class_id}_{YYYYMMDDHHMM}
     class_id = db.Column(db.Integer, db.ForeignKey('studio_classes.id'), nullable=False)
@@ -394,6 +462,11 @@ class ClassInstance(db.Model):
 
 class ClassEnrollment(db.Model):
     __tablename__ = 'class_enrollments'
+    __table_args__ = (
+        db.Index('idx_class_enrollments_status_instance', 'status', 'instance_id'),
+        db.Index('idx_class_enrollments_instance_change_seq', 'instance_id', 'change_seq'),
+        db.Index('idx_class_enrollments_student_instance_status', 'student_id', 'instance_id', 'status'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -405,6 +478,10 @@ class ClassEnrollment(db.Model):
     cancelled_at = db.Column(db.DateTime, nullable=True)
     attendance_marked_at = db.Column(db.DateTime, nullable=True)  # When attendance was marked
     marked_by_staff_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)  # Which staff marked attendance
+    change_seq = db.Column(db.Integer, nullable=False, default=0)  # Bumped from change_counters whenever a synced field changes
+    
+    # Fields whose changes are pushed to roster delta-sync clients
+    SYNCED_FIELDS = ('status', 'attendance_marked_at', 'cancelled_at')
     
     # Relationships - specify foreign_keys to avoid ambiguity
     payment = db.relationship('Payment', backref='enrollments')
@@ -429,8 +506,69 @@ class ClassEnrollment(db.Model):
         self.marked_by_staff_id = staff_id
         db.session.commit()
 
+class ChangeCounter(db.Model):
+    __tablename__ = 'change_counters'
+    
+    # One monotonically increasing counter per stream of changes (e.g. 'class_enrollments')
+    name = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<ChangeCounter name={self.name} value={self.value}>"
+
+def next_change_seq(connection, name: str = 'class_enrollments') -> int:
+    """Increment and return a change counter on the given connection
+    
+    The UPDATE locks the counter row until the transaction ends, so sequence numbers
+    become visible in the order they were handed out and a cursor never skips a change.
+    """
+    table = ChangeCounter.__table__
+    result = connection.execute(
+        table.update().where(table.c.name == name).values(value=table.c.value + 1)
+    )
+    if result.rowcount == 0:
+        connection.execute(table.insert().values(name=name, value=1))
+    return connection.execute(select(table.c.value).where(table.c.name == name)).scalar_one()
+
+def insert_ignore(table, index_elements):
+    """INSERT into a model or table that leaves rows conflicting on index_elements alone
+
+    Uses ON CONFLICT DO NOTHING on SQLite and Postgres; other databases get a plain INSERT.
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        return insert(table)
+    return dialect_insert(table).on_conflict_do_nothing(index_elements=index_elements)
+
+@event.listens_for(db.session, 'before_flush')
+def _stamp_enrollment_changes(session, flush_context, instances):
+    """Give new enrollments and enrollments with changed synced fields a fresh change_seq"""
+    changed = [obj for obj in session.new if isinstance(obj, ClassEnrollment)]
+    for obj in session.dirty:
+        if isinstance(obj, ClassEnrollment):
+            state = inspect(obj)
+            if any(state.attrs[field].history.has_changes() for field in ClassEnrollment.SYNCED_FIELDS):
+                changed.append(obj)
+    if changed:
+        change_seq = next_change_seq(session.connection())
+        for enrollment in changed:
+            enrollment.change_seq = change_seq
+
+@event.listens_for(db.session, 'before_flush')
+def _bump_option_catalog_version(session, flush_context, instances):
+    """Bump the sliding scale option catalog version whenever an option is added, edited or deleted"""
+    if any(isinstance(obj, SlidingScaleOption) for obj in (*session.new, *session.dirty, *session.deleted)):
+        next_change_seq(session.connection(), 'sliding_scale_options')
+
 class ClassCredit(db.Model):
     __tablename__ = 'class_credits'
+    __table_args__ = (
+        db.Index('idx_class_credits_student_used_created', 'student_id', 'used', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -460,3 +598,82 @@ class ClassCredit(db.Model):
     def is_available(self):
         """Check if this credit is available for use"""
         return not self.used
+
+class AttendanceRollup(db.Model):
+    __tablename__ = 'attendance_rollups'
+    __table_args__ = (
+        db.Index('idx_attendance_rollups_class_week', 'class_id', 'week_start'),
+        db.Index('idx_attendance_rollups_instructor_week', 'instructor_id', 'week_start'),
+        db.Index('idx_attendance_rollups_week', 'week_start'),
+    )
+    
+    # One row per class instance; template, instructor and week are copied from the
+    # instance when the row is created so reports never have to touch class_enrollments
+    instance_id = db.Column(db.String(50), db.ForeignKey('class_instances.instance_id'), primary_key=True)
+    class_id = db.Column(db.Integer, db.ForeignKey('studio_classes.id'), nullable=False)
+    instructor_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    week_start = db.Column(db.Date, nullable=False)  # Monday of the week the instance starts in
+    enrolled_count = db.Column(db.Integer, default=0, nullable=False)  # Still 'enrolled' (not yet marked)
+    attended_count = db.Column(db.Integer, default=0, nullable=False)
+    missed_count = db.Column(db.Integer, default=0, nullable=False)
+    cancelled_count = db.Column(db.Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<AttendanceRollup instance_id={self.instance_id} enrolled={self.enrolled_count} attended={self.attended_count} missed={self.missed_count} cancelled={self.cancelled_count}>"
+
+class RevenueRollup(db.Model):
+    __tablename__ = 'revenue_rollups'
+    __table_args__ = (
+        db.Index('idx_revenue_rollups_category_day', 'category', 'day'),
+        db.Index('idx_revenue_rollups_option_day', 'sliding_scale_option_id', 'day'),
+    )
+    
+    # Completed payments per day, sliding scale option and category; kept up to date as
+    # payments complete so revenue reports never scan payments
+    day = db.Column(db.Date, primary_key=True)  # Date of the payment (payments.date)
+    sliding_scale_option_id = db.Column(db.Integer, db.ForeignKey('sliding_scale_options.id'), primary_key=True)
+    category = db.Column(db.String(64), primary_key=True)  # Option category when the payment completed
+    payment_count = db.Column(db.Integer, default=0, nullable=False)
+    amount_total = db.Column(db.Float, default=0.0, nullable=False)
+
+    def __repr__(self):
+        return f"<RevenueRollup day={self.day} option={self.sliding_scale_option_id} category={self.category} payments={self.payment_count} amount={self.amount_total}>"
+
+class StripeWebhookEvent(db.Model):
+    __tablename__ = 'stripe_webhook_events'
+    __table_args__ = (
+        db.Index('idx_stripe_webhook_events_status_available', 'status', 'available_at'),
+    )
+    
+    # Verified Stripe events waiting to be applied by webhook_worker.py. The Stripe event id
+    # is the key, so a redelivered event is stored (and applied) only once.
+    event_id = db.Column(db.String(255), primary_key=True)
+    event_type = db.Column(db.String(128), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # Raw JSON body as signed by Stripe
+    status = db.Column(db.String(32), default='pending', nullable=False)  # 'pending', 'processing', 'processed', 'failed'
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    last_error = db.Column(db.Text, nullable=True)
+    received_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    available_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)  # Next retry, or end of a worker's claim
+    processed_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<StripeWebhookEvent event_id={self.event_id} type={self.event_type} status={self.status} attempts={self.attempts}>"
+
+class ChangeEvent(db.Model):
+    __tablename__ = 'change_events'
+    __table_args__ = (
+        db.Index('idx_change_events_created_at', 'created_at'),
+    )
+    
+    # Outbox of live-update events. Every process (web, scheduler, webhook worker) appends
+    # here and the web process relays new rows to /api/events subscribers in id order.
+    id = db.Column(db.Integer, primary_key=True)
+    event_type = db.Column(db.String(32), nullable=False)  # 'schedule', 'attendance', 'announcement', 'membership'
+    data = db.Column(db.Text, nullable=False)  # JSON payload sent to clients
+    roles = db.Column(db.String(64), nullable=False)  # Comma-separated roles allowed to see it
+    board_type = db.Column(db.String(32), nullable=True)  # Bulletin board, for announcement events
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<ChangeEvent id={self.id} type={self.event_type} roles={self.roles}>"
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Rebuild reporting rollup tables from the source tables (backfill or repair)
+
+The rollup tables must already exist (`flask --app app db upgrade`).
+
+Usage:
+    python rebuild_rollups.py
+    python rebuild_rollups.py attendance
+    python rebuild_rollups.py revenue
+"""
+
+import sys
+import os
+import argparse
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from services.attendance_rollup_service import AttendanceRollupService
+from services.revenue_rollup_service import RevenueRollupService
+
+def rebuild_attendance_rollups():
+    """Recompute attendance_rollups from class_enrollments"""
+    print("🔄 Rebuilding attendance rollups...")
+    count = AttendanceRollupService().rebuild()
+    print(f"✅ Rebuilt attendance rollups for {count} class instances")
+
+def rebuild_revenue_rollups():
+    """Recompute revenue_rollups from completed payments"""
+    print("🔄 Rebuilding revenue rollups...")
+    count = RevenueRollupService().rebuild()
+    print(f"✅ Rebuilt revenue rollups for {count} day/option/category groups")
+
+REBUILDERS = {
+    'attendance': rebuild_attendance_rollups,
+    'revenue': rebuild_revenue_rollups,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild reporting rollup tables")
+    parser.add_argument('rollups', nargs='*', help=f"rollups to rebuild: {', '.join(sorted(REBUILDERS))} (default: all)")
+    args = parser.parse_args()
+    # argparse rejects an empty list when choices= is combined with nargs='*', so check here
+    for name in args.rollups:
+        if name not in REBUILDERS:
+            parser.error(f"unknown rollup '{name}' (choose from {', '.join(sorted(REBUILDERS))})")
+
+    with app.app_context():
+        for name in args.rollups or sorted(REBUILDERS):
+            REBUILDERS[name]()
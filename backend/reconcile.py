@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Find (and optionally fix) payments, enrollments and credits that disagree with each other
+
+Checks:
+    paid_without_enrollment      completed class payments that never produced an enrollment
+    enrollment_missing_payment   enrollments pointing at a payment that does not exist
+    credit_missing_source        credits not backed by a cancelled enrollment
+
+Usage:
+    python reconcile.py                          # dry run: report only
+    python reconcile.py --apply                  # fix everything that can be fixed
+    python reconcile.py --check paid_without_enrollment --apply --json report.json
+"""
+
+import sys
+import os
+import json
+import argparse
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from services.reconciliation_service import ReconciliationService, CHECKS
+
+def print_report(report):
+    mode = "Dry run" if report['dry_run'] else "Applied"
+    print(f"📋 Reconciliation report ({mode}, {report['checked_at']})")
+    for check, result in report['checks'].items():
+        icon = '✅' if not result['found'] else '⚠️'
+        print(f"{icon} {check}: {result['found']} found, {result['fixable']} {'would be ' if report['dry_run'] else ''}fixed")
+        for change in result['changes']:
+            details = ', '.join(f"{key}={value}" for key, value in change.items() if key != 'action')
+            print(f"    - {change['action']}: {details}")
+        if result['changes_truncated']:
+            print(f"    ... {result['found'] - len(result['changes'])} more")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconcile payments, enrollments and credits")
+    parser.add_argument('--apply', action='store_true', help="fix the mismatches (default: report only)")
+    parser.add_argument('--check', action='append', choices=CHECKS, help="run only this check (repeatable)")
+    parser.add_argument('--json', metavar='PATH', help="also write the full report as JSON")
+    args = parser.parse_args()
+
+    with app.app_context():
+        report = ReconciliationService().reconcile(apply=args.apply, checks=args.check)
+
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"✅ Report written to {args.json}")
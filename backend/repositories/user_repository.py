@@ -1,7 +1,16 @@
-from typing import List, Optional
-from models import User
+import re
+from typing import List, Optional, Sequence
+from sqlalchemy import case, column, func, inspect, or_, table, text
+from sqlalchemy.orm import load_only
+from models import db, User
 from .sqlalchemy_repository import SQLAlchemyRepository
 
+# FTS5 index over users.name/email (see USER_SEARCH_DDL in models)
+_users_fts = table('users_fts', column('rowid'))
+
+# Engine URL -> whether the users_fts table exists (older databases may not be migrated yet)
+_fts_available = {}
+
 class UserRepository(SQLAlchemyRepository[User]):
     """Repository for User entities with domain-specific methods"""
     
@@ -24,12 +33,80 @@ class UserRepository(SQLAlchemyRepository[User]):
         """Find all managers"""
         return self.find_by(discriminator='manager')
     
-    def search_staff_by_name_or_email(self, query: str) -> List[User]:
+    def search_staff_by_name_or_email(self, query: str, limit: int = 20) -> List[User]:
         """Search staff members by name or email"""
-        return self.query().filter(
-            User.discriminator == 'staff',
-            (User.name.ilike(f"%{query}%")) | (User.email.ilike(f"%{query}%"))
-        ).all()
+        return self.search(query, user_type='staff', limit=limit)
+    
+    def search(self, query: str, user_type: Optional[str] = None, limit: int = 20) -> List[User]:
+        """Prefix search on name and email
+        
+        Every word of the query must prefix-match a word of the name or email. Users whose
+        name, then email, starts with the query rank first; the rest are ordered by FTS5
+        relevance on SQLite or by name elsewhere.
+        """
+        terms = re.findall(r'\w+', query.lower())
+        if not terms:
+            return []
+        
+        prefix = query.strip().lower()
+        prefix_rank = case(
+            (func.lower(User.name).startswith(prefix, autoescape=True), 0),
+            (func.lower(User.email).startswith(prefix, autoescape=True), 1),
+            else_=2
+        )
+        
+        if self._has_fts():
+            # FTS5 prefix query: "jan"* "doe"* matches "Jane Doe" and "jane.doe@example.com"
+            match = ' '.join(f'"{term}"*' for term in terms)
+            ids_query = db.session.query(User.id).join(
+                _users_fts, _users_fts.c.rowid == User.id
+            ).filter(
+                text("users_fts MATCH :match").bindparams(match=match)
+            ).order_by(prefix_rank, text("bm25(users_fts, 10.0, 1.0)"), User.name)
+        else:
+            # Trigram-indexed substring match (PostgreSQL) or a plain scan elsewhere
+            ids_query = db.session.query(User.id).filter(*[
+                or_(func.lower(User.name).contains(term, autoescape=True),
+                    func.lower(User.email).contains(term, autoescape=True))
+                for term in terms
+            ]).order_by(prefix_rank, User.name)
+        
+        if user_type:
+            ids_query = ids_query.filter(User.discriminator == user_type)
+        ids = [row[0] for row in ids_query.limit(limit).all()]
+        if not ids:
+            return []
+        
+        users = {user.id: user for user in self.query().filter(User.id.in_(ids)).all()}
+        return [users[user_id] for user_id in ids if user_id in users]
+    
+    @staticmethod
+    def _has_fts() -> bool:
+        engine = db.session.get_bind()
+        if engine.dialect.name != 'sqlite':
+            return False
+        key = str(engine.url)
+        if key not in _fts_available:
+            _fts_available[key] = inspect(engine).has_table('users_fts')
+        return _fts_available[key]
+    
+    def find_page(self, after_id: Optional[int] = None, limit: int = 100, role: Optional[str] = None,
+                  user_type: Optional[str] = None, columns: Optional[Sequence[str]] = None) -> List[User]:
+        """Find up to `limit` users with id greater than `after_id`, in id order
+        
+        `columns` restricts the loaded attributes with load_only; id and the type
+        discriminator are always loaded.
+        """
+        query = self.query()
+        if columns:
+            query = query.options(load_only(*[getattr(User, column) for column in columns]))
+        if role:
+            query = query.filter(User.role == role)
+        if user_type:
+            query = query.filter(User.discriminator == user_type)
+        if after_id is not None:
+            query = query.filter(User.id > after_id)
+        return query.order_by(User.id).limit(limit).all()
     
     def find_by_role(self, role: str) -> List[User]:
         """Find users by role"""
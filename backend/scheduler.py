@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Periodic maintenance jobs for the studio backend.
+
+Run all jobs on their schedules:
+    python scheduler.py
+
+Run a single job once (e.g. from cron):
+    python scheduler.py --once no-shows
+
+Settings (environment variables):
+    NO_SHOW_GRACE_MINUTES     minutes after a class ends before enrolled students are marked missed (default 30)
+    NO_SHOW_SWEEP_INTERVAL    seconds between no-show sweeps (default 300)
+    MEMBERSHIP_RENEWAL_NOTICE_DAYS  days before end_date a membership becomes pending renewal (default 3)
+    MEMBERSHIP_SWEEP_INTERVAL       seconds between membership expiry sweeps (default 3600)
+    PENDING_PAYMENT_TTL_HOURS       hours before a pending payment without a session expiry is expired (default 24)
+    PENDING_PAYMENT_SWEEP_INTERVAL  seconds between pending payment sweeps (default 3600)
+    SQLITE_OPTIMIZE_INTERVAL        seconds between PRAGMA optimize runs (default 3600)
+    SQLITE_ANALYZE_EVERY            run a full ANALYZE every Nth optimize run instead (default 24, 0 = never)
+    SQLITE_CHECKPOINT_INTERVAL      seconds between WAL checkpoints (default 300)
+    SQLITE_CHECKPOINT_MODE          PASSIVE, FULL, RESTART or TRUNCATE (default PASSIVE)
+"""
+
+import sys
+import os
+import time
+import argparse
+from datetime import timedelta
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from models import db
+from services import sqlite_tuning
+from services.attendance_service import AttendanceService
+from services.membership_service import MembershipService
+from services.payment_service import PaymentService
+
+
+class Job:
+    """A named maintenance task that runs every `interval` seconds"""
+
+    def __init__(self, name, interval, func):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.state = {}
+        self.next_run = 0.0
+
+    def run(self):
+        with app.app_context():
+            return self.func(self.state)
+
+
+def sweep_no_shows(state):
+    """Mark still-enrolled students of finished classes as missed"""
+    grace_minutes = int(os.getenv('NO_SHOW_GRACE_MINUTES', '30'))
+    swept, cutoff = AttendanceService().sweep_no_shows(grace_minutes, since=state.get('cutoff'))
+    state['cutoff'] = cutoff
+    return f"marked {swept} enrollments as missed"
+
+
+def sweep_memberships(state):
+    """Mark ended memberships expired and soon-ending ones pending renewal"""
+    notice_days = int(os.getenv('MEMBERSHIP_RENEWAL_NOTICE_DAYS', '3'))
+    counts = MembershipService().sweep_memberships(notice_days)
+    return f"expired {counts['expired']} memberships, {counts['pending_renewal']} pending renewal"
+
+
+def sweep_pending_payments(state):
+    """Expire pending payments whose Stripe Checkout Session can no longer be paid"""
+    ttl_hours = int(os.getenv('PENDING_PAYMENT_TTL_HOURS', '24'))
+    expired = PaymentService.expire_stale_payments(timedelta(hours=ttl_hours))
+    return f"expired {expired} pending payments"
+
+
+def optimize_sqlite(state):
+    """Keep query planner statistics fresh on SQLite"""
+    if db.engine.dialect.name != 'sqlite':
+        return "skipped (not SQLite)"
+    analyze_every = int(os.getenv('SQLITE_ANALYZE_EVERY', '24'))
+    state['runs'] = state.get('runs', 0) + 1
+    if analyze_every and state['runs'] % analyze_every == 0:
+        sqlite_tuning.analyze(db.engine)
+        return "ran ANALYZE"
+    sqlite_tuning.optimize(db.engine)
+    return "ran PRAGMA optimize"
+
+
+def checkpoint_sqlite(state):
+    """Fold the SQLite write-ahead log back into the database file"""
+    if db.engine.dialect.name != 'sqlite':
+        return "skipped (not SQLite)"
+    busy, log_frames, checkpointed = sqlite_tuning.checkpoint(db.engine, os.getenv('SQLITE_CHECKPOINT_MODE', 'PASSIVE'))
+    if log_frames < 0:
+        return "skipped (not in WAL mode)"
+    return f"checkpointed {checkpointed}/{log_frames} WAL frames" + (" (busy)" if busy else "")
+
+
+JOBS = {
+    'no-shows': Job('no-shows', int(os.getenv('NO_SHOW_SWEEP_INTERVAL', '300')), sweep_no_shows),
+    'memberships': Job('memberships', int(os.getenv('MEMBERSHIP_SWEEP_INTERVAL', '3600')), sweep_memberships),
+    'pending-payments': Job('pending-payments', int(os.getenv('PENDING_PAYMENT_SWEEP_INTERVAL', '3600')), sweep_pending_payments),
+    'sqlite-optimize': Job('sqlite-optimize', int(os.getenv('SQLITE_OPTIMIZE_INTERVAL', '3600')), optimize_sqlite),
+    'wal-checkpoint': Job('wal-checkpoint', int(os.getenv('SQLITE_CHECKPOINT_INTERVAL', '300')), checkpoint_sqlite),
+}
+
+
+def run_job(job):
+    try:
+        result = job.run()
+        print(f"[scheduler] ✅ {job.name}: {result}")
+    except Exception as e:
+        print(f"[scheduler] ❌ {job.name} failed: {e}")
+
+
+def run_forever():
+    print(f"[scheduler] 🕒 Running jobs: {', '.join(JOBS)}")
+    while True:
+        now = time.monotonic()
+        for job in JOBS.values():
+            if now >= job.next_run:
+                run_job(job)
+                job.next_run = now + job.interval
+        time.sleep(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run periodic maintenance jobs")
+    parser.add_argument('--once', choices=sorted(JOBS), help="run a single job once and exit")
+    args = parser.parse_args()
+
+    if args.once:
+        run_job(JOBS[args.once])
+    else:
+        run_forever()
@@ -0,0 +1,87 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import select, tuple_, union_all
+from models import db, Announcement, BulletinBoard, User
+
+class AnnouncementService:
+    """Service layer for bulletin board announcements"""
+    
+    DEFAULT_PAGE_SIZE = 50
+    MAX_PAGE_SIZE = 200
+    
+    def get_feed(self, board_types: List[str], limit: Optional[int] = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Get one keyset page of announcements from the given boards, newest first
+        
+        A single query: for each board, the next `limit` + 1 announcements are read in
+        order off the (board_id, date_created) index, and only those are merged, joined
+        with the board and author, and cut to the page. Returns the announcements and the
+        cursor for the next page (None on the last page). limit=None returns the whole feed
+        in one page.
+        """
+        if limit is not None and (limit < 1 or limit > self.MAX_PAGE_SIZE):
+            raise ValueError(f"limit must be between 1 and {self.MAX_PAGE_SIZE}")
+        board_types = list(dict.fromkeys(board_type.strip() for board_type in board_types if board_type.strip()))
+        if not board_types:
+            return {"announcements": [], "next_cursor": None}
+        after = self._parse_cursor(cursor) if cursor else None
+        
+        # Ask for one extra row to know whether another page exists
+        branches = []
+        for board_type in board_types:
+            board_id = select(BulletinBoard.id).where(
+                BulletinBoard.board_type == board_type
+            ).order_by(BulletinBoard.id).limit(1).scalar_subquery()
+            branch = select(
+                Announcement.id, Announcement.title, Announcement.body, Announcement.date_created,
+                Announcement.board_id, Announcement.author_id
+            ).where(Announcement.board_id == board_id)
+            if after:
+                branch = branch.where(tuple_(Announcement.date_created, Announcement.id) < after)
+            branch = branch.order_by(Announcement.date_created.desc(), Announcement.id.desc())
+            if limit is not None:
+                branch = branch.limit(limit + 1)
+            branches.append(select(branch.subquery()))
+        feed = union_all(*branches).subquery('feed')
+        
+        rows = db.session.execute(
+            select(
+                feed,
+                BulletinBoard.board_type,
+                User.id.label('author_user_id'),
+                User.name.label('author_name'),
+                User.role.label('author_role')
+            ).join(
+                BulletinBoard, BulletinBoard.id == feed.c.board_id
+            ).outerjoin(
+                User, User.id == feed.c.author_id
+            ).order_by(
+                feed.c.date_created.desc(), feed.c.id.desc()
+            ).limit(None if limit is None else limit + 1)
+        ).all()
+        
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = f"{rows[-1].date_created.isoformat()},{rows[-1].id}"
+        
+        return {
+            "announcements": [{
+                "id": row.id,
+                "title": row.title,
+                "body": row.body,
+                "date_created": row.date_created.isoformat(),
+                "author_name": row.author_name if row.author_user_id is not None else 'Unknown',
+                "author_role": row.author_role if row.author_user_id is not None else 'Unknown',
+                "board_type": row.board_type
+            } for row in rows],
+            "next_cursor": next_cursor
+        }
+    
+    @staticmethod
+    def _parse_cursor(cursor: str) -> Tuple[datetime, int]:
+        """Split a next_cursor ("<date_created>,<id>") back into its keys"""
+        try:
+            date_created, announcement_id = cursor.rsplit(',', 1)
+            return datetime.fromisoformat(date_created), int(announcement_id)
+        except ValueError:
+            raise ValueError("Invalid cursor")
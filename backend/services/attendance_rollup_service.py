@@ -0,0 +1,164 @@
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime, date, timedelta
+from sqlalchemy import delete, func, insert, update
+from models import db, insert_ignore, AttendanceRollup, ClassEnrollment, ClassInstance, StudioClass, User
+
+# Enrollment statuses that have a counter column on AttendanceRollup
+ROLLUP_COLUMNS = {
+    'enrolled': 'enrolled_count',
+    'attended': 'attended_count',
+    'missed': 'missed_count',
+    'cancelled': 'cancelled_count',
+}
+
+class AttendanceRollupService:
+    """Service for the incrementally maintained attendance rollups used by reporting"""
+
+    REPORT_GROUPINGS = ('instance', 'class', 'instructor', 'week')
+
+    def record_transition(self, instance_id: str, from_status: Optional[str], to_status: Optional[str], count: int = 1) -> None:
+        """Move `count` enrollments of an instance from one status bucket to another
+
+        Use from_status=None for a new booking. Does not commit: the counters change in the
+        same transaction as the enrollments they describe.
+        """
+        self.record_transitions(instance_id, {(from_status, to_status): count})
+
+    def record_transitions(self, instance_id: str, transitions: Dict[Tuple[Optional[str], Optional[str]], int]) -> None:
+        """Apply several (from_status, to_status) -> count moves for one instance in one UPDATE"""
+        deltas = {}
+        for (from_status, to_status), count in transitions.items():
+            if from_status == to_status or not count:
+                continue
+            if from_status in ROLLUP_COLUMNS:
+                deltas[from_status] = deltas.get(from_status, 0) - count
+            if to_status in ROLLUP_COLUMNS:
+                deltas[to_status] = deltas.get(to_status, 0) + count
+
+        deltas = {status: delta for status, delta in deltas.items() if delta}
+        if not deltas:
+            return
+
+        self._ensure_rollup(instance_id)
+        values = {}
+        for status, delta in deltas.items():
+            column_name = ROLLUP_COLUMNS[status]
+            values[column_name] = getattr(AttendanceRollup, column_name) + delta
+
+        db.session.execute(
+            update(AttendanceRollup)
+            .where(AttendanceRollup.instance_id == instance_id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+
+    def rebuild(self) -> int:
+        """Recompute every rollup from class_enrollments (backfill / repair)"""
+        try:
+            rows = db.session.query(
+                ClassInstance.instance_id,
+                ClassInstance.class_id,
+                ClassInstance.start_time,
+                StudioClass.instructor_id,
+                ClassEnrollment.status,
+                func.count(ClassEnrollment.id)
+            ).join(
+                StudioClass, StudioClass.id == ClassInstance.class_id
+            ).join(
+                ClassEnrollment, ClassEnrollment.instance_id == ClassInstance.instance_id
+            ).group_by(
+                ClassInstance.instance_id,
+                ClassInstance.class_id,
+                ClassInstance.start_time,
+                StudioClass.instructor_id,
+                ClassEnrollment.status
+            ).all()
+
+            rollups = {}
+            for instance_id, class_id, start_time, instructor_id, status, count in rows:
+                rollup = rollups.setdefault(instance_id, self._new_rollup_row(instance_id, class_id, instructor_id, start_time))
+                if status in ROLLUP_COLUMNS:
+                    rollup[ROLLUP_COLUMNS[status]] += count
+
+            db.session.execute(delete(AttendanceRollup))
+            if rollups:
+                db.session.execute(insert(AttendanceRollup), list(rollups.values()))
+            db.session.commit()
+            return len(rollups)
+
+        except Exception as e:
+            db.session.rollback()
+            raise e
+
+    def get_report(self, group_by: str = 'class', start_date: Optional[date] = None, end_date: Optional[date] = None) -> List[Dict[str, Any]]:
+        """Aggregate attendance counts by instance, class template, instructor or week"""
+        if group_by not in self.REPORT_GROUPINGS:
+            raise ValueError(f"group_by must be one of: {', '.join(self.REPORT_GROUPINGS)}")
+
+        totals = [
+            func.sum(AttendanceRollup.enrolled_count).label('enrolled'),
+            func.sum(AttendanceRollup.attended_count).label('attended'),
+            func.sum(AttendanceRollup.missed_count).label('missed'),
+            func.sum(AttendanceRollup.cancelled_count).label('cancelled'),
+        ]
+
+        if group_by == 'instance':
+            keys = [AttendanceRollup.instance_id, AttendanceRollup.class_id, StudioClass.class_name, AttendanceRollup.week_start]
+            query = db.session.query(*keys, *totals).join(StudioClass, StudioClass.id == AttendanceRollup.class_id)
+        elif group_by == 'class':
+            keys = [AttendanceRollup.class_id, StudioClass.class_name]
+            query = db.session.query(*keys, *totals).join(StudioClass, StudioClass.id == AttendanceRollup.class_id)
+        elif group_by == 'instructor':
+            keys = [AttendanceRollup.instructor_id, User.name.label('instructor_name')]
+            query = db.session.query(*keys, *totals).outerjoin(User, User.id == AttendanceRollup.instructor_id)
+        else:
+            keys = [AttendanceRollup.week_start]
+            query = db.session.query(*keys, *totals)
+
+        if start_date:
+            query = query.filter(AttendanceRollup.week_start >= start_date)
+        if end_date:
+            query = query.filter(AttendanceRollup.week_start <= end_date)
+
+        report = []
+        for row in query.group_by(*keys).order_by(*keys).all():
+            entry = row._asdict()
+            for key, value in entry.items():
+                if isinstance(value, date):
+                    entry[key] = value.isoformat()
+            marked = (entry['attended'] or 0) + (entry['missed'] or 0)
+            entry['total_bookings'] = sum(entry[status] or 0 for status in ROLLUP_COLUMNS)
+            entry['attendance_rate'] = round(entry['attended'] / marked, 4) if marked else None
+            report.append(entry)
+        return report
+
+    def _ensure_rollup(self, instance_id: str) -> None:
+        """Create the zeroed rollup row for an instance if it does not exist yet"""
+        if db.session.get(AttendanceRollup, instance_id) is not None:
+            return
+
+        row = db.session.query(
+            ClassInstance.class_id,
+            ClassInstance.start_time,
+            StudioClass.instructor_id
+        ).join(
+            StudioClass, StudioClass.id == ClassInstance.class_id
+        ).filter(ClassInstance.instance_id == instance_id).first()
+        if not row:
+            raise ValueError("Class instance not found")
+
+        values = self._new_rollup_row(instance_id, row.class_id, row.instructor_id, row.start_time)
+        db.session.execute(insert_ignore(AttendanceRollup, ['instance_id']).values(**values))
+
+    @staticmethod
+    def _new_rollup_row(instance_id: str, class_id: int, instructor_id: Optional[int], start_time: datetime) -> Dict[str, Any]:
+        return {
+            'instance_id': instance_id,
+            'class_id': class_id,
+            'instructor_id': instructor_id,
+            'week_start': (start_time - timedelta(days=start_time.weekday())).date(),
+            'enrolled_count': 0,
+            'attended_count': 0,
+            'missed_count': 0,
+            'cancelled_count': 0,
+        }
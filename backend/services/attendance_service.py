@@ -1,8 +1,12 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
-from models import db, ClassEnrollment, ClassInstance, User, StudioClass
+from sqlalchemy import case, func, select, update
+from models import db, ClassEnrollment, ClassInstance, User, StudioClass, next_change_seq
 from repositories.user_repository import UserRepository
 from repositories.class_repository import StudioClassRepository, ClassInstanceRepository
+from services.attendance_rollup_service import AttendanceRollupService
+from services.staff_authorization_service import StaffAuthorizationService
+from services.events import attendance_changed
 
 class AttendanceService:
     """Service for managing class attendance"""
@@ -11,6 +15,8 @@ class AttendanceService:
         self.user_repository = UserRepository()
         self.studio_class_repository = StudioClassRepository()
         self.class_instance_repository = ClassInstanceRepository()
+        self.rollup_service = AttendanceRollupService()
+        self.staff_authorization_service = StaffAuthorizationService()
     
     def get_staff_assigned_classes(self, staff_id: int) -> List[Dict[str, Any]]:
         """Get upcoming classes assigned to a staff member (as instructor or assigned staff)"""
@@ -20,17 +26,9 @@ class AttendanceService:
             if not staff_user or staff_user.discriminator != 'staff':
                 raise ValueError("Staff member not found")
             
-            # Get classes where staff is instructor
-            instructor_classes = StudioClass.query.filter_by(instructor_id=staff_id).all()
-            
-            # Get classes where staff is assigned (not instructor)
-            assigned_classes = []
-            for studio_class in StudioClass.query.all():
-                if staff_user in studio_class.assigned_staff:
-                    assigned_classes.append(studio_class)
-            
-            # Combine and get upcoming instances
-            all_classes = instructor_classes + assigned_classes
+            # Get classes where staff is instructor or assigned staff
+            class_ids = self.staff_authorization_service.get_authorized_class_ids(staff_id)
+            all_classes = StudioClass.query.filter(StudioClass.id.in_(class_ids)).all() if class_ids else []
             upcoming_instances = []
             
             for studio_class in all_classes:
@@ -41,26 +39,14 @@ class AttendanceService:
                     ClassInstance.is_cancelled == False
                 ).order_by(ClassInstance.start_time).all()
                 
+                # Get ALL students (enrolled, attended, and missed) - not just enrolled
+                rosters = self._load_rosters([instance.instance_id for instance in instances])
+                
                 for instance in instances:
-                    # Get ALL students (enrolled, attended, and missed) - not just enrolled
-                    enrollments = ClassEnrollment.query.filter(
-                        ClassEnrollment.instance_id == instance.instance_id,
-                        ClassEnrollment.status.in_(['enrolled', 'attended', 'missed'])
-                    ).all()
-                    
-                    # Get student details
-                    students = []
-                    for enrollment in enrollments:
-                        student = self.user_repository.get_by_id(enrollment.student_id)
-                        if student:
-                            students.append({
-                                'id': student.id,
-                                'name': student.name,
-                                'email': student.email,
-                                'enrollment_id': enrollment.id,
-                                'status': enrollment.status,
-                                'attendance_marked_at': enrollment.attendance_marked_at.isoformat() if enrollment.attendance_marked_at else None
-                            })
+                    students = [
+                        {key: value for key, value in student.items() if key != 'marked_by_staff_id'}
+                        for student in rosters.get(instance.instance_id, [])
+                    ]
                     
                     # Always include assigned classes for staff, even if no students
                     upcoming_instances.append({
@@ -143,32 +129,24 @@ class AttendanceService:
             if not staff_user or staff_user.discriminator != 'staff':
                 raise ValueError("Staff member not found")
             
-            # Get enrollment
-            enrollment = ClassEnrollment.query.get(enrollment_id)
-            if not enrollment:
+            # Get enrollment together with its instance's class and start time
+            row = db.session.query(
+                ClassEnrollment,
+                ClassInstance.class_id,
+                ClassInstance.start_time
+            ).join(
+                ClassInstance, ClassInstance.instance_id == ClassEnrollment.instance_id
+            ).filter(ClassEnrollment.id == enrollment_id).first()
+            if not row:
                 raise ValueError("Enrollment not found")
-            
-            # Get class instance to check if staff is authorized
-            instance = ClassInstance.query.get(enrollment.instance_id)
-            if not instance:
-                raise ValueError("Class instance not found")
-            
-            studio_class = StudioClass.query.get(instance.class_id)
-            if not studio_class:
-                raise ValueError("Studio class not found")
+            enrollment, class_id, class_start_time = row
             
             # Check if staff is authorized (instructor or assigned staff)
-            is_authorized = (
-                studio_class.instructor_id == staff_id or 
-                staff_user in studio_class.assigned_staff
-            )
-            
-            if not is_authorized:
+            if not self.staff_authorization_service.is_authorized(staff_id, class_id):
                 raise ValueError("Staff member not authorized to mark attendance for this class")
             
             # Check if class has started (for "missed" status)
             if status == 'missed':
-                class_start_time = instance.start_time
                 current_time = datetime.utcnow()
                 time_diff = current_time - class_start_time
                 
@@ -176,69 +154,259 @@ class AttendanceService:
                     raise ValueError("Cannot mark as 'missed' until 15 minutes after class start time")
             
             # Mark attendance
+            self.rollup_service.record_transition(enrollment.instance_id, enrollment.status, status)
             enrollment.mark_attendance(status, staff_id)
+            attendance_changed.send(None, instance_ids=[enrollment.instance_id])
             return True
             
         except Exception as e:
             db.session.rollback()
             raise e
     
-    def get_class_roster(self, instance_id: str, staff_id: int) -> Dict[str, Any]:
-        """Get roster for a specific class instance"""
+    def mark_bulk_attendance(self, instance_id: str, marks: List[Dict[str, Any]], staff_id: int) -> int:
+        """Mark attendance for several enrollments of one class instance in a single statement"""
         try:
             # Verify staff member
             staff_user = self.user_repository.get_by_id(staff_id)
             if not staff_user or staff_user.discriminator != 'staff':
                 raise ValueError("Staff member not found")
             
-            # Get class instance
+            # Get class instance once for the whole batch
             instance = ClassInstance.query.get(instance_id)
             if not instance:
                 raise ValueError("Class instance not found")
             
-            studio_class = StudioClass.query.get(instance.class_id)
-            if not studio_class:
-                raise ValueError("Studio class not found")
+            # Check if staff is authorized (instructor or assigned staff)
+            if not self.staff_authorization_service.is_authorized(staff_id, instance.class_id):
+                raise ValueError("Staff member not authorized to mark attendance for this class")
             
-            # Check if staff is authorized
-            is_authorized = (
-                studio_class.instructor_id == staff_id or 
-                staff_user in studio_class.assigned_staff
+            # Collapse the batch to one status per enrollment (last entry wins)
+            statuses = {}
+            for mark in marks:
+                enrollment_id = mark.get('enrollment_id')
+                status = mark.get('status')
+                if not enrollment_id or status not in ['attended', 'missed']:
+                    raise ValueError("Each mark needs an enrollment_id and a status of 'attended' or 'missed'")
+                statuses[int(enrollment_id)] = status
+            
+            if not statuses:
+                return 0
+            
+            # Check if class has started (for "missed" status)
+            if 'missed' in statuses.values():
+                time_diff = datetime.utcnow() - instance.start_time
+                if time_diff < timedelta(minutes=15):
+                    raise ValueError("Cannot mark as 'missed' until 15 minutes after class start time")
+            
+            # Every enrollment must belong to this instance's roster
+            current_statuses = dict(
+                db.session.query(ClassEnrollment.id, ClassEnrollment.status).filter(
+                    ClassEnrollment.instance_id == instance_id,
+                    ClassEnrollment.id.in_(statuses.keys()),
+                    ClassEnrollment.status.in_(['enrolled', 'attended', 'missed'])
+                ).all()
             )
+            unknown_ids = sorted(set(statuses) - set(current_statuses))
+            if unknown_ids:
+                raise ValueError(f"Enrollments not found on this class roster: {unknown_ids}")
+            
+            transitions = {}
+            for enrollment_id, status in statuses.items():
+                key = (current_statuses[enrollment_id], status)
+                transitions[key] = transitions.get(key, 0) + 1
+            self.rollup_service.record_transitions(instance_id, transitions)
             
-            if not is_authorized:
+            # Mark attendance for the whole batch in one UPDATE and one commit
+            result = db.session.execute(
+                update(ClassEnrollment)
+                .where(
+                    ClassEnrollment.instance_id == instance_id,
+                    ClassEnrollment.id.in_(statuses.keys())
+                )
+                .values(
+                    status=case(statuses, value=ClassEnrollment.id),
+                    attendance_marked_at=datetime.utcnow(),
+                    marked_by_staff_id=staff_id,
+                    change_seq=next_change_seq(db.session.connection())
+                )
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            attendance_changed.send(None, instance_ids=[instance_id])
+            return result.rowcount
+            
+        except Exception as e:
+            db.session.rollback()
+            raise e
+    
+    def sweep_no_shows(self, grace_minutes: int = 30, since: Optional[datetime] = None) -> Tuple[int, datetime]:
+        """Mark still-enrolled students as 'missed' once a class has been over for grace_minutes
+        
+        Only instances whose end_time falls after `since` are considered, so a scheduler that
+        passes back the previous cutoff only touches classes that finished since its last run.
+        Returns the number of enrollments swept and the cutoff to use as the next `since`.
+        """
+        try:
+            now = datetime.utcnow()
+            cutoff = now - timedelta(minutes=grace_minutes)
+            
+            # Instances that finished (plus grace period) since the last sweep
+            finished_instances = select(ClassInstance.instance_id).where(
+                ClassInstance.end_time <= cutoff,
+                ClassInstance.is_cancelled == False
+            )
+            if since is not None:
+                finished_instances = finished_instances.where(ClassInstance.end_time > since)
+            
+            no_shows = db.session.query(
+                ClassEnrollment.instance_id,
+                func.count(ClassEnrollment.id)
+            ).filter(
+                ClassEnrollment.status == 'enrolled',
+                ClassEnrollment.instance_id.in_(finished_instances)
+            ).group_by(ClassEnrollment.instance_id).all()
+            
+            result = db.session.execute(
+                update(ClassEnrollment)
+                .where(
+                    ClassEnrollment.status == 'enrolled',
+                    ClassEnrollment.instance_id.in_(finished_instances)
+                )
+                .values(status='missed', attendance_marked_at=now, change_seq=next_change_seq(db.session.connection()))
+                .execution_options(synchronize_session=False)
+            )
+            for instance_id, count in no_shows:
+                self.rollup_service.record_transition(instance_id, 'enrolled', 'missed', count)
+            db.session.commit()
+            if no_shows:
+                attendance_changed.send(None, instance_ids=[instance_id for instance_id, _ in no_shows])
+            return result.rowcount, cutoff
+            
+        except Exception as e:
+            db.session.rollback()
+            raise e
+    
+    def get_class_roster(self, instance_id: str, staff_id: int, since: Optional[int] = None) -> Dict[str, Any]:
+        """Get roster for a specific class instance
+        
+        Every roster carries a `cursor`. Passing it back as `since` returns only the enrollments
+        (including cancelled ones) whose status, attendance_marked_at or cancelled_at changed
+        after it, plus the cursor for the next poll.
+        """
+        try:
+            # Verify staff member
+            staff_user = self.user_repository.get_by_id(staff_id)
+            if not staff_user or staff_user.discriminator != 'staff':
+                raise ValueError("Staff member not found")
+            
+            # Get class instance and its class name
+            row = db.session.query(ClassInstance, StudioClass.class_name).join(
+                StudioClass, StudioClass.id == ClassInstance.class_id
+            ).filter(ClassInstance.instance_id == instance_id).first()
+            if not row:
+                raise ValueError("Class instance not found")
+            instance, class_name = row
+            
+            # Check if staff is authorized
+            if not self.staff_authorization_service.is_authorized(staff_id, instance.class_id):
                 raise ValueError("Staff member not authorized to view this class roster")
             
-            # Get enrollments
-            enrollments = ClassEnrollment.query.filter(
-                ClassEnrollment.instance_id == instance_id,
-                ClassEnrollment.status.in_(['enrolled', 'attended', 'missed'])
-            ).all()
+            if since is not None:
+                return self._get_roster_changes(instance_id, since)
             
-            # Get student details
-            students = []
-            for enrollment in enrollments:
-                student = self.user_repository.get_by_id(enrollment.student_id)
-                if student:
-                    students.append({
-                        'id': student.id,
-                        'name': student.name,
-                        'email': student.email,
-                        'enrollment_id': enrollment.id,
-                        'status': enrollment.status,
-                        'attendance_marked_at': enrollment.attendance_marked_at.isoformat() if enrollment.attendance_marked_at else None,
-                        'marked_by_staff_id': enrollment.marked_by_staff_id
-                    })
+            # Read the cursor first: a change landing in between shows up again on the next poll
+            cursor = db.session.query(func.max(ClassEnrollment.change_seq)).filter(
+                ClassEnrollment.instance_id == instance_id
+            ).scalar() or 0
+            
+            # Get enrollments with student details
+            students = self._load_rosters([instance_id]).get(instance_id, [])
             
             return {
                 'instance_id': instance_id,
-                'class_name': studio_class.class_name,
+                'class_name': class_name,
                 'start_time': instance.start_time.isoformat(),
                 'end_time': instance.end_time.isoformat(),
                 'students': students,
                 'total_enrolled': len(students),
-                'max_capacity': instance.max_capacity
+                'max_capacity': instance.max_capacity,
+                'cursor': cursor
             }
             
         except Exception as e:
-            raise e 
\ No newline at end of file
+            raise e
+    
+    def _get_roster_changes(self, instance_id: str, since: int) -> Dict[str, Any]:
+        """Load enrollments of an instance changed after `since` using the (instance_id, change_seq) index"""
+        rows = db.session.query(
+            ClassEnrollment.id,
+            ClassEnrollment.status,
+            ClassEnrollment.attendance_marked_at,
+            ClassEnrollment.cancelled_at,
+            ClassEnrollment.marked_by_staff_id,
+            ClassEnrollment.change_seq,
+            User.id,
+            User.name,
+            User.email
+        ).join(
+            User, User.id == ClassEnrollment.student_id
+        ).filter(
+            ClassEnrollment.instance_id == instance_id,
+            ClassEnrollment.change_seq > since
+        ).order_by(ClassEnrollment.change_seq, ClassEnrollment.id).all()
+        
+        changes = []
+        cursor = since
+        for enrollment_id, status, marked_at, cancelled_at, marked_by, change_seq, student_id, name, email in rows:
+            changes.append({
+                'id': student_id,
+                'name': name,
+                'email': email,
+                'enrollment_id': enrollment_id,
+                'status': status,
+                'attendance_marked_at': marked_at.isoformat() if marked_at else None,
+                'cancelled_at': cancelled_at.isoformat() if cancelled_at else None,
+                'marked_by_staff_id': marked_by
+            })
+            cursor = max(cursor, change_seq)
+        
+        return {
+            'instance_id': instance_id,
+            'since': since,
+            'cursor': cursor,
+            'changes': changes
+        }
+    
+    def _load_rosters(self, instance_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Load enrolled/attended/missed students for several instances in one joined query"""
+        rosters = {instance_id: [] for instance_id in instance_ids}
+        if not instance_ids:
+            return rosters
+        
+        rows = db.session.query(
+            ClassEnrollment.instance_id,
+            ClassEnrollment.id,
+            ClassEnrollment.status,
+            ClassEnrollment.attendance_marked_at,
+            ClassEnrollment.marked_by_staff_id,
+            User.id,
+            User.name,
+            User.email
+        ).join(
+            User, User.id == ClassEnrollment.student_id
+        ).filter(
+            ClassEnrollment.instance_id.in_(instance_ids),
+            ClassEnrollment.status.in_(['enrolled', 'attended', 'missed'])
+        ).order_by(ClassEnrollment.id).all()
+        
+        for instance_id, enrollment_id, status, marked_at, marked_by, student_id, name, email in rows:
+            rosters[instance_id].append({
+                'id': student_id,
+                'name': name,
+                'email': email,
+                'enrollment_id': enrollment_id,
+                'status': status,
+                'attendance_marked_at': marked_at.isoformat() if marked_at else None,
+                'marked_by_staff_id': marked_by
+            })
+        return rosters 
\ No newline at end of file
@@ -1,9 +1,13 @@
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
-from models import StudioClass, ClassInstance, User, db
+from sqlalchemy import func, select
+from models import StudioClass, ClassInstance, ClassEnrollment, User, db
 from repositories.class_repository import StudioClassRepository, ClassInstanceRepository
 from repositories.user_repository import UserRepository
 from services.credit_service import CreditService
+from services.attendance_rollup_service import AttendanceRollupService
+from services.staff_authorization_service import StaffAuthorizationService
+from services.events import schedule_changed
 import calendar
 
 class ClassService:
@@ -14,6 +18,7 @@ class ClassService:
         self.class_instance_repository = ClassInstanceRepository()
         self.user_repository = UserRepository()
         self.credit_service = CreditService()
+        self.rollup_service = AttendanceRollupService()
     
     def get_all_classes(self) -> List[StudioClass]:
         """Get all active studio classes"""
@@ -67,9 +72,11 @@ class ClassService:
         
         # Save to database
         studio_class = self.studio_class_repository.create(studio_class)
+        StaffAuthorizationService.invalidate(studio_class.instructor_id)
         
         # Create class instances
         self._create_class_instances(studio_class)
+        schedule_changed.send(None, change='class_created', class_id=studio_class.id)
         
         return studio_class
     
@@ -80,7 +87,9 @@ class ClassService:
     def delete_studio_class(self, studio_class: StudioClass) -> bool:
         """Delete a studio class (soft delete)"""
         studio_class.deleted_at = datetime.now()
-        return self.studio_class_repository.update(studio_class) is not None
+        deleted = self.studio_class_repository.update(studio_class) is not None
+        schedule_changed.send(None, change='class_deleted', class_id=studio_class.id)
+        return deleted
     
     def get_classes_by_instructor(self, instructor_id: int) -> List[StudioClass]:
         """Get classes by instructor"""
@@ -94,12 +103,72 @@ class ClassService:
         """Get all upcoming class instances"""
         return self.class_instance_repository.find_future_instances()
     
+    def get_booking_states(self, instance_ids: List[str], student_id: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """Get start time and capacity state of many instances with one IN query
+        
+        If student_id is given, each state also says whether that student is already enrolled.
+        Unknown instance ids are left out of the result.
+        """
+        if not instance_ids:
+            return {}
+        
+        enrolled_counts = select(
+            ClassEnrollment.instance_id,
+            func.count(ClassEnrollment.id).label('enrolled_count')
+        ).where(
+            ClassEnrollment.status == 'enrolled',
+            ClassEnrollment.instance_id.in_(instance_ids)
+        ).group_by(ClassEnrollment.instance_id).subquery()
+        
+        rows = db.session.query(
+            ClassInstance.instance_id,
+            ClassInstance.start_time,
+            ClassInstance.max_capacity,
+            ClassInstance.is_cancelled,
+            StudioClass.class_name,
+            func.coalesce(enrolled_counts.c.enrolled_count, 0)
+        ).join(
+            StudioClass, StudioClass.id == ClassInstance.class_id
+        ).outerjoin(
+            enrolled_counts, enrolled_counts.c.instance_id == ClassInstance.instance_id
+        ).filter(ClassInstance.instance_id.in_(instance_ids)).all()
+        
+        enrolled_instance_ids = set()
+        if student_id is not None:
+            enrolled_instance_ids = set(db.session.execute(
+                select(ClassEnrollment.instance_id).where(
+                    ClassEnrollment.student_id == student_id,
+                    ClassEnrollment.status == 'enrolled',
+                    ClassEnrollment.instance_id.in_(instance_ids)
+                )
+            ).scalars())
+        
+        states = {}
+        for instance_id, start_time, max_capacity, is_cancelled, class_name, enrolled_count in rows:
+            states[instance_id] = {
+                'instance_id': instance_id,
+                'class_name': class_name,
+                'start_time': start_time,
+                'max_capacity': max_capacity,
+                'enrolled_count': enrolled_count,
+                'spots_left': max(max_capacity - enrolled_count, 0),
+                'is_full': enrolled_count >= max_capacity,
+                'is_cancelled': bool(is_cancelled),
+                'is_enrolled': instance_id in enrolled_instance_ids
+            }
+        return states
+    
     def get_class_templates(self) -> List[StudioClass]:
         """Get all studio class templates"""
         return self.studio_class_repository.get_all()
     
-    def book_class(self, student_id: int, instance_id: str, payment_id: Optional[int] = None, payment_type: str = 'drop-in') -> bool:
-        """Book a class for a student"""
+    def book_class(self, student_id: int, instance_id: str, payment_id: Optional[int] = None, payment_type: str = 'drop-in',
+                   commit: bool = True) -> bool:
+        """Book a class for a student
+
+        With commit=False the enrollment is only flushed, so the caller can commit it together
+        with its own changes (and announce the booking once it has).
+        """
         try:
             print(f"[book_class] 🟣 Attempting to register user {student_id} for class {instance_id} (payment_id={payment_id}, payment_type={payment_type})")
             instance = self.get_instance_by_id(instance_id)
@@ -155,9 +224,15 @@ class ClassService:
             print(f"[book_class] 📝   - status: {enrollment.status}")
             
             db.session.add(enrollment)
+            self.rollup_service.record_transition(instance_id, None, 'enrolled')
+            if not commit:
+                db.session.flush()
+                print(f"[book_class] ✅ Booking entry flushed: enrollment_id={enrollment.id}")
+                return True
             db.session.commit()
             
             print(f"[book_class] ✅ Booking entry saved: enrollment_id={enrollment.id}")
+            schedule_changed.send(None, change='booked', class_id=instance.class_id, instance_ids=[instance_id])
             
             # Verify the enrollment was actually saved
             saved_enrollment = ClassEnrollment.query.get(enrollment.id)
@@ -206,11 +281,18 @@ class ClassService:
             if studio_class and studio_class.instructor_id == staff_id:
                 raise ValueError("Staff member cannot book a class they are instructing")
             
-            # Add staff member to class (no payment required)
-            instance.add_student(staff_id, None)
+            # Add staff member to class (no payment required); committed together with the rollup
+            db.session.add(ClassEnrollment(
+                student_id=staff_id,
+                instance_id=instance_id,
+                payment_id=None,
+                status='enrolled'
+            ))
+            self.rollup_service.record_transition(instance_id, None, 'enrolled')
+            db.session.commit()
+            schedule_changed.send(None, change='booked', class_id=instance.class_id, instance_ids=[instance_id])
             return True
         except Exception as e:
-            from models import db
             db.session.rollback()
             raise e
     
@@ -229,6 +311,7 @@ class ClassService:
             
             enrollment.status = 'cancelled'
             enrollment.cancelled_at = datetime.now()
+            self.rollup_service.record_transition(instance_id, 'enrolled', 'cancelled')
             
             # Add credit if eligible (drop-in payment)
             credit = self.credit_service.add_credit_for_cancellation(
@@ -237,6 +320,7 @@ class ClassService:
             )
             
             db.session.commit()
+            schedule_changed.send(None, change='booking_cancelled', instance_ids=[instance_id])
             return True
         except Exception as e:
             db.session.rollback()
@@ -262,6 +346,7 @@ class ClassService:
                 raise ValueError("Staff member not found")
             
             studio_class.add_staff_member(staff_member)
+            StaffAuthorizationService.invalidate(staff_id)
             return True
         except Exception as e:
             raise e
@@ -278,6 +363,7 @@ class ClassService:
                 raise ValueError("Staff member not found")
             
             studio_class.remove_staff_member(staff_member)
+            StaffAuthorizationService.invalidate(staff_id)
             return True
         except Exception as e:
             raise e
@@ -293,8 +379,10 @@ class ClassService:
             if not instructor or instructor.discriminator != 'staff':
                 raise ValueError("Instructor not found")
             
+            old_instructor_id = studio_class.instructor_id
             studio_class.instructor_id = new_instructor_id
             self.studio_class_repository.update(studio_class)
+            StaffAuthorizationService.invalidate(old_instructor_id, new_instructor_id)
             return True
         except Exception as e:
             raise e
@@ -450,6 +538,7 @@ class ClassService:
                 instance_id=instance_id,
                 status='enrolled'
             ).all()
+            self.rollup_service.record_transition(instance_id, 'enrolled', 'cancelled', len(enrollments))
             
             for enrollment in enrollments:
                 enrollment.status = 'cancelled'
@@ -462,6 +551,7 @@ class ClassService:
                 )
             
             db.session.commit()
+            schedule_changed.send(None, change='instance_cancelled', class_id=instance.class_id, instance_ids=[instance_id])
             return True
             
         except Exception as e:
@@ -499,6 +589,7 @@ class ClassService:
                     instance_id=instance.instance_id,
                     status='enrolled'
                 ).all()
+                self.rollup_service.record_transition(instance.instance_id, 'enrolled', 'cancelled', len(enrollments))
                 
                 for enrollment in enrollments:
                     enrollment.status = 'cancelled'
@@ -511,6 +602,8 @@ class ClassService:
                     )
             
             db.session.commit()
+            schedule_changed.send(None, change='instance_cancelled', class_id=studio_class.id,
+                                  instance_ids=[instance.instance_id for instance in future_instances])
             return True
             
         except Exception as e:
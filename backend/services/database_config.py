@@ -0,0 +1,42 @@
+import os
+from typing import Any, Dict
+from sqlalchemy.engine import make_url
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATABASE_URL = f"sqlite:///{os.path.join(BACKEND_DIR, 'instance', 'db.sqlite3')}"
+
+
+def database_uri() -> str:
+    """DATABASE_URL (default: the SQLite file in backend/instance) in a form SQLAlchemy accepts
+
+    Relative SQLite paths are taken from the backend directory, the same place the
+    maintenance scripts run from, and Heroku-style postgres:// URLs are accepted.
+    """
+    url = os.getenv('DATABASE_URL') or DEFAULT_DATABASE_URL
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    parsed = make_url(url)
+    if parsed.get_backend_name() == 'sqlite' and parsed.database and parsed.database != ':memory:' \
+            and not parsed.database.startswith('file:') and not os.path.isabs(parsed.database):
+        parsed = parsed.set(database=os.path.join(BACKEND_DIR, parsed.database))
+        url = parsed.render_as_string(hide_password=False)
+    return url
+
+
+def engine_options(uri: str) -> Dict[str, Any]:
+    """Connection pool settings for SQLALCHEMY_ENGINE_OPTIONS
+
+    DB_POOL_SIZE (default 5), DB_MAX_OVERFLOW (default 10), DB_POOL_TIMEOUT (seconds to wait
+    for a free connection, default 30), DB_POOL_RECYCLE (seconds before a connection is
+    replaced, default 1800) and DB_POOL_PRE_PING (default true) apply to server databases.
+    SQLite keeps SQLAlchemy's own pooling; its connections are tuned in services/sqlite_tuning.py.
+    """
+    if make_url(uri).get_backend_name() == 'sqlite':
+        return {}
+    return {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', '5')),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '10')),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', '30')),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800')),
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes'),
+    }
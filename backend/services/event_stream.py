@@ -0,0 +1,246 @@
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, Optional
+from sqlalchemy import delete, func, insert, select
+from models import db, ChangeEvent
+from services.events import announcement_changed, attendance_changed, membership_status_changed, schedule_changed
+
+# Bulletin boards each role reads (matches what the dashboards request)
+BOARD_ACCESS = {
+    'student': ('student', 'all'),
+    'staff': ('student', 'staff', 'all'),
+    'management': ('student', 'staff', 'all'),
+}
+ALL_ROLES = tuple(BOARD_ACCESS)
+
+
+class StreamEvent(namedtuple('StreamEvent', ['id', 'type', 'data', 'roles', 'board_type'])):
+    """One change pushed to clients; roles and board_type decide who receives it"""
+    __slots__ = ()
+
+    def encode(self) -> str:
+        """The event in text/event-stream framing"""
+        return f"id: {self.id}\nevent: {self.type}\ndata: {json.dumps(self.data, separators=(',', ':'))}\n\n"
+
+
+class TooManySubscribersError(Exception):
+    """Raised when the process already serves the maximum number of event streams"""
+    pass
+
+
+class Subscription:
+    """A client's bounded queue of events it is allowed to see"""
+
+    def __init__(self, role: str, queue_size: int):
+        self.role = role
+        self.board_types = BOARD_ACCESS.get(role, ())
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def accepts(self, event: StreamEvent) -> bool:
+        return self.role in event.roles and (event.board_type is None or event.board_type in self.board_types)
+
+    def offer(self, event: StreamEvent) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            # A client this far behind should reload everything rather than replay changes
+            self.overflowed = True
+
+    def get(self, timeout: float) -> Optional[StreamEvent]:
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventBroadcaster:
+    """In-process fan-out of change events to Server-Sent Events subscribers
+
+    Publishing never blocks: each subscriber has a bounded queue, and one that falls
+    behind is told to resync instead of stalling the request that published. The last
+    `history_size` events are kept so a reconnecting client (Last-Event-ID) misses nothing.
+    In the app, events come from the change_events table through EventRelay, so changes
+    made by the scheduler and webhook worker reach subscribers too.
+    """
+
+    def __init__(self, queue_size: int = 100, history_size: int = 256, max_subscribers: int = 100):
+        self.queue_size = queue_size
+        self.history_size = history_size
+        self.max_subscribers = max_subscribers
+        self._history = deque(maxlen=history_size)
+        self._subscribers = set()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def subscribe(self, role: str, last_event_id: Optional[int] = None) -> Subscription:
+        """Register a client; events after last_event_id still in history are queued for it first"""
+        subscription = Subscription(role, self.queue_size)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise TooManySubscribersError("Too many event stream clients")
+            if last_event_id is not None:
+                if self._history and self._history[0].id > last_event_id + 1:
+                    subscription.overflowed = True  # Missed events already dropped from history
+                for event in self._history:
+                    if event.id > last_event_id and subscription.accepts(event):
+                        subscription.offer(event)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event_type: str, data: Dict[str, Any], roles: Iterable[str] = ALL_ROLES,
+                board_type: Optional[str] = None, event_id: Optional[int] = None) -> StreamEvent:
+        """Queue an event for every subscriber whose role (and board access) allows it
+
+        event_id must increase from one call to the next; by default a counter is used.
+        """
+        with self._lock:
+            event = StreamEvent(next(self._ids) if event_id is None else event_id, event_type, data, tuple(roles), board_type)
+            self._history.append(event)
+            for subscription in self._subscribers:
+                if subscription.accepts(event):
+                    subscription.offer(event)
+        return event
+
+    def stream(self, subscription: Subscription, heartbeat: float = 15.0) -> Iterator[str]:
+        """text/event-stream chunks for a subscription until the client disconnects"""
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                if subscription.overflowed:
+                    subscription.overflowed = False
+                    yield "event: resync\ndata: {}\n\n"
+                event = subscription.get(heartbeat)
+                yield event.encode() if event else ": keep-alive\n\n"
+        finally:
+            self.unsubscribe(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+
+class EventRelay:
+    """Publishes change_events rows to a broadcaster, so events from any process reach it
+
+    A daemon thread polls for rows newer than the last one relayed every `interval`
+    seconds (one indexed range query) and deletes rows older than `retention` seconds
+    about once a minute. On its first poll it loads the last `history_size` rows, so
+    Last-Event-ID keeps working across restarts of the web process.
+    """
+
+    BATCH_SIZE = 500
+    PRUNE_EVERY = 60.0
+
+    def __init__(self, target: EventBroadcaster, interval: float = 1.0, retention: float = 3600.0):
+        self.target = target
+        self.interval = interval
+        self.retention = retention
+        self._last_id = None
+        self._pruned_at = 0.0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self, app) -> None:
+        """Load recent history, then keep polling in the background (once per process)
+
+        Call it before the first subscribe, inside an app context, so the history a
+        reconnecting client replays from is already there.
+        """
+        with self._lock:
+            if self._thread is None:
+                self.poll()
+                self._thread = threading.Thread(target=self._run, args=(app,), name='event-relay', daemon=True)
+                self._thread.start()
+
+    def poll(self) -> int:
+        """Publish rows added since the last poll; returns how many were published"""
+        events = ChangeEvent.__table__
+        with db.engine.connect() as connection:
+            if self._last_id is None:
+                newest = connection.execute(select(func.max(events.c.id))).scalar() or 0
+                self._last_id = max(0, newest - self.target.history_size)
+            rows = connection.execute(
+                select(events).where(events.c.id > self._last_id).order_by(events.c.id).limit(self.BATCH_SIZE)
+            ).all()
+        for row in rows:
+            self.target.publish(row.event_type, json.loads(row.data), row.roles.split(','), row.board_type, event_id=row.id)
+            self._last_id = row.id
+        if time.monotonic() - self._pruned_at >= self.PRUNE_EVERY:
+            self._pruned_at = time.monotonic()
+            with db.engine.begin() as connection:
+                connection.execute(delete(events).where(events.c.created_at < datetime.utcnow() - timedelta(seconds=self.retention)))
+        return len(rows)
+
+    def _run(self, app) -> None:
+        with app.app_context():
+            while True:
+                try:
+                    if self.poll() == self.BATCH_SIZE:
+                        continue  # More waiting
+                except Exception as e:
+                    print(f"[event_stream] ⚠️ Relay poll failed: {e}")
+                time.sleep(self.interval)
+
+
+def record_event(event_type: str, data: Dict[str, Any], roles: Iterable[str] = ALL_ROLES,
+                 board_type: Optional[str] = None) -> None:
+    """Append an event to change_events for the web process to relay
+
+    Written in its own short transaction after the change itself has committed. A failure
+    is logged rather than raised: the change stands and clients catch up on their next refetch.
+    """
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(insert(ChangeEvent.__table__).values(
+                event_type=event_type, data=json.dumps(data, separators=(',', ':')),
+                roles=','.join(roles), board_type=board_type, created_at=datetime.utcnow()
+            ))
+    except Exception as e:
+        print(f"[event_stream] ⚠️ Could not record {event_type} event: {e}")
+
+
+broadcaster = EventBroadcaster(
+    queue_size=int(os.getenv('EVENT_STREAM_QUEUE_SIZE', '100')),
+    max_subscribers=int(os.getenv('EVENT_STREAM_MAX_CLIENTS', '100'))
+)
+
+relay = EventRelay(
+    broadcaster,
+    interval=float(os.getenv('EVENT_STREAM_POLL_INTERVAL', '1')),
+    retention=float(os.getenv('EVENT_STREAM_RETENTION', '3600'))
+)
+
+
+@schedule_changed.connect
+def _push_schedule_change(sender, change=None, class_id=None, instance_ids=(), **kwargs):
+    # Every dashboard shows the schedule and free spots; who booked stays private
+    record_event('schedule', {"change": change, "class_id": class_id, "instance_ids": list(instance_ids)})
+
+
+@attendance_changed.connect
+def _push_attendance_change(sender, instance_ids=(), **kwargs):
+    record_event('attendance', {"instance_ids": list(instance_ids)}, roles=('staff', 'management'))
+
+
+@membership_status_changed.connect
+def _push_membership_change(sender, status=None, membership_ids=(), **kwargs):
+    # Which students are affected is only shown to management
+    record_event('membership', {"status": status, "membership_ids": list(membership_ids)}, roles=('management',))
+
+
+@announcement_changed.connect
+def _push_announcement_change(sender, change=None, announcement_id=None, board_type=None, **kwargs):
+    record_event('announcement', {"change": change, "announcement_id": announcement_id, "board_type": board_type},
+                 board_type=board_type)
@@ -0,0 +1,24 @@
+from blinker import Namespace
+
+# In-process domain events. Services send them after committing; caches and other
+# listeners subscribe with `<signal>.connect(handler)`. Handlers receive the sender
+# (usually None) plus the keyword arguments documented next to each signal.
+domain_events = Namespace()
+
+# status: new membership status ('expired' or 'pending_renewal')
+# membership_ids: ids of the memberships that changed
+# clerk_user_ids: Clerk IDs of the students holding them
+membership_status_changed = domain_events.signal('membership-status-changed')
+
+# change: 'class_created', 'class_deleted', 'booked', 'booking_cancelled' or 'instance_cancelled'
+# class_id: the studio class, if known
+# instance_ids: class instances whose schedule or bookings changed
+schedule_changed = domain_events.signal('schedule-changed')
+
+# instance_ids: class instances whose rosters had attendance marked
+attendance_changed = domain_events.signal('attendance-changed')
+
+# change: 'created' or 'deleted'
+# announcement_id: the announcement
+# board_type: the bulletin board it is on ('student', 'staff', 'all', ...)
+announcement_changed = domain_events.signal('announcement-changed')
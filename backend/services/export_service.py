@@ -0,0 +1,226 @@
+import csv
+import io
+from datetime import date, timedelta
+from typing import Any, Iterator, List, Optional, Tuple
+from sqlalchemy import func, select
+from models import db, ClassCredit, ClassEnrollment, ClassInstance, Payment, SlidingScaleOption, StudioClass, User
+
+EXPORT_DATASETS = ('payments', 'class_enrollments', 'class_credits')
+EXPORT_FORMATS = ('csv', 'parquet', 'arrow')
+EXPORT_MIMETYPES = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+EXPORT_EXTENSIONS = {'csv': 'csv', 'parquet': 'parquet', 'arrow': 'arrows'}
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands out what was written since the last drain()
+
+    Lets pyarrow writers stream to an HTTP response or a file chunk by chunk. tell()
+    keeps counting across drains because Parquet footers record absolute offsets.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._parts = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data, self._parts = b''.join(self._parts), []
+        return data
+
+
+class ExportService:
+    """Streams bookkeeping exports of payments, enrollments and credits as CSV, Parquet or Arrow
+
+    Rows are read in keyset-paginated chunks of `chunk_size` (by id), each on its own short
+    read, and written out before the next chunk is fetched. Memory stays constant for any
+    date range, and no read transaction is held open for the length of the export, which on
+    SQLite would keep writers waiting.
+    """
+
+    def columns(self, dataset: str) -> List[Tuple[str, str]]:
+        """(name, type) of each exported column; type is one of int, float, str, bool, datetime"""
+        return [(name, column_type) for name, column_type, _ in self._dataset(dataset)[0]]
+
+    def stream(self, dataset: str, fmt: str = 'csv', start_date: Optional[date] = None,
+               end_date: Optional[date] = None, chunk_size: int = 5000) -> Iterator[bytes]:
+        """Validate the request and return an iterator of encoded chunks (header first)
+
+        Dates are inclusive and filter on the dataset's own date (payment date, enrollment
+        time, credit creation time). Parquet and Arrow need pyarrow installed.
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be positive")
+        if start_date and end_date and start_date > end_date:
+            raise ValueError("start_date must not be after end_date")
+        self._dataset(dataset)
+
+        chunks = self.iter_chunks(dataset, start_date, end_date, chunk_size)
+        if fmt == 'csv':
+            return self._csv(dataset, chunks)
+        try:
+            import pyarrow
+        except ImportError:
+            raise ValueError(f"{fmt} export requires pyarrow (pip install pyarrow)")
+        return self._arrow(dataset, fmt, chunks)
+
+    def iter_chunks(self, dataset: str, start_date: Optional[date] = None, end_date: Optional[date] = None,
+                    chunk_size: int = 5000) -> Iterator[List[Tuple[Any, ...]]]:
+        """Yield lists of at most chunk_size row tuples, in id order"""
+        columns, from_clause, key, date_column = self._dataset(dataset)
+        query = select(*(expression.label(name) for name, _, expression in columns)).select_from(from_clause)
+        if start_date:
+            query = query.where(date_column >= start_date)
+        if end_date:
+            query = query.where(date_column < end_date + timedelta(days=1))
+
+        last_key = None
+        while True:
+            page = query if last_key is None else query.where(key > last_key)
+            with db.engine.connect() as connection:
+                rows = connection.execute(page.order_by(key).limit(chunk_size)).all()
+            if not rows:
+                return
+            yield [tuple(row) for row in rows]
+            if len(rows) < chunk_size:
+                return
+            last_key = rows[-1][0]
+
+    def _csv(self, dataset: str, chunks: Iterator[List[Tuple[Any, ...]]]) -> Iterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([name for name, _ in self.columns(dataset)])
+        yield buffer.getvalue().encode('utf-8')
+        for rows in chunks:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(rows)
+            yield buffer.getvalue().encode('utf-8')
+
+    def _arrow(self, dataset: str, fmt: str, chunks: Iterator[List[Tuple[Any, ...]]]) -> Iterator[bytes]:
+        import pyarrow as pa
+        arrow_types = {'int': pa.int64(), 'float': pa.float64(), 'str': pa.string(), 'bool': pa.bool_(),
+                       'datetime': pa.timestamp('us')}
+        columns = self.columns(dataset)
+        schema = pa.schema([(name, arrow_types[column_type]) for name, column_type in columns])
+
+        sink = _ChunkSink()
+        if fmt == 'parquet':
+            import pyarrow.parquet as pq
+            writer = pq.ParquetWriter(sink, schema)
+        else:
+            writer = pa.ipc.new_stream(sink, schema)
+        try:
+            for rows in chunks:
+                values = list(zip(*rows))
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array(values[i], type=schema.field(i).type) for i in range(len(columns))], schema=schema
+                ))
+                yield sink.drain()
+        finally:
+            writer.close()
+        yield sink.drain()
+
+    def _dataset(self, dataset: str):
+        """(columns, from clause, keyset column, date column) of an export
+
+        Each column is (name, type, SQL expression); the first one is the keyset column.
+        """
+        if dataset not in EXPORT_DATASETS:
+            raise ValueError(f"dataset must be one of: {', '.join(EXPORT_DATASETS)}")
+
+        payments = Payment.__table__
+        enrollments = ClassEnrollment.__table__
+        credits = ClassCredit.__table__
+        users = User.__table__
+        options = SlidingScaleOption.__table__
+        instances = ClassInstance.__table__
+        classes = StudioClass.__table__
+
+        if dataset == 'payments':
+            columns = [
+                ('payment_id', 'int', payments.c.id),
+                ('date', 'datetime', payments.c.date),
+                ('status', 'str', payments.c.status),
+                ('amount', 'float', payments.c.amount),
+                ('student_id', 'int', payments.c.student_id),
+                ('student_name', 'str', users.c.name),
+                ('student_email', 'str', users.c.email),
+                ('tier_name', 'str', options.c.tier_name),
+                ('category', 'str', options.c.category),
+                ('instance_id', 'str', payments.c.instance_id),
+                ('class_name', 'str', func.coalesce(classes.c.class_name, payments.c.class_name)),
+                ('class_start_time', 'datetime', instances.c.start_time),
+                ('stripe_session_id', 'str', payments.c.stripe_session_id),
+            ]
+            from_clause = (
+                payments
+                .outerjoin(users, users.c.id == payments.c.student_id)
+                .outerjoin(options, options.c.id == payments.c.sliding_scale_option_id)
+                .outerjoin(instances, instances.c.instance_id == payments.c.instance_id)
+                .outerjoin(classes, classes.c.id == instances.c.class_id)
+            )
+            return columns, from_clause, payments.c.id, payments.c.date
+
+        if dataset == 'class_enrollments':
+            columns = [
+                ('enrollment_id', 'int', enrollments.c.id),
+                ('enrolled_at', 'datetime', enrollments.c.enrolled_at),
+                ('status', 'str', enrollments.c.status),
+                ('payment_type', 'str', enrollments.c.payment_type),
+                ('payment_id', 'int', enrollments.c.payment_id),
+                ('student_id', 'int', enrollments.c.student_id),
+                ('student_name', 'str', users.c.name),
+                ('student_email', 'str', users.c.email),
+                ('instance_id', 'str', enrollments.c.instance_id),
+                ('class_name', 'str', classes.c.class_name),
+                ('class_start_time', 'datetime', instances.c.start_time),
+                ('cancelled_at', 'datetime', enrollments.c.cancelled_at),
+                ('attendance_marked_at', 'datetime', enrollments.c.attendance_marked_at),
+            ]
+            from_clause = (
+                enrollments
+                .outerjoin(users, users.c.id == enrollments.c.student_id)
+                .outerjoin(instances, instances.c.instance_id == enrollments.c.instance_id)
+                .outerjoin(classes, classes.c.id == instances.c.class_id)
+            )
+            return columns, from_clause, enrollments.c.id, enrollments.c.enrolled_at
+
+        columns = [
+            ('credit_id', 'int', credits.c.id),
+            ('created_at', 'datetime', credits.c.created_at),
+            ('reason', 'str', credits.c.reason),
+            ('used', 'bool', credits.c.used),
+            ('used_at', 'datetime', credits.c.used_at),
+            ('student_id', 'int', credits.c.student_id),
+            ('student_name', 'str', users.c.name),
+            ('student_email', 'str', users.c.email),
+            ('source_enrollment_id', 'int', credits.c.source_enrollment_id),
+            ('source_instance_id', 'str', enrollments.c.instance_id),
+            ('source_class_name', 'str', classes.c.class_name),
+        ]
+        from_clause = (
+            credits
+            .outerjoin(users, users.c.id == credits.c.student_id)
+            .outerjoin(enrollments, enrollments.c.id == credits.c.source_enrollment_id)
+            .outerjoin(instances, instances.c.instance_id == enrollments.c.instance_id)
+            .outerjoin(classes, classes.c.id == instances.c.class_id)
+        )
+        return columns, from_clause, credits.c.id, credits.c.created_at
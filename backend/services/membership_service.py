@@ -1,22 +1,90 @@
-from models import db, Membership, Student, SlidingScaleOption, Payment
+from models import db, Membership, Student, SlidingScaleOption, Payment, User
+from collections import namedtuple
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, List
+from sqlalchemy import select, update
 import stripe
 import os
+from services.cache import TTLCache
+from services.events import membership_status_changed
+from services.option_catalog import get_option_catalog
+from services.stripe_gateway import get_stripe_gateway
 from services.user_service import UserService
 
+
+class MembershipWindow(namedtuple('MembershipWindow', ['start', 'end', 'cancelled', 'membership_type', 'status'], defaults=('active',))):
+    """The dates a student's membership covers, as stored (naive UTC)"""
+    __slots__ = ()
+    
+    def is_active(self, now: Optional[datetime] = None) -> bool:
+        if self.status == 'expired':
+            return False
+        now = now or datetime.utcnow()
+        return self.start <= now and (self.end is None or self.end >= now)
+
+# clerk_user_id -> MembershipWindow (or _NO_MEMBERSHIP) for students. Entries expire at the
+# membership's end_date at the latest and are invalidated on activation and cancellation.
+_membership_windows = TTLCache(
+    max_size=int(os.getenv('MEMBERSHIP_CACHE_SIZE', '4096')),
+    ttl=float(os.getenv('MEMBERSHIP_CACHE_TTL', '300'))
+)
+_NO_MEMBERSHIP = object()
+
+@membership_status_changed.connect
+def _forget_swept_memberships(sender, clerk_user_ids=(), **kwargs):
+    for clerk_user_id in clerk_user_ids:
+        _membership_windows.invalidate(clerk_user_id)
+
 class MembershipService:
     """Service layer for membership-related business logic"""
     
     def __init__(self):
         self.user_service = UserService()
     
+    def get_membership_window(self, clerk_user_id: str) -> Optional[MembershipWindow]:
+        """Get (start, end, cancelled) of a student's membership, or None if they have none
+        
+        Read with one join from users (unique clerk_user_id index) to memberships (primary key)
+        and cached until the membership ends or is activated/cancelled.
+        """
+        window = _membership_windows.get(clerk_user_id)
+        if window is not None:
+            return None if window is _NO_MEMBERSHIP else window
+        
+        users = User.__table__
+        row = db.session.query(
+            Membership.start_date, Membership.end_date, Membership.cancelled, Membership.membership_type, Membership.status
+        ).select_from(users).join(
+            Membership, Membership.id == users.c.membership_id
+        ).filter(
+            users.c.clerk_user_id == clerk_user_id,
+            users.c.type == 'student'
+        ).first()
+        
+        if row is None:
+            _membership_windows.set(clerk_user_id, _NO_MEMBERSHIP)
+            return None
+        
+        window = MembershipWindow(*row)
+        ttl = _membership_windows.ttl
+        now = datetime.utcnow()
+        for boundary in (window.start, window.end):
+            if boundary is not None and boundary > now:
+                ttl = min(ttl, (boundary - now).total_seconds())
+        _membership_windows.set(clerk_user_id, window, ttl)
+        return window
+    
+    @staticmethod
+    def invalidate_membership(clerk_user_id: str) -> None:
+        """Forget a cached membership window (after activation or cancellation)"""
+        _membership_windows.invalidate(clerk_user_id)
+    
     def get_membership_status(self, clerk_user_id: str) -> Dict[str, Any]:
         """Get membership status for a student"""
         try:
             # Comment out debug prints
             # print(f"[membership_service] Looking up user with clerk_user_id: {clerk_user_id}")
-            student = self.user_service.get_user_by_clerk_id(clerk_user_id)
+            student = self.user_service.get_identity_by_clerk_id(clerk_user_id)
             # Comment out debug prints
             # print(f"[membership_service] Found user: {student}")
             
@@ -30,27 +98,30 @@ class MembershipService:
                 # print(f"[membership_service] User is not a student, type: {student.discriminator}")
                 return {"has_membership": False, "message": "User not found or not a student"}
             
+            membership = self.get_membership_window(clerk_user_id)
+            is_active = membership is not None and membership.is_active()
             # Comment out debug prints
-            # print(f"[membership_service] Student has_membership: {student.has_membership}")
-            if not student.has_membership:
+            # print(f"[membership_service] Student has_membership: {is_active}")
+            if not is_active:
                 # Comment out debug prints
                 # print("[membership_service] No active membership")
                 return {"has_membership": False, "message": "No active membership"}
             
-            membership = student.membership
             # Comment out debug prints
             # print(f"[membership_service] Membership found: {membership}")
             # Comment out debug prints
             # print(f"[membership_service] Membership cancelled: {membership.cancelled}")
             
+            end_date = membership.end.isoformat() if membership.end else None
             result = {
                 "has_membership": True,
                 "membership_type": membership.membership_type,
-                "start_date": membership.start_date.isoformat(),
-                "end_date": membership.end_date.isoformat() if membership.end_date else None,
-                "is_active": membership.is_active(),
+                "start_date": membership.start.isoformat(),
+                "end_date": end_date,
+                "is_active": is_active,
                 "is_cancelled": membership.cancelled,
-                "expires_at": membership.end_date.isoformat() if membership.end_date else None
+                "expires_at": end_date,
+                "status": membership.status
             }
             # Comment out debug prints
             # print(f"[membership_service] Returning result: {result}")
@@ -70,7 +141,7 @@ class MembershipService:
                 raise ValueError("User not found or not a student")
             
             # Validate payment option (must be membership category)
-            option = db.session.get(SlidingScaleOption, option_id)
+            option = get_option_catalog().get(option_id)
             if not option:
                 raise ValueError("Invalid sliding scale option")
             
@@ -85,6 +156,15 @@ class MembershipService:
             else:
                 amount = option.price_min
             
+            # Hand out the student's still-open session for this membership if there is one
+            from services.payment_service import PaymentService
+            open_payment = PaymentService.find_open_checkout(student.id, option_id, amount)
+            if open_payment:
+                return {
+                    "session_id": open_payment.stripe_session_id,
+                    "url": open_payment.checkout_url
+                }
+            
             # Create payment record
             payment = Payment(
                 amount=amount,
@@ -153,6 +233,8 @@ class MembershipService:
             # Assign membership to student
             student.membership_id = membership.id
             db.session.commit()
+            UserService.invalidate_identity(student.clerk_user_id)
+            self.invalidate_membership(student.clerk_user_id)
             
             return True
             
@@ -183,6 +265,7 @@ class MembershipService:
             membership.end_date = new_end_date
             membership.cancelled = True  # Mark as cancelled
             db.session.commit()
+            self.invalidate_membership(clerk_user_id)
             
             return {
                 "cancellation_date": datetime.utcnow().isoformat(),
@@ -194,10 +277,62 @@ class MembershipService:
             db.session.rollback()
             raise Exception(f"Error canceling membership: {str(e)}")
     
+    def sweep_memberships(self, renewal_notice_days: int = 3, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Move memberships past their end_date to 'expired' and ones about to end to 'pending_renewal'
+        
+        Both sweeps are range scans on the (status, end_date) index followed by one bulk UPDATE.
+        A membership_status_changed event is sent for each non-empty batch after the commit.
+        """
+        try:
+            now = now or datetime.utcnow()
+            renewal_cutoff = now + timedelta(days=renewal_notice_days)
+            
+            expired_ids = list(db.session.execute(
+                select(Membership.id).where(
+                    Membership.current_predicate(),
+                    Membership.end_date < now
+                )
+            ).scalars())
+            # Cancelled memberships will not renew, so they stay 'active' until they expire
+            renewal_ids = list(db.session.execute(
+                select(Membership.id).where(
+                    Membership.status == 'active',
+                    Membership.cancelled == False,
+                    Membership.end_date >= now,
+                    Membership.end_date < renewal_cutoff
+                )
+            ).scalars())
+            
+            batches = [(status, ids) for status, ids in (('expired', expired_ids), ('pending_renewal', renewal_ids)) if ids]
+            for status, ids in batches:
+                db.session.execute(
+                    update(Membership)
+                    .where(Membership.id.in_(ids))
+                    .values(status=status)
+                    .execution_options(synchronize_session=False)
+                )
+            db.session.commit()
+            
+            for status, ids in batches:
+                clerk_user_ids = list(db.session.execute(
+                    select(User.__table__.c.clerk_user_id).where(User.__table__.c.membership_id.in_(ids))
+                ).scalars())
+                membership_status_changed.send(None, status=status, membership_ids=ids, clerk_user_ids=clerk_user_ids)
+            
+            return {"expired": len(expired_ids), "pending_renewal": len(renewal_ids)}
+            
+        except Exception as e:
+            db.session.rollback()
+            raise e
+    
     def get_membership_options(self) -> List[SlidingScaleOption]:
         """Get membership sliding scale options"""
         return SlidingScaleOption.query.filter_by(category='membership', is_active=True).all()
     
+    def get_membership_options_body(self) -> bytes:
+        """Pre-encoded JSON body of the membership options endpoint, from the option catalog"""
+        return get_option_catalog().bodies['membership']
+    
     def has_active_membership(self, clerk_user_id: str) -> bool:
         """Check if user has active membership"""
         try:
@@ -215,9 +350,9 @@ class MembershipService:
             
             option = payment.sliding_scale_option
             
-            session = stripe.checkout.Session.create(
-                payment_method_types=['card'],
-                line_items=[{
+            session = get_stripe_gateway().create_checkout_session({
+                'payment_method_types': ['card'],
+                'line_items': [{
                     'price_data': {
                         'currency': 'usd',
                         'product_data': {
@@ -228,17 +363,20 @@ class MembershipService:
                     },
                     'quantity': 1,
                 }],
-                mode='payment',
-                success_url=success_url,
-                cancel_url=cancel_url,
-                metadata={
+                'mode': 'payment',
+                'success_url': success_url,
+                'cancel_url': cancel_url,
+                'metadata': {
                     'payment_id': payment_id,
                     'student_id': payment.student_id,
                     'instance_id': payment.instance_id or '',
                     'class_name': payment.class_name or ''
                 }
-            )
+            })
             
+            from services.payment_service import PaymentService
+            PaymentService.record_checkout_session(payment, session)
+            db.session.commit()
             return session
         except Exception as e:
             raise e
@@ -246,39 +384,7 @@ class MembershipService:
     def can_book_class_for_free(self, clerk_user_id: str, class_start_time: datetime) -> Dict[str, Any]:
         """Check if student can book a class for free based on membership expiration vs class date"""
         try:
-            membership_status = self.get_membership_status(clerk_user_id)
-            
-            if not membership_status.get("has_membership", False):
-                return {
-                    "can_book_free": False,
-                    "reason": "No active membership",
-                    "requires_payment": True
-                }
-            
-            # Get membership end date
-            end_date_str = membership_status.get("end_date")
-            if not end_date_str:
-                return {
-                    "can_book_free": False,
-                    "reason": "Membership has no expiration date",
-                    "requires_payment": True
-                }
-            
-            # Parse dates
-            membership_end_date = datetime.fromisoformat(end_date_str.replace('Z', '+00:00'))
-            class_date = class_start_time.replace(tzinfo=None)  # Remove timezone for comparison
-            membership_end_date = membership_end_date.replace(tzinfo=None)
-            
-            # Check if class is on or before membership expiration
-            can_book_free = class_date <= membership_end_date
-            
-            return {
-                "can_book_free": can_book_free,
-                "reason": "Class is after membership expiration" if not can_book_free else "Class is within membership period",
-                "requires_payment": not can_book_free,
-                "membership_end_date": membership_end_date.isoformat(),
-                "class_date": class_date.isoformat()
-            }
+            return self.eligibility_for_window(self.get_membership_window(clerk_user_id), class_start_time)
             
         except Exception as e:
             # Comment out debug prints
@@ -287,4 +393,35 @@ class MembershipService:
                 "can_book_free": False,
                 "reason": f"Error checking eligibility: {str(e)}",
                 "requires_payment": True
-            } 
\ No newline at end of file
+            }
+    
+    @staticmethod
+    def eligibility_for_window(membership: Optional[MembershipWindow], class_start_time: datetime, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Decide free vs paid booking for one class from an already resolved membership window"""
+        if membership is None or not membership.is_active(now):
+            return {
+                "can_book_free": False,
+                "reason": "No active membership",
+                "requires_payment": True
+            }
+        
+        # Get membership end date
+        if not membership.end:
+            return {
+                "can_book_free": False,
+                "reason": "Membership has no expiration date",
+                "requires_payment": True
+            }
+        
+        class_date = class_start_time.replace(tzinfo=None)  # Remove timezone for comparison
+        
+        # Check if class is on or before membership expiration
+        can_book_free = class_date <= membership.end
+        
+        return {
+            "can_book_free": can_book_free,
+            "reason": "Class is after membership expiration" if not can_book_free else "Class is within membership period",
+            "requires_payment": not can_book_free,
+            "membership_end_date": membership.end.isoformat(),
+            "class_date": class_date.isoformat()
+        } 
\ No newline at end of file
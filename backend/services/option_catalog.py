@@ -0,0 +1,103 @@
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+from typing import Dict, List, Optional
+from sqlalchemy import select
+from models import db, ChangeCounter, SlidingScaleOption
+
+# Seconds between checks of the catalog version, which is how edits made by another
+# process (or another app worker) are noticed. Edits made in this process rebuild at once.
+CATALOG_CHECK_INTERVAL = float(os.getenv('OPTION_CATALOG_CHECK_INTERVAL', '5'))
+
+_OPTION_FIELDS = ['id', 'tier_name', 'price_min', 'price_max', 'description', 'category', 'stripe_price_id', 'is_active']
+
+
+class CatalogOption(namedtuple('CatalogOption', _OPTION_FIELDS)):
+    """A sliding scale option as of the catalog snapshot; same attribute names as the model"""
+    __slots__ = ()
+
+    def to_dict(self, include_is_active: bool = False) -> Dict:
+        option = self._asdict()
+        if not include_is_active:
+            del option['is_active']
+        return option
+
+
+class OptionCatalog:
+    """Immutable snapshot of every sliding scale option, indexed by id and category
+
+    The JSON bodies served by the option list endpoints are encoded once per snapshot.
+    A snapshot is never modified; a change builds a new one and swaps it in.
+    """
+
+    __slots__ = ('version', 'engine', 'by_id', 'by_category', 'bodies')
+
+    def __init__(self, options: List[CatalogOption], version: int, engine=None):
+        self.version = version
+        self.engine = engine
+        self.by_id = MappingProxyType({option.id: option for option in options})
+        by_category = {}
+        for option in options:
+            by_category.setdefault(option.category, []).append(option)
+        self.by_category = MappingProxyType({category: tuple(items) for category, items in by_category.items()})
+
+        drop_in = self.by_category.get('drop-in', ())
+        membership = [option for option in self.by_category.get('membership', ()) if option.is_active]
+        self.bodies = MappingProxyType({
+            # GET /api/sliding-scale-options
+            'drop-in': self._encode([option.to_dict() for option in drop_in]),
+            # GET /api/sliding-scale-options/all
+            'all': self._encode([option.to_dict(include_is_active=True) for option in options]),
+            # GET /api/membership/options
+            'membership': self._encode([option.to_dict() for option in membership]),
+        })
+
+    def get(self, option_id: int) -> Optional[CatalogOption]:
+        return self.by_id.get(option_id)
+
+    @staticmethod
+    def _encode(options: List[Dict]) -> bytes:
+        return json.dumps({"success": True, "options": options}, separators=(',', ':'), sort_keys=True).encode('utf-8')
+
+
+_catalog = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def get_option_catalog() -> OptionCatalog:
+    """The current catalog snapshot, rebuilt first if the options changed since it was built"""
+    global _checked_at
+    catalog = _catalog
+    if catalog is not None and catalog.engine is db.engine and time.monotonic() - _checked_at < CATALOG_CHECK_INTERVAL:
+        return catalog
+    version = _current_version()
+    if catalog is not None and catalog.engine is db.engine and catalog.version == version:
+        _checked_at = time.monotonic()
+        return catalog
+    return refresh_option_catalog()
+
+
+def refresh_option_catalog() -> OptionCatalog:
+    """Rebuild the catalog from the database and swap it in"""
+    global _catalog, _checked_at
+    with _lock:
+        # Read the version first: an edit committed after this point makes the next check rebuild again
+        version = _current_version()
+        options = [
+            CatalogOption(*(getattr(option, field) for field in _OPTION_FIELDS))
+            for option in db.session.execute(select(SlidingScaleOption).order_by(SlidingScaleOption.id)).scalars()
+        ]
+        catalog = OptionCatalog(options, version, db.engine)
+        _catalog, _checked_at = catalog, time.monotonic()
+        print(f"[option_catalog] 🔄 Rebuilt catalog version {version} with {len(options)} options")
+        return catalog
+
+
+def _current_version() -> int:
+    return db.session.execute(
+        select(ChangeCounter.value).where(ChangeCounter.name == 'sliding_scale_options')
+    ).scalar() or 0
@@ -1,10 +1,26 @@
-from models import db, Payment, SlidingScaleOption, Membership, Student
-from datetime import datetime
+from models import db, Payment, SlidingScaleOption, Membership, Student, ClassInstance
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_, update
 from typing import List, Dict, Any, Optional, Tuple
 import stripe
 import os
 from repositories.payment_repository import PaymentRepository
 from services.class_service import ClassService
+from services.user_service import UserService
+from services.membership_service import MembershipService
+from services.stripe_gateway import get_stripe_gateway
+from services.revenue_rollup_service import RevenueRollupService
+from services.cache import SingleFlight
+from services.events import schedule_changed
+from services.option_catalog import CatalogOption, get_option_catalog, refresh_option_catalog
+
+# Verifications of one Checkout Session in flight in this process
+_verifications = SingleFlight()
+
+# A reused Checkout Session must stay open at least this long for the student to pay
+CHECKOUT_REUSE_MARGIN = timedelta(minutes=10)
+# Stripe's default Checkout Session lifetime, used for payments with no recorded expiry
+PENDING_PAYMENT_TTL = timedelta(hours=24)
 
 
 class PaymentService:
@@ -36,15 +52,21 @@ class PaymentService:
     def create_sliding_scale_option(self, option_data: dict) -> SlidingScaleOption:
         """Create a new sliding scale option"""
         option = SlidingScaleOption(**option_data)
-        return self.payment_repository.create(option)
+        option = self.payment_repository.create(option)
+        refresh_option_catalog()
+        return option
     
     def update_sliding_scale_option(self, option: SlidingScaleOption) -> SlidingScaleOption:
         """Update a sliding scale option"""
-        return self.payment_repository.update(option)
+        option = self.payment_repository.update(option)
+        refresh_option_catalog()
+        return option
     
     def delete_sliding_scale_option(self, option: SlidingScaleOption) -> bool:
         """Delete a sliding scale option"""
-        return self.payment_repository.delete(option)
+        deleted = self.payment_repository.delete(option)
+        refresh_option_catalog()
+        return deleted
     
     @staticmethod
     def get_sliding_scale_option(option_id: int) -> Optional[SlidingScaleOption]:
@@ -52,9 +74,14 @@ class PaymentService:
         return db.session.get(SlidingScaleOption, option_id)
     
     @staticmethod
-    def validate_payment_option(option_id: int, custom_amount: Optional[float] = None) -> Tuple[SlidingScaleOption, float]:
-        """Validate payment option and return the option and amount"""
-        option = PaymentService.get_sliding_scale_option(option_id)
+    def get_options_body(name: str) -> bytes:
+        """Pre-encoded JSON body of an option list endpoint ('drop-in', 'all' or 'membership')"""
+        return get_option_catalog().bodies[name]
+    
+    @staticmethod
+    def validate_payment_option(option_id: int, custom_amount: Optional[float] = None) -> Tuple[CatalogOption, float]:
+        """Validate payment option and return the option (from the option catalog) and amount"""
+        option = get_option_catalog().get(option_id)
         if not option:
             raise ValueError("Invalid sliding scale option")
         
@@ -96,9 +123,9 @@ class PaymentService:
             
             option = payment.sliding_scale_option
             
-            session = stripe.checkout.Session.create(
-                payment_method_types=['card'],
-                line_items=[{
+            session = get_stripe_gateway().create_checkout_session({
+                'payment_method_types': ['card'],
+                'line_items': [{
                     'price_data': {
                         'currency': 'usd',
                         'product_data': {
@@ -109,94 +136,187 @@ class PaymentService:
                     },
                     'quantity': 1,
                 }],
-                mode='payment',
-                success_url=success_url,
-                cancel_url=cancel_url,
-                metadata={
+                'mode': 'payment',
+                'success_url': success_url,
+                'cancel_url': cancel_url,
+                'metadata': {
                     'payment_id': payment_id,
                     'student_id': payment.student_id,
                     'instance_id': payment.instance_id or '',
                     'class_name': payment.class_name or ''
                 }
-            )
+            })
             
+            PaymentService.record_checkout_session(payment, session)
+            db.session.commit()
             return session
         except Exception as e:
+            db.session.rollback()
+            raise e
+    
+    @staticmethod
+    def record_checkout_session(payment: Payment, session: stripe.checkout.Session) -> None:
+        """Remember which Checkout Session collects a payment, its URL and when it expires"""
+        payment.stripe_session_id = session.id
+        payment.checkout_url = session.url
+        expires_at = getattr(session, 'expires_at', None)
+        payment.checkout_expires_at = datetime.utcfromtimestamp(expires_at) if expires_at else None
+    
+    @staticmethod
+    def find_open_checkout(student_id: int, option_id: int, amount: float, instance_id: Optional[str] = None,
+                           now: Optional[datetime] = None) -> Optional[Payment]:
+        """Find a pending payment whose Checkout Session the student can still use for the same purchase
+        
+        Clicking "Pay" again (or in a second tab) hands out the existing session instead of
+        creating another pending payment and Stripe session. The session keeps the
+        success/cancel URLs it was created with.
+        """
+        now = now or datetime.utcnow()
+        return Payment.query.filter(
+            Payment.student_id == student_id,
+            Payment.sliding_scale_option_id == option_id,
+            Payment.instance_id == instance_id if instance_id else Payment.instance_id.is_(None),
+            Payment.amount == amount,
+            Payment.status == 'pending',
+            Payment.checkout_url.isnot(None),
+            Payment.checkout_expires_at > now + CHECKOUT_REUSE_MARGIN
+        ).order_by(Payment.id.desc()).first()
+    
+    @staticmethod
+    def expire_stale_payments(ttl: timedelta = PENDING_PAYMENT_TTL, now: Optional[datetime] = None) -> int:
+        """Mark pending payments whose Checkout Session can no longer be paid as 'expired', in one UPDATE
+        
+        A session expires at its checkout_expires_at; payments without one (created before
+        it was recorded, or whose session was never created) expire `ttl` after creation.
+        A webhook arriving late for an expired payment still completes it.
+        """
+        now = now or datetime.utcnow()
+        try:
+            expired = db.session.execute(
+                update(Payment)
+                .where(
+                    Payment.status == 'pending',
+                    or_(
+                        Payment.checkout_expires_at < now,
+                        and_(Payment.checkout_expires_at.is_(None), Payment.date < now - ttl)
+                    )
+                )
+                .values(status='expired')
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.session.commit()
+            return expired
+        except Exception as e:
+            db.session.rollback()
             raise e
     
     @staticmethod
     def verify_payment(session_id: str) -> Optional[Payment]:
-        """Verify a payment using Stripe session ID"""
+        """Verify a payment using Stripe session ID
+        
+        Payments the webhook (or an earlier verification) already completed are answered
+        from the database. Stripe is only asked about pending ones, and concurrent
+        verifications of the same session share a single Stripe call.
+        """
         try:
             print(f"[verify_payment] 🔍 Called with session_id={session_id}")
-            session = stripe.checkout.Session.retrieve(session_id)
-            print(f"[verify_payment] 📊 Stripe session payment_status: {session.payment_status}")
-            print(f"[verify_payment] 📊 Stripe session metadata: {session.metadata}")
+            payment = PaymentService.get_payment_by_session_id(session_id)
+            if payment and payment.status == 'completed':
+                print(f"[verify_payment] ✅ Payment {payment.id} already completed, skipping Stripe")
+                return payment
             
-            if session.payment_status == 'paid':
-                payment_id = int(session.metadata.get('payment_id'))
-                print(f"[verify_payment] 💳 Payment ID from metadata: {payment_id}")
-                
-                payment = db.session.get(Payment, payment_id)
-                print(f"[verify_payment] 📋 Payment found: {payment}")
-                print(f"[verify_payment] 📋 Payment details - student_id: {payment.student_id}, instance_id: {payment.instance_id}, class_name: {payment.class_name}, status: {payment.status}")
-                
-                if payment:
-                    payment.status = 'completed'
-                    db.session.commit()
-                    print(f"[verify_payment] ✅ Payment status updated to 'completed'")
-                    print(f"[verify_payment] 🟣 Stripe payment received for user: {payment.student_id}, class: {payment.instance_id}")
-                    
-                    # Check if this is a membership payment
-                    if payment.class_name and 'Membership' in payment.class_name:
-                        print(f"[verify_payment] 🏢 Processing membership payment")
-                        try:
-                            # Activate membership directly
-                            PaymentService._activate_membership(payment.id)
-                            print(f"[verify_payment] ✅ Membership activated successfully")
-                        except Exception as e:
-                            print(f"[verify_payment] ❌ Membership activation error: {e}")
-                    else:
-                        # Enroll the student in the class instance if not already enrolled
-                        print(f"[verify_payment] 🎓 Attempting to register user for class: {payment.instance_id}")
-                        print(f"[verify_payment] 🎓 Enrollment details - student_id: {payment.student_id}, instance_id: {payment.instance_id}, payment_id: {payment.id}")
-                        
-                        if payment.student_id and payment.instance_id:
-                            try:
-                                print(f"[verify_payment] 🎓 Calling ClassService.book_class with payment_type='drop-in'")
-                                result = ClassService().book_class(payment.student_id, payment.instance_id, payment.id, 'drop-in')
-                                print(f"[verify_payment] ✅ Booking entry saved: {result}")
-                                
-                                # Verify enrollment was created
-                                from models import ClassEnrollment
-                                enrollment = ClassEnrollment.query.filter_by(
-                                    student_id=payment.student_id,
-                                    instance_id=payment.instance_id,
-                                    payment_id=payment.id
-                                ).first()
-                                print(f"[verify_payment] 🔍 Enrollment verification - found: {enrollment is not None}")
-                                if enrollment:
-                                    print(f"[verify_payment] 🔍 Enrollment details - id: {enrollment.id}, status: {enrollment.status}, payment_type: {enrollment.payment_type}")
-                                
-                            except Exception as e:
-                                print(f"[verify_payment] ❌ Enrollment error: {e}")
-                                import traceback
-                                print(f"[verify_payment] ❌ Enrollment error traceback: {traceback.format_exc()}")
-                        else:
-                            print(f"[verify_payment] ❌ Missing student_id or instance_id for enrollment")
-                            print(f"[verify_payment] ❌ student_id: {payment.student_id}, instance_id: {payment.instance_id}")
-                    return payment
-                else:
-                    print(f"[verify_payment] ❌ Payment not found for ID: {payment_id}")
-            else:
-                print(f"[verify_payment] ❌ Payment not completed, status: {session.payment_status}")
-            return None
+            payment_id = _verifications.do(session_id, lambda: PaymentService._verify_with_stripe(session_id))
+            if payment_id is None:
+                return None
+            # The call may have run on another request's session, so reload the row here
+            return db.session.get(Payment, payment_id, populate_existing=True)
         except Exception as e:
             print(f"[verify_payment] ❌ Exception: {e}")
             import traceback
             print(f"[verify_payment] ❌ Exception traceback: {traceback.format_exc()}")
             raise e
     
+    @staticmethod
+    def _verify_with_stripe(session_id: str) -> Optional[int]:
+        """Ask Stripe about a session and complete its payment if paid; returns the payment id"""
+        session = get_stripe_gateway().retrieve_checkout_session(session_id)
+        print(f"[verify_payment] 📊 Stripe session payment_status: {session.payment_status}")
+        print(f"[verify_payment] 📊 Stripe session metadata: {session.metadata}")
+        
+        if session.payment_status != 'paid':
+            print(f"[verify_payment] ❌ Payment not completed, status: {session.payment_status}")
+            return None
+        
+        # StripeObject is not a dict, so no .get()
+        if 'payment_id' not in session.metadata:
+            print(f"[verify_payment] ❌ Session has no payment_id metadata")
+            return None
+        payment_id = int(session.metadata['payment_id'])
+        print(f"[verify_payment] 💳 Payment ID from metadata: {payment_id}")
+        payment = db.session.get(Payment, payment_id)
+        if not payment:
+            print(f"[verify_payment] ❌ Payment not found for ID: {payment_id}")
+            return None
+        
+        print(f"[verify_payment] 📋 Payment details - student_id: {payment.student_id}, instance_id: {payment.instance_id}, class_name: {payment.class_name}, status: {payment.status}")
+        try:
+            PaymentService.complete_payment(payment.id, session_id)
+        except Exception as e:
+            print(f"[verify_payment] ❌ Error completing payment: {e}")
+        return payment.id
+    
+    @staticmethod
+    def complete_payment(payment_id: int, session_id: Optional[str] = None) -> bool:
+        """Mark a paid payment completed and book its class or activate its membership
+        
+        Shared by the webhook worker and verify-payment. Only the caller whose conditional
+        UPDATE moves the payment out of 'pending' applies the side effects, so the webhook,
+        a verification and a replay can race without double-booking. Returns False if the
+        payment was already completed. The daily revenue rollup and the class booking or
+        membership are written in the same transaction, so if they fail the error is raised
+        and the payment stays pending for the webhook queue to retry.
+        """
+        claimed = db.session.execute(
+            update(Payment)
+            .where(Payment.id == payment_id, Payment.status != 'completed')
+            .values(status='completed')
+        ).rowcount == 1
+        if not claimed:
+            db.session.rollback()
+            print(f"[complete_payment] ℹ️ Payment {payment_id} already completed, nothing to do")
+            return False
+        
+        payment = db.session.get(Payment, payment_id, populate_existing=True)
+        if session_id and not payment.stripe_session_id:
+            payment.stripe_session_id = session_id
+        RevenueRollupService().record_payment(payment)
+        print(f"[complete_payment] 🟣 Stripe payment received for user: {payment.student_id}, class: {payment.instance_id}")
+        
+        if payment.class_name and 'Membership' in payment.class_name:
+            print(f"[complete_payment] 🏢 Processing membership payment")
+            # Commits the status together with the membership
+            PaymentService._activate_membership(payment.id)
+            print(f"[complete_payment] ✅ Membership activated successfully")
+            return True
+        
+        if not (payment.student_id and payment.instance_id):
+            db.session.commit()
+            print(f"[complete_payment] ❌ Missing student_id or instance_id for enrollment")
+            return True
+        
+        # Enroll the student in the class instance, committed together with the payment
+        try:
+            ClassService().book_class(payment.student_id, payment.instance_id, payment.id, 'drop-in', commit=False)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"[complete_payment] ❌ Booking error, payment {payment_id} left pending: {e}")
+            raise e
+        print(f"[complete_payment] ✅ Payment completed and booking saved")
+        instance = ClassInstance.query.filter_by(instance_id=payment.instance_id).first()
+        schedule_changed.send(None, change='booked', class_id=instance.class_id, instance_ids=[payment.instance_id])
+        return True
+    
     @staticmethod
     def _activate_membership(payment_id: int) -> bool:
         """Activate membership after successful payment"""
@@ -240,6 +360,8 @@ class PaymentService:
             # Assign membership to student
             student.membership_id = membership.id
             db.session.commit()
+            UserService.invalidate_identity(student.clerk_user_id)
+            MembershipService.invalidate_membership(student.clerk_user_id)
             
             return True
             
@@ -260,23 +382,8 @@ class PaymentService:
                     payment = db.session.get(Payment, int(payment_id))
                     print(f"[handle_webhook_event] Payment lookup result: {payment}")
                     if payment:
-                        payment.status = 'completed'
-                        db.session.commit()
-                        print(f"[handle_webhook_event] Payment status updated to 'completed' for payment_id={payment.id}")
-                        # Activate membership if this is a membership payment
-                        if payment.class_name and 'Membership' in payment.class_name:
-                            print(f"[handle_webhook_event] Detected membership payment, activating membership...")
-                            PaymentService._activate_membership(payment.id)
-                        else:
-                            # Enroll the student in the class instance if not already enrolled
-                            print(f"[handle_webhook_event] Attempting to register user: {payment.student_id} for class: {payment.instance_id} with payment_id: {payment.id}")
-                            try:
-                                result = ClassService().book_class(payment.student_id, payment.instance_id, payment.id, 'drop-in')
-                                print(f"[handle_webhook_event] Booking result: {result}")
-                            except Exception as e:
-                                print(f"[handle_webhook_event] ❌ Booking error: {e}")
-                                import traceback
-                                print(traceback.format_exc())
+                        # Queued events can be replayed and verify-payment may have got here first
+                        PaymentService.complete_payment(payment.id, session.get('id'))
                         return True
             return False
         except Exception as e:
@@ -290,6 +397,11 @@ class PaymentService:
         """Get payment by ID"""
         return db.session.get(Payment, payment_id)
     
+    @staticmethod
+    def get_payment_by_session_id(session_id: str) -> Optional[Payment]:
+        """Get the payment collected by a Stripe Checkout Session"""
+        return Payment.query.filter_by(stripe_session_id=session_id).first()
+    
     @staticmethod
     def get_payments_by_student(student_id: int) -> List[Payment]:
         """Get all payments for a student"""
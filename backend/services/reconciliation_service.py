@@ -0,0 +1,204 @@
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+from sqlalchemy import and_, case, exists, insert, or_, select, update
+from models import db, ClassCredit, ClassEnrollment, ClassInstance, Membership, Payment, User, next_change_seq
+from services.attendance_rollup_service import AttendanceRollupService
+
+# Mismatch classes, in the order they are checked and fixed
+CHECKS = ('paid_without_enrollment', 'enrollment_missing_payment', 'credit_missing_source')
+
+
+class ReconciliationService:
+    """Finds payments, enrollments and credits that disagree with each other and repairs them
+
+    Each mismatch class is one anti-join query; fixes are applied with one bulk statement
+    per class, in a single transaction. The report lists every row found with the change
+    made to it (or that would be made, for a dry run).
+
+    - paid_without_enrollment: completed class payment with no enrollment pointing at it.
+      Fix: enroll the student (as 'membership' if they hold a current membership, like
+      fix_missing_enrollments.py did), unless they are already booked into that instance
+      or the instance no longer exists.
+    - enrollment_missing_payment: enrollment whose payment_id has no payments row.
+      Fix: clear the dangling payment_id.
+    - credit_missing_source: credit that no cancelled enrollment backs (credits only come
+      from cancellations). Fix: void it if unused; used credits are only reported.
+    """
+
+    MAX_REPORTED_ROWS = 1000
+
+    def __init__(self):
+        self.attendance_rollup_service = AttendanceRollupService()
+
+    def reconcile(self, apply: bool = False, checks: Optional[Iterable[str]] = None, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Run the given mismatch checks (default: all) and, with apply=True, fix them in one transaction"""
+        checks = list(CHECKS if checks is None else checks)
+        unknown = [check for check in checks if check not in CHECKS]
+        if unknown:
+            raise ValueError(f"Unknown check(s): {', '.join(unknown)}. Must be one of: {', '.join(CHECKS)}")
+
+        now = now or datetime.utcnow()
+        runners = {
+            'paid_without_enrollment': lambda: self._paid_without_enrollment(apply, now),
+            'enrollment_missing_payment': lambda: self._enrollment_missing_payment(apply),
+            'credit_missing_source': lambda: self._credit_missing_source(apply, now),
+        }
+        try:
+            report = {
+                "dry_run": not apply,
+                "checked_at": now.isoformat(),
+                "checks": {check: runners[check]() for check in CHECKS if check in checks}
+            }
+            if apply:
+                db.session.commit()
+            else:
+                db.session.rollback()
+            return report
+        except Exception as e:
+            db.session.rollback()
+            raise e
+
+    def _paid_without_enrollment(self, apply: bool, now: datetime) -> Dict[str, Any]:
+        payments = Payment.__table__
+        enrollments = ClassEnrollment.__table__
+        users = User.__table__
+        memberships = Membership.__table__
+        instances = ClassInstance.__table__
+
+        booked = enrollments.alias('booked')
+        already_enrolled = exists().where(
+            booked.c.student_id == payments.c.student_id,
+            booked.c.instance_id == payments.c.instance_id,
+            booked.c.status != 'cancelled'
+        ).correlate(payments)
+        has_membership = exists().select_from(
+            users.join(memberships, memberships.c.id == users.c.membership_id)
+        ).where(
+            users.c.id == payments.c.student_id,
+            memberships.c.status.in_(Membership.CURRENT_STATUSES),
+            memberships.c.start_date <= now,
+            or_(memberships.c.end_date.is_(None), memberships.c.end_date >= now)
+        ).correlate(payments)
+        rows = db.session.execute(
+            select(
+                payments.c.id.label('payment_id'),
+                payments.c.student_id,
+                payments.c.instance_id,
+                instances.c.instance_id.isnot(None).label('instance_exists'),
+                already_enrolled.label('already_enrolled'),
+                case((has_membership, 'membership'), else_='drop-in').label('payment_type')
+            ).select_from(
+                payments
+                .outerjoin(enrollments, enrollments.c.payment_id == payments.c.id)
+                .outerjoin(instances, instances.c.instance_id == payments.c.instance_id)
+            ).where(
+                payments.c.status == 'completed',
+                payments.c.instance_id.isnot(None),
+                enrollments.c.id.is_(None)
+            ).order_by(payments.c.id)
+        ).all()
+
+        changes, new_enrollments, booked = [], [], set()
+        for row in rows:
+            change = {"payment_id": row.payment_id, "student_id": row.student_id, "instance_id": row.instance_id}
+            if not row.instance_exists:
+                change["action"] = "skipped: class instance no longer exists"
+            elif row.already_enrolled:
+                change["action"] = "skipped: student already booked into this class (possible double payment)"
+            elif (row.student_id, row.instance_id) in booked:
+                change["action"] = "skipped: an earlier payment for this class is being enrolled"
+            else:
+                change["action"] = "enroll"
+                change["payment_type"] = row.payment_type
+                booked.add((row.student_id, row.instance_id))
+                new_enrollments.append({
+                    'student_id': row.student_id,
+                    'instance_id': row.instance_id,
+                    'payment_id': row.payment_id,
+                    'payment_type': row.payment_type,
+                    'status': 'enrolled',
+                    'enrolled_at': now,
+                })
+            changes.append(change)
+
+        if apply and new_enrollments:
+            change_seq = next_change_seq(db.session.connection())
+            db.session.execute(insert(enrollments), [dict(values, change_seq=change_seq) for values in new_enrollments])
+            for instance_id, count in Counter(values['instance_id'] for values in new_enrollments).items():
+                self.attendance_rollup_service.record_transition(instance_id, None, 'enrolled', count)
+
+        return self._summary(changes, len(new_enrollments))
+
+    def _enrollment_missing_payment(self, apply: bool) -> Dict[str, Any]:
+        payments = Payment.__table__
+        enrollments = ClassEnrollment.__table__
+
+        rows = db.session.execute(
+            select(enrollments.c.id, enrollments.c.student_id, enrollments.c.instance_id, enrollments.c.payment_id)
+            .select_from(enrollments.outerjoin(payments, payments.c.id == enrollments.c.payment_id))
+            .where(enrollments.c.payment_id.isnot(None), payments.c.id.is_(None))
+            .order_by(enrollments.c.id)
+        ).all()
+
+        changes = [{
+            "enrollment_id": row.id,
+            "student_id": row.student_id,
+            "instance_id": row.instance_id,
+            "payment_id": {"before": row.payment_id, "after": None},
+            "action": "clear payment_id",
+        } for row in rows]
+
+        if apply and rows:
+            db.session.execute(
+                update(enrollments)
+                .where(enrollments.c.id.in_([row.id for row in rows]))
+                .values(payment_id=None)
+            )
+        return self._summary(changes, len(rows))
+
+    def _credit_missing_source(self, apply: bool, now: datetime) -> Dict[str, Any]:
+        credits = ClassCredit.__table__
+        enrollments = ClassEnrollment.__table__
+
+        rows = db.session.execute(
+            select(credits.c.id, credits.c.student_id, credits.c.used, credits.c.reason, credits.c.source_enrollment_id)
+            .select_from(credits.outerjoin(
+                enrollments,
+                and_(enrollments.c.id == credits.c.source_enrollment_id, enrollments.c.status == 'cancelled')
+            ))
+            .where(enrollments.c.id.is_(None))
+            .order_by(credits.c.id)
+        ).all()
+
+        changes, void_ids = [], []
+        for row in rows:
+            change = {
+                "credit_id": row.id,
+                "student_id": row.student_id,
+                "reason": row.reason,
+                "source_enrollment_id": row.source_enrollment_id,
+            }
+            if row.used:
+                change["action"] = "skipped: credit already used"
+            else:
+                change["action"] = "void"
+                change["used"] = {"before": False, "after": True}
+                void_ids.append(row.id)
+            changes.append(change)
+
+        if apply and void_ids:
+            db.session.execute(
+                update(credits)
+                .where(and_(credits.c.id.in_(void_ids), credits.c.used == False))
+                .values(used=True, used_at=now)
+            )
+        return self._summary(changes, len(void_ids))
+
+    def _summary(self, changes: List[Dict[str, Any]], fixable: int) -> Dict[str, Any]:
+        return {
+            "found": len(changes),
+            "fixable": fixable,
+            "changes": changes[:self.MAX_REPORTED_ROWS],
+            "changes_truncated": len(changes) > self.MAX_REPORTED_ROWS,
+        }
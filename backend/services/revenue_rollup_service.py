@@ -0,0 +1,117 @@
+from typing import List, Dict, Any, Optional
+from datetime import date, datetime
+from sqlalchemy import Date, cast, delete, func, insert, update
+from models import db, insert_ignore, Payment, RevenueRollup, SlidingScaleOption
+
+class RevenueRollupService:
+    """Service for the incrementally maintained daily revenue rollups used by reporting"""
+
+    REPORT_GROUPINGS = ('day', 'option', 'category')
+
+    def record_payment(self, payment: Payment) -> None:
+        """Add a payment that just completed to its day/option/category rollup
+
+        Does not commit: the rollup changes in the same transaction as the payment status.
+        """
+        option = payment.sliding_scale_option
+        key = {
+            'day': (payment.date or datetime.utcnow()).date(),
+            'sliding_scale_option_id': payment.sliding_scale_option_id,
+            'category': option.category if option else 'unknown',
+        }
+        # Two payments may create the same rollup row; the second insert is a no-op
+        db.session.execute(
+            insert_ignore(RevenueRollup, ['day', 'sliding_scale_option_id', 'category'])
+            .values(**key, payment_count=0, amount_total=0.0)
+        )
+        db.session.execute(
+            update(RevenueRollup)
+            .where(*(getattr(RevenueRollup, column) == value for column, value in key.items()))
+            .values(
+                payment_count=RevenueRollup.payment_count + 1,
+                amount_total=RevenueRollup.amount_total + payment.amount
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    def rebuild(self) -> int:
+        """Recompute every rollup from completed payments (backfill / repair)"""
+        try:
+            day = self._day(Payment.date)
+            rows = db.session.query(
+                day,
+                Payment.sliding_scale_option_id,
+                func.coalesce(SlidingScaleOption.category, 'unknown'),
+                func.count(Payment.id),
+                func.sum(Payment.amount)
+            ).outerjoin(
+                SlidingScaleOption, SlidingScaleOption.id == Payment.sliding_scale_option_id
+            ).filter(
+                Payment.status == 'completed'
+            ).group_by(
+                day, Payment.sliding_scale_option_id, SlidingScaleOption.category
+            ).all()
+
+            rollups = [{
+                'day': date.fromisoformat(row_day) if isinstance(row_day, str) else row_day,
+                'sliding_scale_option_id': option_id,
+                'category': category,
+                'payment_count': count,
+                'amount_total': amount or 0.0,
+            } for row_day, option_id, category, count, amount in rows]
+
+            db.session.execute(delete(RevenueRollup))
+            if rollups:
+                db.session.execute(insert(RevenueRollup), rollups)
+            db.session.commit()
+            return len(rollups)
+
+        except Exception as e:
+            db.session.rollback()
+            raise e
+
+    def get_report(self, group_by: str = 'day', start_date: Optional[date] = None, end_date: Optional[date] = None,
+                   category: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Sum completed payments by day, sliding scale option (tier) or category over a date range"""
+        if group_by not in self.REPORT_GROUPINGS:
+            raise ValueError(f"group_by must be one of: {', '.join(self.REPORT_GROUPINGS)}")
+
+        totals = [
+            func.sum(RevenueRollup.payment_count).label('payment_count'),
+            func.sum(RevenueRollup.amount_total).label('amount_total'),
+        ]
+
+        if group_by == 'day':
+            keys = [RevenueRollup.day]
+            query = db.session.query(*keys, *totals)
+        elif group_by == 'option':
+            keys = [RevenueRollup.sliding_scale_option_id, SlidingScaleOption.tier_name, RevenueRollup.category]
+            query = db.session.query(*keys, *totals).outerjoin(
+                SlidingScaleOption, SlidingScaleOption.id == RevenueRollup.sliding_scale_option_id
+            )
+        else:
+            keys = [RevenueRollup.category]
+            query = db.session.query(*keys, *totals)
+
+        if start_date:
+            query = query.filter(RevenueRollup.day >= start_date)
+        if end_date:
+            query = query.filter(RevenueRollup.day <= end_date)
+        if category:
+            query = query.filter(RevenueRollup.category == category)
+
+        report = []
+        for row in query.group_by(*keys).order_by(*keys).all():
+            entry = row._asdict()
+            if isinstance(entry.get('day'), date):
+                entry['day'] = entry['day'].isoformat()
+            entry['amount_total'] = round(entry['amount_total'] or 0.0, 2)
+            report.append(entry)
+        return report
+
+    @staticmethod
+    def _day(column):
+        """SQL expression for the calendar day of a DateTime column"""
+        if db.session.get_bind().dialect.name == 'sqlite':
+            return func.date(column)  # CAST AS DATE is numeric affinity in SQLite
+        return cast(column, Date)
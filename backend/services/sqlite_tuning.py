@@ -0,0 +1,91 @@
+import os
+from typing import Any, Dict, Optional, Tuple
+from sqlalchemy import event
+
+# PRAGMAs applied to every new SQLite connection, by profile name
+SQLITE_PROFILES = {
+    # Driver defaults: rollback journal, so readers wait behind every write
+    'default': {},
+    # WAL lets readers run alongside the single writer; NORMAL sync is durable in WAL
+    # except for the last transactions on power loss (never corruption)
+    'tuned': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,          # ms to wait for a lock before "database is locked"
+        'cache_size': -65536,          # negative = KiB, so 64 MiB of page cache per connection
+        'mmap_size': 268435456,        # 256 MiB memory-mapped reads
+        'temp_store': 'MEMORY',
+    },
+}
+
+# Environment variables that override single PRAGMAs of the chosen profile
+_PRAGMA_OVERRIDES = {
+    'journal_mode': 'SQLITE_JOURNAL_MODE',
+    'synchronous': 'SQLITE_SYNCHRONOUS',
+    'busy_timeout': 'SQLITE_BUSY_TIMEOUT_MS',
+    'cache_size': 'SQLITE_CACHE_SIZE',
+    'mmap_size': 'SQLITE_MMAP_SIZE',
+    'temp_store': 'SQLITE_TEMP_STORE',
+}
+
+
+def sqlite_pragmas_from_env() -> Dict[str, Any]:
+    """The PRAGMAs of SQLITE_PROFILE (default 'tuned') with any SQLITE_* overrides applied"""
+    name = os.getenv('SQLITE_PROFILE', 'tuned')
+    if name not in SQLITE_PROFILES:
+        raise ValueError(f"SQLITE_PROFILE must be one of: {', '.join(SQLITE_PROFILES)}")
+    pragmas = dict(SQLITE_PROFILES[name])
+    for pragma, variable in _PRAGMA_OVERRIDES.items():
+        if os.getenv(variable):
+            pragmas[pragma] = os.environ[variable]
+    return pragmas
+
+
+def apply_sqlite_pragmas(engine, pragmas: Optional[Dict[str, Any]] = None) -> None:
+    """Run the PRAGMAs on each connection the engine opens (no-op for other databases)"""
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = sqlite_pragmas_from_env() if pragmas is None else pragmas
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma, value in pragmas.items():
+                cursor.execute(f"PRAGMA {pragma}={value}")
+        finally:
+            cursor.close()
+
+
+def optimize(engine, analysis_limit: int = 1000) -> None:
+    """Refresh query planner statistics where they look stale (PRAGMA optimize)
+
+    analysis_limit caps the rows ANALYZE samples per index so this stays cheap on big tables.
+    """
+    with engine.connect() as connection:
+        connection.exec_driver_sql(f"PRAGMA analysis_limit={int(analysis_limit)}")
+        connection.exec_driver_sql("PRAGMA optimize")
+        connection.commit()
+
+
+def analyze(engine) -> None:
+    """Recompute statistics for every table and index (full ANALYZE)"""
+    with engine.connect() as connection:
+        connection.exec_driver_sql("ANALYZE")
+        connection.commit()
+
+
+def checkpoint(engine, mode: str = 'PASSIVE') -> Tuple[int, int, int]:
+    """Copy WAL pages back into the database file so the WAL does not keep growing
+
+    PASSIVE never waits for readers or writers; TRUNCATE also resets the WAL file but
+    waits for them. Returns (busy, WAL frames, frames checkpointed).
+    """
+    if mode not in ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'):
+        raise ValueError("mode must be PASSIVE, FULL, RESTART or TRUNCATE")
+    with engine.connect() as connection:
+        busy, log_frames, checkpointed = connection.exec_driver_sql(f"PRAGMA wal_checkpoint({mode})").one()
+        connection.commit()
+        return busy, log_frames, checkpointed
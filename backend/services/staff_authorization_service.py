@@ -0,0 +1,43 @@
+import os
+from typing import FrozenSet
+from sqlalchemy import select, union
+from models import db, StudioClass, staff_assignments
+from services.cache import TTLCache
+
+# staff_id -> frozenset of studio class ids the staff member instructs or is assigned to.
+# Invalidated by ClassService whenever assignments or instructors change; the TTL only
+# bounds staleness for changes made by other processes.
+_authorized_classes = TTLCache(
+    max_size=int(os.getenv('STAFF_AUTH_CACHE_SIZE', '1024')),
+    ttl=float(os.getenv('STAFF_AUTH_CACHE_TTL', '300'))
+)
+
+
+class StaffAuthorizationService:
+    """Answers "may this staff member work with this class?" from a cached set of class ids"""
+    
+    def get_authorized_class_ids(self, staff_id: int) -> FrozenSet[int]:
+        """Get ids of the classes a staff member instructs or is assigned to"""
+        class_ids = _authorized_classes.get(staff_id)
+        if class_ids is None:
+            instructed = select(StudioClass.id).where(StudioClass.instructor_id == staff_id)
+            assigned = select(staff_assignments.c.class_id).where(staff_assignments.c.staff_id == staff_id)
+            class_ids = frozenset(db.session.execute(union(instructed, assigned)).scalars())
+            _authorized_classes.set(staff_id, class_ids)
+        return class_ids
+    
+    def is_authorized(self, staff_id: int, class_id: int) -> bool:
+        """Check if staff is the instructor of, or assigned to, a class"""
+        return class_id in self.get_authorized_class_ids(staff_id)
+    
+    @staticmethod
+    def invalidate(*staff_ids: int) -> None:
+        """Forget the cached class ids of the given staff members"""
+        for staff_id in staff_ids:
+            if staff_id is not None:
+                _authorized_classes.invalidate(staff_id)
+    
+    @staticmethod
+    def clear() -> None:
+        """Forget every cached entry"""
+        _authorized_classes.clear()
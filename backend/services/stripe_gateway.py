@@ -0,0 +1,152 @@
+import os
+import random
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+import requests
+from requests.adapters import HTTPAdapter
+import stripe
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+class StripeUnavailableError(Exception):
+    """Stripe could not be reached before the call's deadline, or its circuit breaker is open"""
+
+
+# Absolute monotonic deadline of the Stripe call running on this thread
+_call_deadline = threading.local()
+
+
+class _DeadlineSession(requests.Session):
+    """requests.Session whose per-request timeouts never run past the calling thread's deadline"""
+
+    def request(self, method, url, **kwargs):
+        deadline_at = getattr(_call_deadline, 'at', None)
+        if deadline_at is not None:
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                raise requests.Timeout("Stripe call deadline exceeded")
+            timeout = kwargs.get('timeout')
+            connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+            kwargs['timeout'] = (min(connect or remaining, remaining), min(read or remaining, remaining))
+        return super().request(method, url, **kwargs)
+
+
+class StripeGateway:
+    """The one place the backend talks to the Stripe API
+
+    All calls share a keep-alive connection pool. Each call gets a deadline that bounds its
+    attempts and the backoff between them; connection errors, rate limits and 5xx responses
+    are retried with full-jitter exponential backoff (creates reuse one idempotency key).
+    Repeated failures open a circuit breaker so requests fail fast while Stripe is down.
+    """
+
+    RETRYABLE_ERRORS = (stripe.APIConnectionError, stripe.RateLimitError, stripe.APIError)
+
+    def __init__(self, api_key: str, api_base: Optional[str] = None, connect_timeout: float = 3.0,
+                 read_timeout: float = 10.0, deadline: float = 15.0, max_retries: int = 2,
+                 backoff: float = 0.25, pool_size: int = 10, breaker: Optional[CircuitBreaker] = None):
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker(failure_threshold=5, reset_timeout=30.0)
+
+        self.session = _DeadlineSession()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.client = stripe.StripeClient(
+            api_key,
+            base_addresses={'api': api_base} if api_base else None,
+            http_client=stripe.RequestsClient(timeout=(connect_timeout, read_timeout), session=self.session),
+            max_network_retries=0  # Retries happen in _call, within the deadline
+        )
+
+    def create_checkout_session(self, params: Dict[str, Any], deadline: Optional[float] = None) -> stripe.checkout.Session:
+        """Create a Checkout Session; retried attempts reuse one idempotency key"""
+        options = {'idempotency_key': f"checkout-{uuid.uuid4()}"}
+        return self._call(
+            'create_checkout_session',
+            lambda: self.client.v1.checkout.sessions.create(params=params, options=options),
+            deadline
+        )
+
+    def retrieve_checkout_session(self, session_id: str, deadline: Optional[float] = None) -> stripe.checkout.Session:
+        """Fetch a Checkout Session by id"""
+        return self._call(
+            'retrieve_checkout_session',
+            lambda: self.client.v1.checkout.sessions.retrieve(session_id),
+            deadline
+        )
+
+    def _call(self, name: str, request: Callable[[], Any], deadline: Optional[float] = None) -> Any:
+        deadline_at = time.monotonic() + (self.deadline if deadline is None else deadline)
+        attempt = 0
+        while True:
+            try:
+                self.breaker.allow()
+            except CircuitOpenError as e:
+                raise StripeUnavailableError(f"Stripe {name} skipped: {e}") from e
+
+            _call_deadline.at = deadline_at
+            try:
+                result = request()
+            except self.RETRYABLE_ERRORS as e:
+                self.breaker.record_failure()
+                attempt += 1
+                delay = random.uniform(0, self.backoff * (2 ** attempt))
+                if attempt > self.max_retries or time.monotonic() + delay >= deadline_at:
+                    raise StripeUnavailableError(f"Stripe {name} failed after {attempt} attempts: {e}") from e
+                print(f"[stripe_gateway] ⚠️ {name} attempt {attempt} failed ({e}), retrying in {delay:.2f}s")
+                time.sleep(delay)
+                continue
+            except stripe.StripeError:
+                # Stripe answered (e.g. an invalid request), so it is reachable
+                self.breaker.record_success()
+                raise
+            except BaseException:
+                # Anything else still ends the attempt, so a half-open trial is not left in flight
+                self.breaker.record_failure()
+                raise
+            finally:
+                _call_deadline.at = None
+
+            self.breaker.record_success()
+            return result
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_stripe_gateway() -> StripeGateway:
+    """The process-wide gateway, configured from the environment on first use
+
+    Settings (environment variables):
+        STRIPE_SECRET_KEY        API key
+        STRIPE_API_BASE          API base URL, e.g. the fake server from fake_stripe.py (default: Stripe)
+        STRIPE_CONNECT_TIMEOUT   seconds to open a connection (default 3)
+        STRIPE_READ_TIMEOUT      seconds to wait for a response (default 10)
+        STRIPE_DEADLINE          seconds for a whole call, retries included (default 15)
+        STRIPE_MAX_RETRIES       retries after the first attempt (default 2)
+    """
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = StripeGateway(
+                os.getenv('STRIPE_SECRET_KEY') or stripe.api_key or '',
+                api_base=os.getenv('STRIPE_API_BASE') or None,
+                connect_timeout=float(os.getenv('STRIPE_CONNECT_TIMEOUT', '3')),
+                read_timeout=float(os.getenv('STRIPE_READ_TIMEOUT', '10')),
+                deadline=float(os.getenv('STRIPE_DEADLINE', '15')),
+                max_retries=int(os.getenv('STRIPE_MAX_RETRIES', '2'))
+            )
+        return _gateway
+
+
+def set_stripe_gateway(gateway: Optional[StripeGateway]) -> None:
+    """Replace the process-wide gateway (tests, load tests); None rebuilds it from the environment"""
+    global _gateway
+    with _gateway_lock:
+        _gateway = gateway
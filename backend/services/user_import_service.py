@@ -0,0 +1,159 @@
+import csv
+import io
+import json
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, IO, Iterable, Iterator, List, Tuple
+from sqlalchemy import bindparam, func, select, update
+from models import db, insert_ignore, User
+from services.user_service import UserService
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+CONFLICT_MODES = ('skip', 'update')
+CLERK_USER_ID_MAX_LENGTH = User.__table__.c.clerk_user_id.type.length
+
+
+def read_rows(stream: IO[bytes], fmt: str) -> Iterator[Dict[str, Any]]:
+    """Yield one dict per CSV record or NDJSON line without reading the whole stream"""
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(IMPORT_FORMATS)}")
+
+    text_stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        for row in csv.DictReader(text_stream):
+            yield row
+        return
+
+    for line in text_stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = {'_error': "Invalid JSON"}
+        yield row if isinstance(row, dict) else {'_error': "Each line must be a JSON object"}
+
+
+class UserImportService:
+    """Service for bulk-creating users from CSV or NDJSON exports"""
+
+    MAX_REPORTED_ERRORS = 1000
+
+    def import_users(self, rows: Iterable[Dict[str, Any]], chunk_size: int = 1000, on_conflict: str = 'skip') -> Dict[str, Any]:
+        """Validate and insert users chunk by chunk (one transaction per chunk)
+
+        Rows whose clerk_user_id already exists are skipped, or have the email and name they
+        supply updated with on_conflict='update' (blank fields keep the stored value). Only
+        the current chunk is held in memory and the per-row error report is capped at
+        MAX_REPORTED_ERRORS entries.
+        """
+        if on_conflict not in CONFLICT_MODES:
+            raise ValueError(f"on_conflict must be one of: {', '.join(CONFLICT_MODES)}")
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be positive")
+
+        summary = {"processed": 0, "inserted": 0, "updated": 0, "skipped": 0, "failed": 0, "errors": []}
+        numbered_rows = enumerate(rows, start=1)
+        while True:
+            chunk = list(islice(numbered_rows, chunk_size))
+            if not chunk:
+                break
+            self._import_chunk(chunk, on_conflict, summary)
+        summary["errors_truncated"] = summary["failed"] > len(summary["errors"])
+        return summary
+
+    def _import_chunk(self, chunk: List[Tuple[int, Dict[str, Any]]], on_conflict: str, summary: Dict[str, Any]) -> None:
+        now = datetime.utcnow()
+        valid = {}
+        for row_number, row in chunk:
+            summary["processed"] += 1
+            try:
+                values = self._validate_row(row)
+            except ValueError as e:
+                self._record_error(summary, row_number, row, str(e))
+                continue
+            if values['clerk_user_id'] in valid:
+                self._record_error(summary, row_number, row, "Duplicate clerk_user_id in import")
+                continue
+            valid[values['clerk_user_id']] = values
+
+        if not valid:
+            return
+
+        users = User.__table__
+        try:
+            existing = {
+                row.clerk_user_id: row for row in db.session.execute(
+                    select(users.c.clerk_user_id, users.c.email, users.c.name)
+                    .where(users.c.clerk_user_id.in_(valid.keys()))
+                )
+            }
+
+            new_rows = [
+                dict(values, type=values['role'], created_at=now, updated_at=now)
+                for clerk_user_id, values in valid.items() if clerk_user_id not in existing
+            ]
+            if new_rows:
+                result = db.session.execute(insert_ignore(User.__table__, ['clerk_user_id']), new_rows)
+                inserted = result.rowcount if result.rowcount is not None and result.rowcount >= 0 else len(new_rows)
+                summary["inserted"] += inserted
+                # Rows inserted by someone else since the SELECT above were left alone
+                summary["skipped"] += len(new_rows) - inserted
+
+            if existing and on_conflict == 'update':
+                # Blank fields keep their stored value; rows that change nothing are skipped
+                changed = [
+                    {'match_clerk_user_id': clerk_user_id, 'email': valid[clerk_user_id]['email'], 'name': valid[clerk_user_id]['name']}
+                    for clerk_user_id, current in existing.items()
+                    if (valid[clerk_user_id]['email'] or current.email) != current.email
+                    or (valid[clerk_user_id]['name'] or current.name) != current.name
+                ]
+                if changed:
+                    db.session.execute(
+                        update(users)
+                        .where(users.c.clerk_user_id == bindparam('match_clerk_user_id'))
+                        .values(email=func.coalesce(bindparam('email'), users.c.email),
+                                name=func.coalesce(bindparam('name'), users.c.name),
+                                updated_at=now),
+                        changed
+                    )
+                summary["updated"] += len(changed)
+                summary["skipped"] += len(existing) - len(changed)
+            else:
+                summary["skipped"] += len(existing)
+
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            raise e
+
+        for clerk_user_id in valid:
+            UserService.invalidate_identity(clerk_user_id)
+
+    @staticmethod
+    def _validate_row(row: Dict[str, Any]) -> Dict[str, Any]:
+        if '_error' in row:
+            raise ValueError(row['_error'])
+
+        clerk_user_id = str(row.get('clerk_user_id') or '').strip()
+        role = str(row.get('role') or '').strip().lower()
+        if not clerk_user_id or not role:
+            raise ValueError("Missing required fields: clerk_user_id and role")
+        if role not in UserService.USER_TYPES:
+            raise ValueError("Invalid role. Must be 'student', 'staff', or 'management'.")
+        if len(clerk_user_id) > CLERK_USER_ID_MAX_LENGTH:
+            raise ValueError("clerk_user_id is too long")
+
+        return {
+            'clerk_user_id': clerk_user_id,
+            'email': str(row.get('email') or '').strip() or None,
+            'name': str(row.get('name') or '').strip() or None,
+            'role': role,
+        }
+
+    def _record_error(self, summary: Dict[str, Any], row_number: int, row: Dict[str, Any], error: str) -> None:
+        summary["failed"] += 1
+        if len(summary["errors"]) < self.MAX_REPORTED_ERRORS:
+            clerk_user_id = row.get('clerk_user_id') if isinstance(row, dict) else None
+            summary["errors"].append({"row": row_number, "clerk_user_id": clerk_user_id, "error": error})
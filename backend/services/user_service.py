@@ -1,12 +1,32 @@
+import os
+from collections import namedtuple
+from flask import g, has_app_context
 from models import db, User, Student, Staff, Management
+from sqlalchemy import inspect
 from sqlalchemy.exc import IntegrityError
 from typing import Optional, Dict, Any, List
 from repositories.user_repository import UserRepository
+from services.cache import TTLCache
+from dtos.user_dto import UserDTO
+
+# What most request handlers need to know about the caller, without loading the full user
+UserIdentity = namedtuple('UserIdentity', ['id', 'discriminator', 'membership_id'])
+
+# clerk_user_id -> UserIdentity, shared by all requests in this process. Invalidated when a
+# user is created, updated or deleted and on membership activation; unknown Clerk IDs are never cached.
+_identities = TTLCache(
+    max_size=int(os.getenv('IDENTITY_CACHE_SIZE', '4096')),
+    ttl=float(os.getenv('IDENTITY_CACHE_TTL', '300'))
+)
 
 
 class UserService:
     """Service layer for user-related business logic"""
     
+    USER_TYPES = ('student', 'staff', 'management')
+    MAX_PAGE_SIZE = 500
+    MAX_SEARCH_RESULTS = 100
+    
     def __init__(self):
         self.user_repository = UserRepository()
     
@@ -26,6 +46,7 @@ class UserService:
         
         try:
             user = User.create_account(clerk_user_id, email, role, name)
+            UserService.invalidate_identity(clerk_user_id)
             return user
         except IntegrityError as e:
             db.session.rollback()
@@ -48,6 +69,55 @@ class UserService:
         """Get user by Clerk user ID"""
         return User.query.filter_by(clerk_user_id=clerk_user_id).first()
     
+    def get_identity_by_clerk_id(self, clerk_user_id: str) -> Optional[UserIdentity]:
+        """Resolve a Clerk user ID to (id, discriminator, membership_id)
+        
+        Answered from the per-request memo in flask.g, then the process-wide cache, and only
+        then from a single-row query.
+        """
+        memo = self._request_identities()
+        if memo is not None and clerk_user_id in memo:
+            return memo[clerk_user_id]
+        
+        identity = _identities.get(clerk_user_id)
+        if identity is None:
+            users = User.__table__
+            row = db.session.query(
+                users.c.id, users.c.type, users.c.membership_id
+            ).filter(users.c.clerk_user_id == clerk_user_id).first()
+            if row:
+                identity = UserIdentity(*row)
+                _identities.set(clerk_user_id, identity)
+        
+        if memo is not None:
+            memo[clerk_user_id] = identity
+        return identity
+    
+    @staticmethod
+    def remember_identity(user: User) -> UserIdentity:
+        """Memoize the identity of an already loaded user for the rest of the request"""
+        identity = UserIdentity(user.id, user.discriminator, getattr(user, 'membership_id', None))
+        memo = UserService._request_identities()
+        if memo is not None:
+            memo[user.clerk_user_id] = identity
+        return identity
+    
+    @staticmethod
+    def invalidate_identity(clerk_user_id: str) -> None:
+        """Forget a cached identity (after the user is created or their membership changes)"""
+        _identities.invalidate(clerk_user_id)
+        memo = UserService._request_identities()
+        if memo is not None:
+            memo.pop(clerk_user_id, None)
+    
+    @staticmethod
+    def _request_identities() -> Optional[Dict[str, Optional[UserIdentity]]]:
+        if not has_app_context():
+            return None
+        if '_identities' not in g:
+            g._identities = {}
+        return g._identities
+    
     def get_all_staff(self) -> List[User]:
         """Get all staff members"""
         return self.user_repository.find_staff_members()
@@ -60,13 +130,24 @@ class UserService:
         """Get all managers"""
         return self.user_repository.find_managers()
     
-    def search_instructors(self, query: str) -> List[User]:
+    def search_instructors(self, query: str, limit: int = 20) -> List[User]:
         """Search for staff members who can be instructors"""
         if query:
-            return self.user_repository.search_staff_by_name_or_email(query)
+            return self.user_repository.search_staff_by_name_or_email(query, self._search_limit(limit))
         else:
             return self.user_repository.find_staff_members()
     
+    def search_users(self, query: str, user_type: Optional[str] = None, limit: int = 20) -> List[User]:
+        """Prefix search users by name or email"""
+        if user_type and user_type not in self.USER_TYPES:
+            raise ValueError(f"Invalid type. Must be one of: {', '.join(self.USER_TYPES)}")
+        return self.user_repository.search(query, user_type, self._search_limit(limit))
+    
+    def _search_limit(self, limit: int) -> int:
+        if limit < 1 or limit > self.MAX_SEARCH_RESULTS:
+            raise ValueError(f"limit must be between 1 and {self.MAX_SEARCH_RESULTS}")
+        return limit
+    
     def get_user_profile(self, user: User) -> Dict[str, Any]:
         """Get user profile data"""
         return user.get_user_profile() | {"type": user.discriminator}
@@ -74,15 +155,25 @@ class UserService:
     def create_user(self, user_data: dict) -> User:
         """Create a new user"""
         user = User.create_account(**user_data)
-        return self.user_repository.create(user)
+        user = self.user_repository.create(user)
+        self.invalidate_identity(user.clerk_user_id)
+        return user
     
     def update_user(self, user: User) -> User:
         """Update an existing user"""
-        return self.user_repository.update(user)
+        # Forget the old Clerk ID too if it is being changed
+        clerk_user_ids = {user.clerk_user_id, *inspect(user).attrs.clerk_user_id.history.deleted}
+        user = self.user_repository.update(user)
+        for clerk_user_id in clerk_user_ids:
+            self.invalidate_identity(clerk_user_id)
+        return user
     
     def delete_user(self, user: User) -> bool:
         """Delete a user"""
-        return self.user_repository.delete(user)
+        clerk_user_id = user.clerk_user_id
+        deleted = self.user_repository.delete(user)
+        self.invalidate_identity(clerk_user_id)
+        return deleted
     
     def get_users_by_role(self, role: str) -> List[User]:
         """Get users by role"""
@@ -90,4 +181,28 @@ class UserService:
     
     def get_all_users(self) -> List[User]:
         """Get all users"""
-        return self.user_repository.get_all() 
\ No newline at end of file
+        return self.user_repository.get_all()
+    
+    def get_users_page(self, cursor: Optional[int] = None, limit: int = 100, role: Optional[str] = None,
+                       user_type: Optional[str] = None, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Get one keyset page of users ordered by id
+        
+        Returns the users and the cursor for the next page (None on the last page).
+        """
+        if limit < 1 or limit > self.MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {self.MAX_PAGE_SIZE}")
+        for value, name in ((role, 'role'), (user_type, 'type')):
+            if value and value not in self.USER_TYPES:
+                raise ValueError(f"Invalid {name}. Must be one of: {', '.join(self.USER_TYPES)}")
+        
+        # Ask for one extra row to know whether another page exists
+        columns = None
+        if fields:
+            columns = [UserDTO.FIELDS[field] for field in fields if field not in ('id', 'type')]
+        users = self.user_repository.find_page(cursor, limit + 1, role, user_type, columns)
+        
+        next_cursor = None
+        if len(users) > limit:
+            users = users[:limit]
+            next_cursor = users[-1].id
+        return {"users": users, "next_cursor": next_cursor} 
\ No newline at end of file
@@ -0,0 +1,126 @@
+import json
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from sqlalchemy import select, update
+from models import db, insert_ignore, StripeWebhookEvent
+from services.payment_service import PaymentService
+
+
+class WebhookQueueService:
+    """Durable queue of verified Stripe webhook events
+
+    The webhook route only enqueues and acknowledges; webhook_worker.py claims queued
+    events and applies them with PaymentService.handle_webhook_event.
+    """
+
+    MAX_ATTEMPTS = 5
+    RETRY_DELAY = timedelta(seconds=30)  # Doubled after every failed attempt
+    CLAIM_TIMEOUT = timedelta(minutes=5)  # A claim older than this is treated as a crashed worker
+    MAX_ERROR_LENGTH = 2000
+
+    def __init__(self, handler: Optional[Callable[[Dict[str, Any]], bool]] = None):
+        self.handler = handler or PaymentService.handle_webhook_event
+
+    def enqueue(self, event_id: str, event_type: str, payload: str) -> bool:
+        """Store a verified event; returns False if this event id was already queued"""
+        try:
+            now = datetime.utcnow()
+            result = db.session.execute(insert_ignore(StripeWebhookEvent, ['event_id']).values(
+                event_id=event_id,
+                event_type=event_type,
+                payload=payload,
+                status='pending',
+                attempts=0,
+                received_at=now,
+                available_at=now
+            ))
+            db.session.commit()
+            return result.rowcount != 0
+        except Exception as e:
+            db.session.rollback()
+            raise e
+
+    def process_pending(self, limit: int = 100, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Claim up to `limit` due events in arrival order and apply them one by one"""
+        counts = {"processed": 0, "retrying": 0, "failed": 0}
+        for event_id in self._claim(limit, now or datetime.utcnow()):
+            counts[self._apply(event_id)] += 1
+        return counts
+
+    def replay(self, event_ids: Optional[Iterable[str]] = None) -> int:
+        """Queue events again: the given ids (whatever their status) or else every failed event"""
+        try:
+            events = StripeWebhookEvent.__table__
+            statement = update(events).values(
+                status='pending', attempts=0, last_error=None, available_at=datetime.utcnow()
+            )
+            if event_ids is None:
+                statement = statement.where(events.c.status == 'failed')
+            else:
+                statement = statement.where(events.c.event_id.in_(list(event_ids)))
+            result = db.session.execute(statement)
+            db.session.commit()
+            return result.rowcount
+        except Exception as e:
+            db.session.rollback()
+            raise e
+
+    def _claim(self, limit: int, now: datetime) -> List[str]:
+        """Mark due events as 'processing' (a lease until now + CLAIM_TIMEOUT) and return their ids
+
+        Each claim is a conditional UPDATE, so two workers never apply the same event.
+        """
+        events = StripeWebhookEvent.__table__
+        is_due = (
+            events.c.status.in_(('pending', 'processing')) &
+            (events.c.available_at <= now)
+        )
+        try:
+            candidates = db.session.execute(
+                select(events.c.event_id).where(is_due).order_by(events.c.received_at).limit(limit)
+            ).scalars().all()
+
+            claimed = []
+            for event_id in candidates:
+                result = db.session.execute(
+                    update(events)
+                    .where(events.c.event_id == event_id, is_due)
+                    .values(status='processing', attempts=events.c.attempts + 1, available_at=now + self.CLAIM_TIMEOUT)
+                )
+                if result.rowcount:
+                    claimed.append(event_id)
+            db.session.commit()
+            return claimed
+        except Exception as e:
+            db.session.rollback()
+            raise e
+
+    def _apply(self, event_id: str) -> str:
+        events = StripeWebhookEvent.__table__
+        row = db.session.execute(
+            select(events.c.payload, events.c.attempts).where(events.c.event_id == event_id)
+        ).one()
+
+        try:
+            self.handler(json.loads(row.payload))
+        except Exception as e:
+            db.session.rollback()
+            print(f"[webhook_queue] ❌ Event {event_id} failed (attempt {row.attempts}): {e}")
+            outcome = 'failed' if row.attempts >= self.MAX_ATTEMPTS else 'retrying'
+            db.session.execute(
+                update(events).where(events.c.event_id == event_id).values(
+                    status='failed' if outcome == 'failed' else 'pending',
+                    last_error=str(e)[:self.MAX_ERROR_LENGTH],
+                    available_at=datetime.utcnow() + self.RETRY_DELAY * (2 ** (row.attempts - 1))
+                )
+            )
+            db.session.commit()
+            return outcome
+
+        db.session.execute(
+            update(events).where(events.c.event_id == event_id).values(
+                status='processed', last_error=None, processed_at=datetime.utcnow()
+            )
+        )
+        db.session.commit()
+        return 'processed'
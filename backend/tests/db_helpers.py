@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Database the test scripts run against
+
+By default every test app gets a throwaway SQLite file. Set TEST_DATABASE_URL to run the
+same tests against another database, e.g. a local Postgres:
+
+    TEST_DATABASE_URL=postgresql://localhost/chromegrove_test python -m pytest tests/
+
+That database is dropped and recreated by each test app, so never point it at real data.
+"""
+
+import os
+import tempfile
+from typing import Any, Dict, Optional
+from flask import Flask
+from models import db
+
+TEST_DATABASE_URL = os.getenv('TEST_DATABASE_URL')
+USING_SQLITE = not TEST_DATABASE_URL or TEST_DATABASE_URL.startswith('sqlite')
+
+
+def database_uri() -> str:
+    """TEST_DATABASE_URL, or a fresh SQLite file"""
+    if TEST_DATABASE_URL:
+        return TEST_DATABASE_URL
+    return f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.sqlite3')}"
+
+
+def create_tables() -> None:
+    """Create the schema, first dropping whatever an earlier test left in a shared database"""
+    if TEST_DATABASE_URL:
+        db.drop_all()
+    db.create_all()
+
+
+def create_test_app(engine_options: Optional[Dict[str, Any]] = None) -> Flask:
+    """Create an app bound to a throwaway test database"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri()
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    if engine_options:
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options
+    db.init_app(app)
+    with app.app_context():
+        create_tables()
+    return app
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test script for the single-query, keyset-paginated announcement feed
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from models import db, Management, Announcement, BulletinBoard
+from db_helpers import create_test_app
+from services.announcement_service import AnnouncementService
+from datetime import datetime, timedelta
+
+
+def test_announcement_feed_pages_newest_first():
+    """Boards are merged newest first in one query and paged without gaps or repeats"""
+    app = create_test_app()
+    service = AnnouncementService()
+
+    with app.app_context():
+        manager = Management(clerk_user_id='feed_manager', email='manager@example.com', name='Morgan', role='management')
+        boards = {board_type: BulletinBoard(board_type=board_type) for board_type in ('student', 'staff', 'all')}
+        db.session.add_all([manager, *boards.values()])
+        db.session.flush()
+        start = datetime(2025, 1, 1)
+        for i in range(9):
+            board = boards[('student', 'staff', 'all')[i % 3]]
+            # Two announcements share each timestamp so the id breaks ties
+            db.session.add(Announcement(title=f'Post {i}', body='...', author_id=manager.id, board_id=board.id,
+                                        date_created=start + timedelta(hours=i // 2)))
+        db.session.commit()
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            first = service.get_feed(['student', 'staff'], limit=4)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        assert len(statements) == 1
+        assert [a['title'] for a in first['announcements']] == ['Post 7', 'Post 6', 'Post 4', 'Post 3']
+        assert first['announcements'][0]['author_name'] == 'Morgan' and first['announcements'][0]['board_type'] == 'staff'
+        print("✅ First page read in a single query, newest first")
+
+        second = service.get_feed(['student', 'staff'], limit=4, cursor=first['next_cursor'])
+        assert [a['title'] for a in second['announcements']] == ['Post 1', 'Post 0']
+        assert second['next_cursor'] is None
+        print("✅ Cursor continues where the first page stopped")
+
+        assert len(service.get_feed(['student', ' student', 'all'])['announcements']) == 6
+        whole = service.get_feed(['student', 'staff', 'all'], limit=None)
+        assert len(whole['announcements']) == Announcement.query.count() and whole['next_cursor'] is None
+        assert service.get_feed(['nobody'])['announcements'] == []
+        for bad in (lambda: service.get_feed(['student'], limit=0), lambda: service.get_feed(['student'], cursor='oops')):
+            try:
+                bad()
+                assert False, "expected ValueError"
+            except ValueError:
+                pass
+
+
+if __name__ == "__main__":
+    test_announcement_feed_pages_newest_first()
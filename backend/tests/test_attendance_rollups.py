@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Test script for incrementally maintained attendance rollups
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db, Staff, Student, StudioClass, ClassInstance, ClassEnrollment, AttendanceRollup
+from db_helpers import create_test_app
+from services.attendance_service import AttendanceService
+from services.staff_authorization_service import StaffAuthorizationService
+from services.attendance_rollup_service import AttendanceRollupService
+from services.class_service import ClassService
+from datetime import datetime, timedelta
+
+
+def rollup_counts(instance_id):
+    rollup = db.session.get(AttendanceRollup, instance_id)
+    db.session.refresh(rollup)
+    return (rollup.enrolled_count, rollup.attended_count, rollup.missed_count, rollup.cancelled_count)
+
+
+def test_attendance_rollups():
+    """Bookings, cancellations and attendance marking keep the rollup in step"""
+    app = create_test_app()
+    StaffAuthorizationService.clear()
+    with app.app_context():
+        print("🧪 Testing attendance rollups")
+        instructor = Staff(clerk_user_id='rollup_instructor', email='instructor@example.com', name='Instructor', role='staff')
+        db.session.add(instructor)
+        db.session.commit()
+
+        start_time = datetime.utcnow() - timedelta(hours=3)
+        studio_class = StudioClass(class_name='Rollup Class', start_time=start_time, duration=60, instructor_id=instructor.id, max_capacity=10)
+        db.session.add(studio_class)
+        db.session.commit()
+        instance = ClassInstance(instance_id=f"{studio_class.id}_rollup", class_id=studio_class.id, start_time=start_time, end_time=start_time + timedelta(hours=1), max_capacity=10)
+        db.session.add(instance)
+        students = [Student(clerk_user_id=f'rollup_student_{i}', email=f'rollup{i}@example.com', name=f'Student {i}', role='student') for i in range(4)]
+        db.session.add_all(students)
+        db.session.commit()
+
+        class_service = ClassService()
+        for student in students:
+            class_service.book_class(student.id, instance.instance_id)
+        assert rollup_counts(instance.instance_id) == (4, 0, 0, 0)
+        print("✅ Bookings counted")
+
+        class_service.cancel_enrollment(students[0].id, instance.instance_id)
+        assert rollup_counts(instance.instance_id) == (3, 0, 0, 1)
+        print("✅ Cancellation counted")
+
+        enrollment = ClassEnrollment.query.filter_by(student_id=students[1].id, instance_id=instance.instance_id).first()
+        AttendanceService().mark_student_attendance(enrollment.id, 'attended', instructor.id)
+        assert rollup_counts(instance.instance_id) == (2, 1, 0, 1)
+        print("✅ Attendance counted")
+
+        AttendanceService().sweep_no_shows(grace_minutes=30)
+        assert rollup_counts(instance.instance_id) == (0, 1, 2, 1)
+        print("✅ No-show sweep counted")
+
+        AttendanceRollupService().rebuild()
+        assert rollup_counts(instance.instance_id) == (0, 1, 2, 1)
+        print("✅ Rebuild matches incremental counts")
+
+        # A failing rollup update must not leave a staff booking committed without it
+        staff = Staff(clerk_user_id='rollup_staff', email='staff@example.com', name='Staff', role='staff')
+        db.session.add(staff)
+        db.session.commit()
+        future_start = datetime.utcnow() + timedelta(days=1)
+        future = ClassInstance(instance_id=f"{studio_class.id}_future", class_id=studio_class.id, start_time=future_start,
+                               end_time=future_start + timedelta(hours=1), max_capacity=10)
+        db.session.add(future)
+        db.session.commit()
+
+        def broken_transition(*args, **kwargs):
+            raise RuntimeError("rollup unavailable")
+        class_service.rollup_service.record_transition = broken_transition
+        try:
+            class_service.book_class_for_staff(staff.id, future.instance_id)
+            assert False, "booking succeeded without its rollup"
+        except RuntimeError:
+            pass
+        finally:
+            del class_service.rollup_service.record_transition
+        assert ClassEnrollment.query.filter_by(student_id=staff.id, instance_id=future.instance_id).count() == 0
+        class_service.book_class_for_staff(staff.id, future.instance_id)
+        assert rollup_counts(future.instance_id) == (1, 0, 0, 0)
+        print("✅ Staff booking and its rollup commit together")
+
+        report = AttendanceRollupService().get_report('instructor')
+        assert report[0]['instructor_id'] == instructor.id
+        assert report[0]['attendance_rate'] == round(1 / 3, 4)
+        print("✅ Instructor report reads the rollups")
+
+
+if __name__ == "__main__":
+    test_attendance_rollups()
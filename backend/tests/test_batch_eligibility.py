@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Test script for batch booking eligibility
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from models import db, Staff, Student, StudioClass, ClassInstance, ClassEnrollment
+from db_helpers import create_test_app
+from services.class_service import ClassService
+from services.membership_service import MembershipService, MembershipWindow
+from datetime import datetime, timedelta
+
+
+def test_batch_eligibility():
+    """Capacity for many instances comes from one query and eligibility from one window"""
+    app = create_test_app()
+
+    with app.app_context():
+        instructor = Staff(clerk_user_id='batch_instructor', email='instructor@example.com', name='Instructor', role='staff')
+        student = Student(clerk_user_id='batch_student', email='student@example.com', name='Student', role='student')
+        db.session.add_all([instructor, student])
+        db.session.commit()
+
+        now = datetime.utcnow()
+        studio_class = StudioClass(class_name='Batch Class', start_time=now, duration=60, instructor_id=instructor.id, max_capacity=1)
+        db.session.add(studio_class)
+        db.session.commit()
+
+        instance_ids = []
+        for days in (1, 2, 30):
+            start_time = now + timedelta(days=days)
+            instance = ClassInstance(
+                instance_id=f"{studio_class.id}_{start_time.strftime('%Y%m%d%H%M')}",
+                class_id=studio_class.id,
+                start_time=start_time,
+                end_time=start_time + timedelta(hours=1),
+                max_capacity=1
+            )
+            db.session.add(instance)
+            instance_ids.append(instance.instance_id)
+        db.session.add(ClassEnrollment(student_id=student.id, instance_id=instance_ids[0], status='enrolled'))
+        db.session.commit()
+
+        student_id = student.id
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        states = ClassService().get_booking_states(instance_ids + ['missing'], student_id)
+        event.remove(db.engine, 'before_cursor_execute', listener)
+        assert set(states) == set(instance_ids)
+        assert states[instance_ids[0]]['is_full'] and states[instance_ids[0]]['is_enrolled']
+        assert states[instance_ids[1]]['spots_left'] == 1 and not states[instance_ids[1]]['is_enrolled']
+        assert len(statements) == 2, statements
+        print("✅ Capacity state for every instance loaded with two queries")
+
+        window = MembershipWindow(now - timedelta(days=1), now + timedelta(days=7), False, 'Monthly Membership')
+        results = [MembershipService.eligibility_for_window(window, states[i]['start_time'], now)['can_book_free'] for i in instance_ids]
+        assert results == [True, True, False]
+        assert not MembershipService.eligibility_for_window(None, now, now)['can_book_free']
+        print("✅ Eligibility computed from a single membership window")
+
+
+if __name__ == "__main__":
+    test_batch_eligibility()
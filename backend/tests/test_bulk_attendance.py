@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test script for bulk roster attendance marking
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db, Staff, Student, StudioClass, ClassInstance, ClassEnrollment
+from db_helpers import create_test_app
+from services.attendance_service import AttendanceService
+from services.staff_authorization_service import StaffAuthorizationService
+from datetime import datetime, timedelta
+
+
+def create_roster(student_count=3):
+    """Create an instructor, a finished class instance and its enrollments"""
+    instructor = Staff(clerk_user_id='bulk_instructor', email='instructor@example.com', name='Instructor', role='staff')
+    other_staff = Staff(clerk_user_id='bulk_other_staff', email='other@example.com', name='Other Staff', role='staff')
+    db.session.add_all([instructor, other_staff])
+    db.session.commit()
+
+    start_time = datetime.utcnow() - timedelta(hours=2)
+    studio_class = StudioClass(
+        class_name='Bulk Attendance Class',
+        start_time=start_time,
+        duration=60,
+        instructor_id=instructor.id,
+        max_capacity=30
+    )
+    db.session.add(studio_class)
+    db.session.commit()
+
+    instance = ClassInstance(
+        instance_id=f"{studio_class.id}_{start_time.strftime('%Y%m%d%H%M')}",
+        class_id=studio_class.id,
+        start_time=start_time,
+        end_time=start_time + timedelta(hours=1),
+        max_capacity=30
+    )
+    db.session.add(instance)
+
+    enrollments = []
+    for i in range(student_count):
+        student = Student(clerk_user_id=f'bulk_student_{i}', email=f'student{i}@example.com', name=f'Student {i}', role='student')
+        db.session.add(student)
+        db.session.flush()
+        enrollment = ClassEnrollment(student_id=student.id, instance_id=instance.instance_id, status='enrolled')
+        db.session.add(enrollment)
+        enrollments.append(enrollment)
+    db.session.commit()
+
+    return instructor, other_staff, instance, enrollments
+
+
+def test_bulk_attendance():
+    """Mark a whole roster at once and check authorization and validation"""
+    app = create_test_app()
+    StaffAuthorizationService.clear()
+    with app.app_context():
+        print("🧪 Testing bulk attendance marking")
+        instructor, other_staff, instance, enrollments = create_roster()
+        service = AttendanceService()
+
+        marks = [
+            {'enrollment_id': enrollments[0].id, 'status': 'attended'},
+            {'enrollment_id': enrollments[1].id, 'status': 'missed'},
+            {'enrollment_id': enrollments[2].id, 'status': 'attended'},
+        ]
+        updated = service.mark_bulk_attendance(instance.instance_id, marks, instructor.id)
+        assert updated == 3
+        db.session.expire_all()
+        statuses = [db.session.get(ClassEnrollment, e.id).status for e in enrollments]
+        assert statuses == ['attended', 'missed', 'attended']
+        assert all(db.session.get(ClassEnrollment, e.id).marked_by_staff_id == instructor.id for e in enrollments)
+        print("✅ Roster marked in one batch")
+
+        try:
+            service.mark_bulk_attendance(instance.instance_id, marks, other_staff.id)
+            assert False, "Unassigned staff should not be able to mark attendance"
+        except ValueError:
+            print("✅ Unassigned staff rejected")
+
+        try:
+            service.mark_bulk_attendance(instance.instance_id, [{'enrollment_id': 9999, 'status': 'attended'}], instructor.id)
+            assert False, "Enrollments from other rosters should be rejected"
+        except ValueError:
+            print("✅ Unknown enrollment rejected")
+
+
+if __name__ == "__main__":
+    test_bulk_attendance()
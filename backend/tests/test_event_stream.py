@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test script for the Server-Sent Events broadcaster
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db, Staff, Student, StudioClass, ClassInstance, ChangeEvent
+from db_helpers import create_test_app
+from services.class_service import ClassService
+from services.events import announcement_changed, membership_status_changed
+from services.event_stream import EventBroadcaster, EventRelay, TooManySubscribersError
+from datetime import datetime, timedelta
+
+
+def drain(subscription):
+    events = []
+    while True:
+        event = subscription.get(timeout=0)
+        if event is None:
+            return events
+        events.append(event)
+
+
+def test_broadcaster_filters_replays_and_bounds():
+    """Events reach only the roles and boards they are meant for; reconnects replay from history"""
+    events = EventBroadcaster(queue_size=2, history_size=3, max_subscribers=3)
+    student = events.subscribe('student')
+    staff = events.subscribe('staff')
+
+    events.publish('announcement', {"announcement_id": 1}, board_type='staff')
+    events.publish('attendance', {"instance_ids": ['1_a']}, roles=('staff', 'management'))
+    assert drain(student) == []
+    assert [event.type for event in drain(staff)] == ['announcement', 'attendance']
+    print("✅ Role and board filtering")
+
+    first = events.publish('schedule', {"change": "booked"})
+    events.publish('schedule', {"change": "booking_cancelled"})
+    events.publish('schedule', {"change": "booked"})
+    assert [event.data['change'] for event in drain(student)] == ['booked', 'booking_cancelled']
+    assert student.overflowed  # Third event did not fit: the client is told to resync
+    chunks = events.stream(student, heartbeat=0)
+    assert next(chunks).startswith('retry:')
+    assert next(chunks).startswith('event: resync')
+    assert next(chunks) == ': keep-alive\n\n'
+    chunks.close()
+    assert events.subscriber_count == 1
+    print("✅ Slow clients are told to resync instead of blocking publishers")
+
+    reconnected = events.subscribe('student', last_event_id=first.id)
+    assert [event.data['change'] for event in drain(reconnected)] == ['booking_cancelled', 'booked']
+    assert not reconnected.overflowed
+    assert events.subscribe('student', last_event_id=0).overflowed  # Older events already gone
+    try:
+        events.subscribe('management')
+        assert False, "expected TooManySubscribersError"
+    except TooManySubscribersError:
+        pass
+    assert 'event: schedule\ndata: {"change":"booked"}' in first.encode()
+    print("✅ Last-Event-ID replay and subscriber cap")
+
+
+def test_service_changes_are_relayed_through_the_outbox():
+    """Changes recorded by any process reach subscribers through change_events, in order"""
+    app = create_test_app()
+    events = EventBroadcaster()
+    relay = EventRelay(events)
+    student_stream = events.subscribe('student')
+    management_stream = events.subscribe('management')
+
+    with app.app_context():
+        assert relay.poll() == 0
+        instructor = Staff(clerk_user_id='events_instructor', email='instructor@example.com', name='Instructor', role='staff')
+        student = Student(clerk_user_id='events_student', email='student@example.com', role='student')
+        db.session.add_all([instructor, student])
+        db.session.flush()
+        start = datetime.utcnow() + timedelta(days=1)
+        studio_class = StudioClass(class_name='Floorwork', start_time=start, duration=60, instructor_id=instructor.id, max_capacity=10, recurrence_pattern='one-time')
+        db.session.add(studio_class)
+        db.session.flush()
+        instance = ClassInstance(instance_id=f'{studio_class.id}_events', class_id=studio_class.id, start_time=start, end_time=start + timedelta(hours=1), max_capacity=10)
+        db.session.add(instance)
+        db.session.commit()
+        instance_id = instance.instance_id
+
+        service = ClassService()
+        service.book_class(student.id, instance.instance_id)
+        service.cancel_enrollment(student.id, instance.instance_id)
+        announcement_changed.send(None, change='created', announcement_id=7, board_type='staff')
+        announcement_changed.send(None, change='created', announcement_id=8, board_type='student')
+        # What the scheduler's membership sweep sends from its own process
+        membership_status_changed.send(None, status='expired', membership_ids=[3], clerk_user_ids=['events_student'])
+        assert drain(student_stream) == []  # Nothing is published until the relay polls
+        assert ChangeEvent.query.count() == 5
+
+        assert relay.poll() == 5
+        assert relay.poll() == 0
+
+        received = [(event.type, event.data.get('change'), event.data.get('instance_ids')) for event in drain(student_stream)]
+        assert received == [
+            ('schedule', 'booked', [instance_id]),
+            ('schedule', 'booking_cancelled', [instance_id]),
+            ('announcement', 'created', None),
+        ]
+        management_events = drain(management_stream)
+        assert [event.type for event in management_events] == ['schedule', 'schedule', 'announcement', 'announcement', 'membership']
+        assert management_events[-1].data == {"status": "expired", "membership_ids": [3]}
+        assert [event.id for event in management_events] == sorted(row.id for row in ChangeEvent.query)
+        print("✅ Recorded changes relayed to the matching subscribers")
+
+        # A restarted web process loads recent rows, so Last-Event-ID replay still works
+        restarted = EventBroadcaster()
+        EventRelay(restarted).poll()
+        reconnected = restarted.subscribe('management', last_event_id=management_events[2].id)
+        assert [event.type for event in drain(reconnected)] == ['announcement', 'membership']
+        print("✅ History survives a restart of the web process")
+
+
+if __name__ == "__main__":
+    test_broadcaster_filters_replays_and_bounds()
+    test_service_changes_are_relayed_through_the_outbox()
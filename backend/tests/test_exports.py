@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test script for the streaming bookkeeping exports
+"""
+
+import sys
+import os
+import io
+import csv
+import pytest
+from unittest import mock
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db, Staff, Student, StudioClass, ClassInstance, ClassEnrollment, ClassCredit, SlidingScaleOption, Payment
+from db_helpers import create_test_app
+from controllers.report_controller import ReportController
+from services.export_service import ExportService
+from datetime import datetime, date, timedelta
+
+
+def seed():
+    instructor = Staff(clerk_user_id='export_instructor', email='instructor@example.com', name='Instructor', role='staff')
+    student = Student(clerk_user_id='export_student', email='ada@example.com', name='Ada', role='student')
+    option = SlidingScaleOption(tier_name='Drop-in', price_min=10, price_max=20, category='drop-in')
+    db.session.add_all([instructor, student, option])
+    db.session.flush()
+    start = datetime(2025, 1, 10, 18)
+    studio_class = StudioClass(class_name='Floorwork', start_time=start, duration=60, instructor_id=instructor.id, max_capacity=10, recurrence_pattern='one-time')
+    db.session.add(studio_class)
+    db.session.flush()
+    instance = ClassInstance(instance_id=f'{studio_class.id}_export', class_id=studio_class.id, start_time=start, end_time=start + timedelta(hours=1), max_capacity=10)
+    db.session.add(instance)
+    db.session.add_all([
+        Payment(amount=10 + day, student_id=student.id, sliding_scale_option_id=option.id, instance_id=instance.instance_id,
+                class_name='Floorwork', status='completed', date=datetime(2025, 1, day, 12))
+        for day in range(1, 8)
+    ])
+    db.session.flush()
+    enrollment = ClassEnrollment(student_id=student.id, instance_id=instance.instance_id, status='cancelled', enrolled_at=datetime(2025, 1, 2))
+    db.session.add(enrollment)
+    db.session.flush()
+    db.session.add(ClassCredit(student_id=student.id, reason='cancellation by student', source_enrollment_id=enrollment.id))
+    db.session.commit()
+
+
+def test_csv_export_streams_in_chunks():
+    """CSV exports are joined with names, filtered by date and read chunk by chunk"""
+    app = create_test_app()
+    service = ExportService()
+
+    with app.app_context():
+        seed()
+
+        chunks = list(service.iter_chunks('payments', chunk_size=3))
+        assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+        assert [row[0] for chunk in chunks for row in chunk] == list(range(1, 8))
+
+        body = b''.join(service.stream('payments', 'csv', date(2025, 1, 2), date(2025, 1, 4), chunk_size=2)).decode('utf-8')
+        rows = list(csv.DictReader(io.StringIO(body)))
+        assert [row['amount'] for row in rows] == ['12.0', '13.0', '14.0']
+        assert rows[0]['student_name'] == 'Ada' and rows[0]['class_name'] == 'Floorwork' and rows[0]['tier_name'] == 'Drop-in'
+        print("✅ Payments exported in chunks with the date filter applied")
+
+        enrollments = list(csv.DictReader(io.StringIO(b''.join(service.stream('class_enrollments')).decode('utf-8'))))
+        assert (enrollments[0]['student_email'], enrollments[0]['class_name'], enrollments[0]['status']) == ('ada@example.com', 'Floorwork', 'cancelled')
+        credits = list(csv.DictReader(io.StringIO(b''.join(service.stream('class_credits')).decode('utf-8'))))
+        assert (credits[0]['source_class_name'], credits[0]['used']) == ('Floorwork', 'False')
+        print("✅ Enrollments and credits joined with student and class names")
+
+        for bad in (lambda: service.stream('users'), lambda: service.stream('payments', 'xml'),
+                    lambda: service.stream('payments', start_date=date(2025, 2, 1), end_date=date(2025, 1, 1))):
+            try:
+                bad()
+                assert False, "expected ValueError"
+            except ValueError:
+                pass
+
+
+def test_parquet_export_round_trips():
+    """Parquet exports are written one row group per chunk (needs pyarrow)"""
+    pq = pytest.importorskip('pyarrow.parquet')
+
+    app = create_test_app()
+    with app.app_context():
+        seed()
+        data = b''.join(ExportService().stream('payments', 'parquet', chunk_size=3))
+        parquet = pq.ParquetFile(io.BytesIO(data))
+        assert parquet.metadata.num_rows == 7 and parquet.num_row_groups == 3
+        table = parquet.read()
+        assert table.column('student_name').to_pylist() == ['Ada'] * 7
+        assert table.column('date').to_pylist()[0] == datetime(2025, 1, 1, 12)
+        print("✅ Parquet export readable, one row group per chunk")
+
+
+def test_parquet_export_without_pyarrow_is_rejected():
+    """The export endpoint answers 400 for Parquet when pyarrow cannot be imported"""
+    app = create_test_app()
+    controller = ReportController()
+    app.add_url_rule('/api/exports/<dataset>', 'export_dataset', controller.export_dataset)
+
+    with app.app_context():
+        seed()
+    with mock.patch.dict(sys.modules, {'pyarrow': None}):
+        response = app.test_client().get('/api/exports/payments?format=parquet')
+    assert response.status_code == 400
+    assert 'requires pyarrow' in response.get_json()['error']
+    print("✅ Parquet export without pyarrow rejected with 400")
+
+
+if __name__ == "__main__":
+    test_csv_export_streams_in_chunks()
+    test_parquet_export_round_trips()
+    test_parquet_export_without_pyarrow_is_rejected()
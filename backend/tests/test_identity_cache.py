@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test script for the clerk_user_id identity cache
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from models import db, Membership, Student, SlidingScaleOption, Payment, User
+from db_helpers import create_test_app
+from services.user_service import UserService
+from services.membership_service import MembershipService
+from datetime import datetime, timedelta
+
+
+def test_identity_cache():
+    """Identities are cached across requests and refreshed on creation and membership activation"""
+    app = create_test_app()
+    user_service = UserService()
+    membership_service = MembershipService()
+
+    with app.app_context():
+        assert user_service.get_identity_by_clerk_id('identity_student') is None
+        user_service.create_user({'clerk_user_id': 'identity_student', 'email': 'student@example.com', 'role': 'student', 'name': 'Student'})
+
+    with app.app_context():
+        identity = user_service.get_identity_by_clerk_id('identity_student')
+        assert identity.discriminator == 'student' and identity.membership_id is None
+        membership_service.get_membership_status('identity_student')
+        print("✅ New user is visible right after creation")
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        assert user_service.get_identity_by_clerk_id('identity_student') == identity
+        membership_service.get_membership_status('identity_student')
+        event.remove(db.engine, 'before_cursor_execute', listener)
+        assert not any('FROM users' in statement for statement in statements), statements
+        print("✅ Later requests resolve the identity without querying users")
+
+    with app.app_context():
+        option = SlidingScaleOption(tier_name='Monthly Membership', price_min=50, price_max=80, category='membership')
+        db.session.add(option)
+        db.session.commit()
+        payment = Payment(amount=50, student_id=identity.id, sliding_scale_option_id=option.id, status='completed')
+        db.session.add(payment)
+        db.session.commit()
+
+        membership_service.activate_membership(payment.id)
+        refreshed = user_service.get_identity_by_clerk_id('identity_student')
+        assert refreshed.membership_id is not None
+        assert membership_service.get_membership_status('identity_student')['has_membership']
+        print("✅ Membership activation refreshes the cached identity")
+
+        UserService.invalidate_identity('identity_student')
+
+    # Type changes and deletions are visible to the next request
+    with app.app_context():
+        user_service.create_user({'clerk_user_id': 'identity_changing', 'email': 'changing@example.com', 'role': 'student', 'name': 'Changing'})
+        assert user_service.get_identity_by_clerk_id('identity_changing').discriminator == 'student'
+
+    with app.app_context():
+        user = User.query.filter_by(clerk_user_id='identity_changing').first()
+        user.discriminator = 'staff'
+        user_service.update_user(user)
+
+    with app.app_context():
+        assert user_service.get_identity_by_clerk_id('identity_changing').discriminator == 'staff'
+        assert user_service.delete_user(User.query.filter_by(clerk_user_id='identity_changing').first())
+
+    with app.app_context():
+        assert user_service.get_identity_by_clerk_id('identity_changing') is None
+        print("✅ Updating or deleting a user refreshes the cached identity")
+
+
+if __name__ == "__main__":
+    test_identity_cache()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test script for the membership expiry and renewal sweep
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db, Membership, Student
+from db_helpers import create_test_app
+from services.events import membership_status_changed
+from services.membership_service import MembershipService
+from datetime import datetime, timedelta
+
+
+def test_membership_sweep():
+    """Ended memberships expire, soon-ending ones await renewal and events name the students"""
+    app = create_test_app()
+    service = MembershipService()
+    events = []
+    handler = lambda sender, **kwargs: events.append(kwargs)
+    membership_status_changed.connect(handler)
+
+    try:
+        with app.app_context():
+            now = datetime.utcnow()
+            plans = {
+                'sweep_ended': (now - timedelta(days=40), now - timedelta(hours=1), False),
+                'sweep_ending': (now - timedelta(days=28), now + timedelta(days=2), False),
+                'sweep_cancelled': (now - timedelta(days=28), now + timedelta(days=2), True),
+                'sweep_current': (now - timedelta(days=1), now + timedelta(days=29), False),
+            }
+            memberships = {}
+            for clerk_user_id, (start, end, cancelled) in plans.items():
+                membership = Membership(membership_type='Monthly Membership', start_date=start, end_date=end, cancelled=cancelled)
+                db.session.add(membership)
+                db.session.flush()
+                db.session.add(Student(clerk_user_id=clerk_user_id, email=f'{clerk_user_id}@example.com', role='student', membership_id=membership.id))
+                memberships[clerk_user_id] = membership
+            db.session.commit()
+
+            # A stale cached window is dropped by the event
+            assert service.get_membership_window('sweep_ended').status == 'active'
+
+            counts = service.sweep_memberships(renewal_notice_days=3, now=now)
+            assert counts == {'expired': 1, 'pending_renewal': 1}
+            db.session.expire_all()
+            assert {c: db.session.get(Membership, m.id).status for c, m in memberships.items()} == {
+                'sweep_ended': 'expired',
+                'sweep_ending': 'pending_renewal',
+                'sweep_cancelled': 'active',
+                'sweep_current': 'active',
+            }
+            print("✅ Memberships swept to expired and pending renewal")
+
+            assert sorted((e['status'], e['clerk_user_ids'][0]) for e in events) == [('expired', 'sweep_ended'), ('pending_renewal', 'sweep_ending')]
+            assert service.get_membership_window('sweep_ended').status == 'expired'
+            assert Membership.query.filter(Membership.current_predicate()).count() == 3
+            print("✅ Events sent and cached windows refreshed")
+
+            assert service.sweep_memberships(renewal_notice_days=3, now=now) == {'expired': 0, 'pending_renewal': 0}
+            print("✅ Second sweep finds nothing to do")
+
+            for clerk_user_id in plans:
+                MembershipService.invalidate_membership(clerk_user_id)
+    finally:
+        membership_status_changed.disconnect(handler)
+
+
+if __name__ == "__main__":
+    test_membership_sweep()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Test script for the cached membership window used by booking eligibility
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from models import db, Membership, Student
+from db_helpers import create_test_app
+from services.membership_service import MembershipService
+from datetime import datetime, timedelta
+
+
+def test_membership_window():
+    """Eligibility is answered from the cached window and cancellation refreshes it"""
+    app = create_test_app()
+    service = MembershipService()
+
+    with app.app_context():
+        now = datetime.utcnow()
+        membership = Membership(membership_type='Monthly Membership', start_date=now - timedelta(days=1), end_date=now + timedelta(days=10))
+        db.session.add(membership)
+        db.session.flush()
+        db.session.add(Student(clerk_user_id='window_member', email='member@example.com', name='Member', role='student', membership_id=membership.id))
+        db.session.add(Student(clerk_user_id='window_guest', email='guest@example.com', name='Guest', role='student'))
+        db.session.commit()
+        MembershipService.invalidate_membership('window_member')
+        MembershipService.invalidate_membership('window_guest')
+
+        window = service.get_membership_window('window_member')
+        assert window.end == membership.end_date and not window.cancelled
+        assert service.get_membership_window('window_guest') is None
+
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        inside = service.can_book_class_for_free('window_member', now + timedelta(days=5))
+        outside = service.can_book_class_for_free('window_member', now + timedelta(days=20))
+        guest = service.can_book_class_for_free('window_guest', now + timedelta(days=5))
+        event.remove(db.engine, 'before_cursor_execute', listener)
+        assert inside['can_book_free'] and not outside['can_book_free'] and not guest['can_book_free']
+        assert statements == [], statements
+        print("✅ Eligibility answered from the cached window")
+
+        service.cancel_membership('window_member')
+        window = service.get_membership_window('window_member')
+        assert window.cancelled and window.end == now + timedelta(days=9)
+        print("✅ Cancellation invalidates the cached window")
+
+        MembershipService.invalidate_membership('window_member')
+        MembershipService.invalidate_membership('window_guest')
+
+
+if __name__ == "__main__":
+    test_membership_window()
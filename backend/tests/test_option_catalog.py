@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test script for the cached sliding scale option catalog
+"""
+
+import sys
+import os
+import json
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from models import db, SlidingScaleOption
+from db_helpers import create_test_app
+from services import option_catalog
+from services.option_catalog import get_option_catalog
+from services.payment_service import PaymentService
+
+
+def test_option_catalog_snapshots():
+    """Lookups and list bodies come from the snapshot; edits swap in a new one"""
+    app = create_test_app()
+    service = PaymentService()
+
+    with app.app_context():
+        db.session.add_all([
+            SlidingScaleOption(tier_name='Drop-in', price_min=10, price_max=20, category='drop-in'),
+            SlidingScaleOption(tier_name='Monthly', price_min=50, price_max=80, category='membership'),
+            SlidingScaleOption(tier_name='Retired', price_min=40, price_max=40, category='membership', is_active=False),
+        ])
+        db.session.commit()
+
+        catalog = get_option_catalog()
+        assert [option.tier_name for option in catalog.by_category['membership']] == ['Monthly', 'Retired']
+        assert json.loads(catalog.bodies['membership'])['options'][0]['tier_name'] == 'Monthly'
+        assert len(json.loads(catalog.bodies['membership'])['options']) == 1
+        assert 'is_active' in json.loads(catalog.bodies['all'])['options'][0]
+        try:
+            catalog.by_id[99] = None
+            assert False, "expected the snapshot to be read-only"
+        except TypeError:
+            pass
+        print("✅ Catalog indexed by id and category with encoded list bodies")
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            option, amount = PaymentService.validate_payment_option(1, 15)
+            assert (option.tier_name, amount) == ('Drop-in', 15)
+            assert PaymentService.get_options_body('drop-in') is catalog.bodies['drop-in']
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        assert statements == []
+        print("✅ Checkout validation served without queries")
+
+        service.create_sliding_scale_option({'tier_name': 'Supporter', 'price_min': 25, 'price_max': 35, 'category': 'drop-in'})
+        refreshed = get_option_catalog()
+        assert refreshed is not catalog and refreshed.version > catalog.version
+        assert [option.tier_name for option in refreshed.by_category['drop-in']] == ['Drop-in', 'Supporter']
+        assert len(catalog.by_category['drop-in']) == 1  # Old snapshot untouched
+        print("✅ Creating an option swaps in a rebuilt catalog")
+
+        # An edit made elsewhere (another process) is picked up by the version check
+        db.session.get(SlidingScaleOption, 1).price_max = 25
+        db.session.commit()
+        interval, option_catalog.CATALOG_CHECK_INTERVAL = option_catalog.CATALOG_CHECK_INTERVAL, 0
+        try:
+            assert get_option_catalog().get(1).price_max == 25
+            PaymentService.validate_payment_option(1, 25)
+        finally:
+            option_catalog.CATALOG_CHECK_INTERVAL = interval
+        print("✅ Version change rebuilds the catalog")
+
+
+if __name__ == "__main__":
+    test_option_catalog_snapshots()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Test script for checkout session reuse and the stale pending-payment sweep
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db, Staff, Student, StudioClass, ClassInstance, ClassEnrollment, SlidingScaleOption, Payment
+from db_helpers import create_test_app
+from fake_stripe import FakeStripe
+from services.payment_service import PaymentService
+from services.stripe_gateway import StripeGateway, set_stripe_gateway
+from datetime import datetime, timedelta
+
+
+def test_open_checkout_reused_and_stale_payments_expired():
+    """An open session is handed out again; payments whose session expired are swept in bulk"""
+    app = create_test_app()
+
+    with FakeStripe() as fake, app.app_context():
+        set_stripe_gateway(StripeGateway('sk_test_fake', api_base=fake.url))
+        try:
+            instructor = Staff(clerk_user_id='pending_instructor', email='instructor@example.com', name='Instructor', role='staff')
+            student = Student(clerk_user_id='pending_student', email='student@example.com', role='student')
+            option = SlidingScaleOption(tier_name='Drop-in', price_min=10, price_max=20, category='drop-in')
+            db.session.add_all([instructor, student, option])
+            db.session.flush()
+            start = datetime.utcnow() + timedelta(days=1)
+            studio_class = StudioClass(class_name='Floorwork', start_time=start, duration=60, instructor_id=instructor.id, max_capacity=10, recurrence_pattern='one-time')
+            db.session.add(studio_class)
+            db.session.flush()
+            instance = ClassInstance(instance_id=f'{studio_class.id}_pending', class_id=studio_class.id, start_time=start, end_time=start + timedelta(hours=1), max_capacity=10)
+            db.session.add(instance)
+            db.session.commit()
+
+            payment = PaymentService.create_payment(student.id, 10, option.id, instance.instance_id, 'Floorwork')
+            session = PaymentService.create_stripe_checkout_session(payment.id, 'http://localhost/success', 'http://localhost/cancel')
+            assert payment.checkout_url == session.url
+            assert payment.checkout_expires_at > datetime.utcnow() + timedelta(hours=23)
+
+            reused = PaymentService.find_open_checkout(student.id, option.id, 10, instance.instance_id)
+            assert reused.id == payment.id and reused.stripe_session_id == session.id
+            assert PaymentService.find_open_checkout(student.id, option.id, 15, instance.instance_id) is None
+            assert PaymentService.find_open_checkout(student.id, option.id, 10) is None
+            assert PaymentService.find_open_checkout(student.id, option.id, 10, instance.instance_id,
+                                                     now=payment.checkout_expires_at - timedelta(minutes=5)) is None
+            print("✅ Open session reused only for the same class, option and amount")
+
+            abandoned = Payment(amount=10, student_id=student.id, sliding_scale_option_id=option.id,
+                                date=datetime.utcnow() - timedelta(hours=30))
+            recent = Payment(amount=10, student_id=student.id, sliding_scale_option_id=option.id)
+            db.session.add_all([abandoned, recent])
+            db.session.commit()
+
+            assert PaymentService.expire_stale_payments() == 1
+            assert db.session.get(Payment, abandoned.id, populate_existing=True).status == 'expired'
+            assert db.session.get(Payment, recent.id, populate_existing=True).status == 'pending'
+            assert db.session.get(Payment, payment.id, populate_existing=True).status == 'pending'
+
+            # A day later both the session and the sessionless payment are stale
+            assert PaymentService.expire_stale_payments(now=payment.checkout_expires_at + timedelta(seconds=1)) == 2
+            assert db.session.get(Payment, payment.id, populate_existing=True).status == 'expired'
+            assert db.session.get(Payment, recent.id, populate_existing=True).status == 'expired'
+            assert PaymentService.find_open_checkout(student.id, option.id, 10, instance.instance_id) is None
+            print("✅ Sweep expires payments past their session expiry or the TTL")
+
+            # A webhook arriving after the sweep still completes and books the payment
+            assert PaymentService.complete_payment(payment.id, session.id)
+            assert ClassEnrollment.query.filter_by(payment_id=payment.id).count() == 1
+            print("✅ Late webhook completes an expired payment")
+        finally:
+            set_stripe_gateway(None)
+
+
+if __name__ == "__main__":
+    test_open_checkout_reused_and_stale_payments_expired()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Test script checking that the hot booking, credit, schedule, payment and feed filters use indexes
+"""
+
+import sys
+import os
+import tempfile
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import func, insert, select, text
+from models import (db, Announcement, BulletinBoard, ClassCredit, ClassEnrollment, ClassInstance, Payment,
+                    SlidingScaleOption, StudioClass, User)
+
+
+def create_test_app():
+    """Create an app bound to a throwaway SQLite database
+
+    Overrides db_helpers.create_test_app: the plans checked here are SQLite EXPLAIN QUERY PLAN output.
+    """
+    app = Flask(__name__)
+    db_path = os.path.join(tempfile.mkdtemp(), 'test.sqlite3')
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def seed():
+    """A few weeks of a small studio, then ANALYZE so the planner sees realistic statistics"""
+    now = datetime.utcnow()
+    db.session.execute(insert(User.__table__), [
+        {'id': i, 'clerk_user_id': f'user_{i}', 'email': f'user{i}@example.com', 'name': f'User {i}',
+         'role': 'staff' if i == 1 else 'student'}
+        for i in range(1, 101)
+    ])
+    db.session.execute(insert(StudioClass.__table__), [
+        {'id': c, 'class_name': f'Class {c}', 'start_time': now, 'duration': 60, 'instructor_id': 1,
+         'max_capacity': 20, 'recurrence_pattern': 'weekly'}
+        for c in range(1, 21)
+    ])
+    instances = [
+        {'instance_id': f'{c}_{w}', 'class_id': c, 'start_time': now + timedelta(days=7 * w - 28, hours=c),
+         'end_time': now + timedelta(days=7 * w - 28, hours=c + 1), 'max_capacity': 20, 'is_cancelled': w == 3}
+        for c in range(1, 21) for w in range(8)
+    ]
+    db.session.execute(insert(ClassInstance.__table__), instances)
+    db.session.execute(insert(ClassEnrollment.__table__), [
+        {'student_id': 2 + (i * 7 + n) % 99, 'instance_id': instance['instance_id'], 'payment_type': 'drop-in',
+         'status': ('enrolled', 'attended', 'missed', 'cancelled')[n % 4]}
+        for i, instance in enumerate(instances) for n in range(10)
+    ])
+    db.session.execute(insert(ClassCredit.__table__), [
+        {'student_id': 2 + i % 99, 'reason': 'cancellation by student', 'used': i % 3 == 0,
+         'created_at': now - timedelta(days=i)}
+        for i in range(300)
+    ])
+    db.session.execute(insert(SlidingScaleOption.__table__).values(
+        id=1, tier_name='Drop-in', price_min=10, price_max=20, category='drop-in'
+    ))
+    db.session.execute(insert(Payment.__table__), [
+        {'student_id': 2 + i % 99, 'sliding_scale_option_id': 1, 'amount': 15,
+         'status': ('completed', 'pending', 'expired')[i % 3], 'date': now - timedelta(hours=i)}
+        for i in range(600)
+    ])
+    db.session.execute(insert(BulletinBoard.__table__), [
+        {'id': 1, 'board_type': 'student'}, {'id': 2, 'board_type': 'staff'}
+    ])
+    db.session.execute(insert(Announcement.__table__), [
+        {'title': f'News {i}', 'body': 'Details', 'author_id': 1, 'board_id': 1 + i % 2,
+         'date_created': now - timedelta(hours=i)}
+        for i in range(200)
+    ])
+    db.session.commit()
+    db.session.execute(text("ANALYZE"))
+    db.session.commit()
+
+
+def query_plan(statement) -> str:
+    """EXPLAIN QUERY PLAN of a statement, one plan step per line"""
+    compiled = statement.compile(dialect=db.engine.dialect, compile_kwargs={'render_postcompile': True})
+    parameters = tuple(compiled.params[name] for name in compiled.positiontup)
+    rows = db.session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", parameters).all()
+    return '\n'.join(row[-1] for row in rows)
+
+
+def assert_uses_index(statement, index_name, sorted_by_index=True):
+    plan = query_plan(statement)
+    assert f"INDEX {index_name}" in plan, plan
+    assert 'SCAN' not in plan, plan
+    if sorted_by_index:
+        assert 'TEMP B-TREE' not in plan, plan
+
+
+def test_hot_filter_query_plans():
+    """Each hot predicate is answered by its composite index, without scans or sorts"""
+    app = create_test_app()
+    now = datetime.utcnow()
+
+    with app.app_context():
+        seed()
+
+        # ClassService.book_class / cancel_booking: is this student booked on this instance?
+        assert_uses_index(
+            select(ClassEnrollment).where(ClassEnrollment.student_id == 5, ClassEnrollment.instance_id == '3_4',
+                                          ClassEnrollment.status == 'enrolled'),
+            'idx_class_enrollments_student_instance_status'
+        )
+        # Class rosters and cancellations: enrolled students of an instance
+        assert_uses_index(
+            select(ClassEnrollment).where(ClassEnrollment.instance_id == '3_4', ClassEnrollment.status == 'enrolled'),
+            'idx_class_enrollments_status_instance'
+        )
+        print("✅ Enrollment lookups use their composite indexes")
+
+        # CreditService.use_credit / get_available_credits: oldest unused credit first
+        assert_uses_index(
+            select(ClassCredit).where(ClassCredit.student_id == 5, ClassCredit.used == False)
+            .order_by(ClassCredit.created_at.asc()),
+            'idx_class_credits_student_used_created'
+        )
+        assert_uses_index(
+            select(func.count()).select_from(ClassCredit)
+            .where(ClassCredit.student_id == 5, ClassCredit.used == False),
+            'idx_class_credits_student_used_created'
+        )
+        print("✅ Credit lookups are ordered by the index")
+
+        # Staff schedule: upcoming instances of one class
+        assert_uses_index(
+            select(ClassInstance).where(ClassInstance.class_id == 3, ClassInstance.start_time > now,
+                                        ClassInstance.is_cancelled == False)
+            .order_by(ClassInstance.start_time),
+            'idx_class_instances_class_start'
+        )
+        # Public schedule: upcoming instances of every class
+        assert_uses_index(
+            select(ClassInstance).where(ClassInstance.is_cancelled == False, ClassInstance.start_time > now)
+            .order_by(ClassInstance.start_time),
+            'idx_class_instances_cancelled_start'
+        )
+        print("✅ Schedule queries use the instance start time indexes")
+
+        # PaymentService.get_student_payments
+        assert_uses_index(select(Payment).where(Payment.student_id == 5), 'idx_payments_student_id')
+        print("✅ Payment history uses the student index")
+
+        # Announcement feed branch: newest posts of one board
+        assert_uses_index(
+            select(Announcement).where(Announcement.board_id == 1)
+            .order_by(Announcement.date_created.desc()).limit(50),
+            'idx_announcements_board_date_created'
+        )
+        print("✅ Announcement feed is read off the board index")
+
+
+if __name__ == "__main__":
+    test_hot_filter_query_plans()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test script for payment/enrollment/credit reconciliation
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from models import db, Staff, Student, StudioClass, ClassInstance, ClassEnrollment, ClassCredit, SlidingScaleOption, Payment, Membership, AttendanceRollup
+from db_helpers import create_test_app
+from services.reconciliation_service import ReconciliationService
+from datetime import datetime, timedelta
+
+
+def test_reconciliation_detects_and_fixes_mismatches():
+    """Every mismatch class is found with a fixed number of queries and fixed in bulk"""
+    app = create_test_app()
+    service = ReconciliationService()
+
+    with app.app_context():
+        now = datetime.utcnow()
+        membership = Membership(membership_type='Monthly Membership', start_date=now - timedelta(days=1), end_date=now + timedelta(days=29))
+        db.session.add(membership)
+        db.session.flush()
+        instructor = Staff(clerk_user_id='recon_instructor', email='instructor@example.com', name='Instructor', role='staff')
+        member = Student(clerk_user_id='recon_member', email='member@example.com', role='student', membership_id=membership.id)
+        drop_in = Student(clerk_user_id='recon_drop_in', email='drop_in@example.com', role='student')
+        db.session.add_all([instructor, member, drop_in])
+        db.session.flush()
+        start = now + timedelta(days=1)
+        studio_class = StudioClass(class_name='Flexibility', start_time=start, duration=60, instructor_id=instructor.id, max_capacity=10, recurrence_pattern='one-time')
+        db.session.add(studio_class)
+        db.session.flush()
+        instance = ClassInstance(instance_id=f'{studio_class.id}_recon', class_id=studio_class.id, start_time=start, end_time=start + timedelta(hours=1), max_capacity=10)
+        option = SlidingScaleOption(tier_name='Drop-in', price_min=10, price_max=20, category='drop-in')
+        db.session.add_all([instance, option])
+        db.session.flush()
+
+        def pay(student, status='completed', instance_id=instance.instance_id):
+            payment = Payment(amount=10, student_id=student.id, sliding_scale_option_id=option.id, instance_id=instance_id, class_name='Flexibility', status=status)
+            db.session.add(payment)
+            db.session.flush()
+            return payment
+
+        orphan_member = pay(member)
+        orphan_drop_in = pay(drop_in)
+        duplicate = pay(drop_in)  # Second payment for the same class
+        pay(drop_in, status='pending')
+        pay(drop_in, instance_id='missing_instance')
+        enrolled = pay(member)
+        # A cancelled booking (the credit's source) does not count as already enrolled
+        cancelled_booking = ClassEnrollment(student_id=member.id, instance_id=instance.instance_id, payment_id=enrolled.id, status='cancelled')
+        dangling = ClassEnrollment(student_id=drop_in.id, instance_id=instance.instance_id, payment_id=9999, status='cancelled')
+        staff_booking = ClassEnrollment(student_id=instructor.id, instance_id=instance.instance_id, status='enrolled')
+        db.session.add_all([cancelled_booking, dangling, staff_booking])
+        db.session.flush()
+        backed_credit = ClassCredit(student_id=member.id, reason='cancellation by student', source_enrollment_id=cancelled_booking.id)
+        orphan_credit = ClassCredit(student_id=drop_in.id, reason='cancellation by student', source_enrollment_id=8888)
+        unsourced_used = ClassCredit(student_id=drop_in.id, reason='manual', used=True, used_at=now)
+        # Its source enrollment exists but was never cancelled
+        active_source = ClassCredit(student_id=instructor.id, reason='cancellation by student', source_enrollment_id=staff_booking.id)
+        db.session.add_all([backed_credit, orphan_credit, unsourced_used, active_source])
+        db.session.commit()
+        ids = {name: obj.id for name, obj in [('orphan_member', orphan_member), ('orphan_drop_in', orphan_drop_in), ('duplicate', duplicate),
+                                               ('dangling', dangling), ('orphan_credit', orphan_credit), ('unsourced_used', unsourced_used),
+                                               ('active_source', active_source)]}
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            report = service.reconcile()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        assert len([s for s in statements if s.lstrip().upper().startswith('SELECT')]) == 3
+        assert report['dry_run']
+        checks = report['checks']
+        assert checks['paid_without_enrollment']['found'] == 4 and checks['paid_without_enrollment']['fixable'] == 2
+        assert {c['payment_id']: c.get('payment_type') for c in checks['paid_without_enrollment']['changes'] if c['action'] == 'enroll'} == {
+            ids['orphan_member']: 'membership', ids['orphan_drop_in']: 'drop-in'}
+        assert checks['enrollment_missing_payment']['changes'][0]['payment_id'] == {'before': 9999, 'after': None}
+        assert [(c['credit_id'], c['action']) for c in checks['credit_missing_source']['changes']] == [
+            (ids['orphan_credit'], 'void'), (ids['unsourced_used'], 'skipped: credit already used'), (ids['active_source'], 'void')]
+        assert ClassEnrollment.query.count() == 3
+        print("✅ Dry run found every mismatch in three queries and changed nothing")
+
+        report = service.reconcile(apply=True)
+        assert not report['dry_run']
+        db.session.expire_all()
+        enrollments = {e.payment_id: e for e in ClassEnrollment.query.filter(ClassEnrollment.payment_id.in_([ids['orphan_member'], ids['orphan_drop_in'], ids['duplicate']]))}
+        assert set(enrollments) == {ids['orphan_member'], ids['orphan_drop_in']}
+        assert enrollments[ids['orphan_member']].payment_type == 'membership'
+        assert enrollments[ids['orphan_member']].change_seq > 0
+        assert db.session.get(AttendanceRollup, instance.instance_id).enrolled_count == 2
+        assert db.session.get(ClassEnrollment, ids['dangling']).payment_id is None
+        assert db.session.get(ClassCredit, ids['orphan_credit']).used and db.session.get(ClassCredit, ids['active_source']).used
+        assert not db.session.get(ClassCredit, backed_credit.id).used
+        print("✅ Fixes applied in bulk")
+
+        report = service.reconcile()
+        assert report['checks']['paid_without_enrollment']['fixable'] == 0
+        assert report['checks']['enrollment_missing_payment']['found'] == 0
+        assert report['checks']['credit_missing_source']['fixable'] == 0
+        print("✅ Second run has nothing left to fix")
+
+        try:
+            service.reconcile(checks=['bogus'])
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+
+
+if __name__ == "__main__":
+    test_reconciliation_detects_and_fixes_mismatches()
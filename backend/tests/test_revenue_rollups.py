@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test script for the incremental revenue rollups
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db, Student, SlidingScaleOption, Payment, RevenueRollup
+from db_helpers import create_test_app
+from services.payment_service import PaymentService
+from services.revenue_rollup_service import RevenueRollupService
+from datetime import datetime, date
+
+
+def test_revenue_rollups_follow_completed_payments():
+    """Completing a payment updates its day/option/category rollup once; rebuild agrees"""
+    app = create_test_app()
+    service = RevenueRollupService()
+
+    with app.app_context():
+        student = Student(clerk_user_id='revenue_student', email='student@example.com', role='student')
+        drop_in = SlidingScaleOption(tier_name='Sliding Scale: Moderate', price_min=25, price_max=35, category='drop-in')
+        donation = SlidingScaleOption(tier_name='Supporter', price_min=40, price_max=60, category='donation')
+        db.session.add_all([student, drop_in, donation])
+        db.session.commit()
+
+        payments = [
+            Payment(amount=25, student_id=student.id, sliding_scale_option_id=drop_in.id, date=datetime(2025, 3, 1, 9)),
+            Payment(amount=30.5, student_id=student.id, sliding_scale_option_id=drop_in.id, date=datetime(2025, 3, 1, 18)),
+            Payment(amount=50, student_id=student.id, sliding_scale_option_id=donation.id, date=datetime(2025, 3, 2, 12)),
+            Payment(amount=35, student_id=student.id, sliding_scale_option_id=drop_in.id, date=datetime(2025, 3, 3, 12)),
+        ]
+        pending = Payment(amount=99, student_id=student.id, sliding_scale_option_id=drop_in.id, date=datetime(2025, 3, 1, 12))
+        db.session.add_all(payments + [pending])
+        db.session.commit()
+
+        for payment in payments:
+            assert PaymentService.complete_payment(payment.id)
+        assert not PaymentService.complete_payment(payments[0].id)
+
+        assert service.get_report('day') == [
+            {'day': '2025-03-01', 'payment_count': 2, 'amount_total': 55.5},
+            {'day': '2025-03-02', 'payment_count': 1, 'amount_total': 50.0},
+            {'day': '2025-03-03', 'payment_count': 1, 'amount_total': 35.0},
+        ]
+        print("✅ Daily totals updated as payments completed (and only once)")
+
+        assert service.get_report('category', start_date=date(2025, 3, 1), end_date=date(2025, 3, 2)) == [
+            {'category': 'donation', 'payment_count': 1, 'amount_total': 50.0},
+            {'category': 'drop-in', 'payment_count': 2, 'amount_total': 55.5},
+        ]
+        by_option = service.get_report('option', category='drop-in')
+        assert [(row['tier_name'], row['payment_count'], row['amount_total']) for row in by_option] == [('Sliding Scale: Moderate', 3, 90.5)]
+        print("✅ Range, category and tier reports read the rollups")
+
+        incremental = sorted((r.day, r.sliding_scale_option_id, r.category, r.payment_count, r.amount_total) for r in RevenueRollup.query)
+        assert service.rebuild() == 3
+        rebuilt = sorted((r.day, r.sliding_scale_option_id, r.category, r.payment_count, r.amount_total) for r in RevenueRollup.query)
+        assert rebuilt == incremental
+        print("✅ Rebuild matches the incremental rollups")
+
+        try:
+            service.get_report('month')
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+
+
+if __name__ == "__main__":
+    test_revenue_rollups_follow_completed_payments()
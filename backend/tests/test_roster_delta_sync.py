@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test script for roster delta-sync cursors
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db, Staff, Student, StudioClass, ClassInstance, ClassEnrollment
+from db_helpers import create_test_app
+from services.attendance_service import AttendanceService
+from services.staff_authorization_service import StaffAuthorizationService
+from datetime import datetime, timedelta
+
+
+def test_roster_delta_sync():
+    """Polling with a cursor returns only enrollments changed since that cursor"""
+    app = create_test_app()
+    StaffAuthorizationService.clear()
+
+    with app.app_context():
+        instructor = Staff(clerk_user_id='delta_instructor', email='instructor@example.com', name='Instructor', role='staff')
+        db.session.add(instructor)
+        db.session.commit()
+
+        start_time = datetime.utcnow() - timedelta(hours=2)
+        studio_class = StudioClass(class_name='Check-in Class', start_time=start_time, duration=60, instructor_id=instructor.id, max_capacity=10)
+        db.session.add(studio_class)
+        db.session.commit()
+
+        instance = ClassInstance(
+            instance_id=f"{studio_class.id}_{start_time.strftime('%Y%m%d%H%M')}",
+            class_id=studio_class.id,
+            start_time=start_time,
+            end_time=start_time + timedelta(hours=1),
+            max_capacity=10
+        )
+        db.session.add(instance)
+        enrollments = []
+        for i in range(3):
+            student = Student(clerk_user_id=f'delta_student_{i}', email=f'student{i}@example.com', name=f'Student {i}', role='student')
+            db.session.add(student)
+            db.session.flush()
+            enrollment = ClassEnrollment(student_id=student.id, instance_id=instance.instance_id, status='enrolled')
+            db.session.add(enrollment)
+            enrollments.append(enrollment)
+        db.session.commit()
+
+        service = AttendanceService()
+        roster = service.get_class_roster(instance.instance_id, instructor.id)
+        assert roster['total_enrolled'] == 3
+        cursor = roster['cursor']
+        assert cursor > 0
+
+        delta = service.get_class_roster(instance.instance_id, instructor.id, since=cursor)
+        assert delta['changes'] == [] and delta['cursor'] == cursor
+        print("✅ Unchanged roster returns an empty delta")
+
+        service.mark_student_attendance(enrollments[0].id, 'attended', instructor.id)
+        enrollments[1].status = 'cancelled'
+        enrollments[1].cancelled_at = datetime.utcnow()
+        db.session.commit()
+
+        delta = service.get_class_roster(instance.instance_id, instructor.id, since=cursor)
+        assert {(c['enrollment_id'], c['status']) for c in delta['changes']} == {
+            (enrollments[0].id, 'attended'),
+            (enrollments[1].id, 'cancelled'),
+        }
+        assert delta['cursor'] > cursor
+        cursor = delta['cursor']
+        print("✅ Attendance and cancellations show up in the delta")
+
+        service.mark_bulk_attendance(instance.instance_id, [{'enrollment_id': enrollments[2].id, 'status': 'missed'}], instructor.id)
+        delta = service.get_class_roster(instance.instance_id, instructor.id, since=cursor)
+        assert [(c['enrollment_id'], c['status']) for c in delta['changes']] == [(enrollments[2].id, 'missed')]
+        print("✅ Bulk updates advance the change sequence")
+
+
+if __name__ == "__main__":
+    test_roster_delta_sync()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Test script for the SQLite engine profile and maintenance PRAGMAs
+"""
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import text
+from models import db, SlidingScaleOption
+from services import sqlite_tuning
+from services.sqlite_tuning import SQLITE_PROFILES, apply_sqlite_pragmas, sqlite_pragmas_from_env
+
+
+def create_test_app(profile):
+    """Create an app bound to a throwaway SQLite database using the given profile
+
+    Overrides db_helpers.create_test_app: these tests need SQLite whatever TEST_DATABASE_URL says.
+    """
+    app = Flask(__name__)
+    db_path = os.path.join(tempfile.mkdtemp(), 'test.sqlite3')
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        apply_sqlite_pragmas(db.engine, SQLITE_PROFILES[profile])
+        db.create_all()
+    return app
+
+
+def pragma(name):
+    return db.session.execute(text(f"PRAGMA {name}")).scalar()
+
+
+def test_sqlite_profile_pragmas():
+    """Every pooled connection gets the tuned PRAGMAs; the default profile leaves them alone"""
+    app = create_test_app('tuned')
+    with app.app_context():
+        assert pragma('journal_mode') == 'wal'
+        assert pragma('synchronous') == 1  # NORMAL
+        assert pragma('busy_timeout') == 5000
+        assert pragma('cache_size') == -65536
+        assert pragma('temp_store') == 2  # MEMORY
+        print("✅ Tuned profile applied on connect")
+
+    app = create_test_app('default')
+    with app.app_context():
+        assert pragma('journal_mode') == 'delete'
+        assert pragma('synchronous') == 2  # FULL
+        print("✅ Default profile keeps driver defaults")
+
+    saved = {name: os.environ.pop(name, None) for name in ('SQLITE_PROFILE', 'SQLITE_BUSY_TIMEOUT_MS')}
+    try:
+        os.environ['SQLITE_BUSY_TIMEOUT_MS'] = '250'
+        assert sqlite_pragmas_from_env()['busy_timeout'] == '250'
+        os.environ['SQLITE_PROFILE'] = 'fast'
+        try:
+            sqlite_pragmas_from_env()
+            assert False, "unknown profile accepted"
+        except ValueError:
+            pass
+        print("✅ Environment overrides and profile validation")
+    finally:
+        for name, value in saved.items():
+            os.environ.pop(name, None)
+            if value is not None:
+                os.environ[name] = value
+
+
+def test_sqlite_maintenance():
+    """optimize, ANALYZE and checkpoints run against the live database"""
+    app = create_test_app('tuned')
+    with app.app_context():
+        db.session.add_all([
+            SlidingScaleOption(tier_name=f'Tier {i}', price_min=10, price_max=20, category='drop-in')
+            for i in range(50)
+        ])
+        db.session.commit()
+        db.session.close()
+
+        sqlite_tuning.optimize(db.engine)
+        sqlite_tuning.analyze(db.engine)
+        with db.engine.connect() as connection:
+            assert connection.execute(text("SELECT count(*) FROM sqlite_stat1")).scalar() > 0
+        print("✅ ANALYZE wrote planner statistics")
+
+        busy, log_frames, checkpointed = sqlite_tuning.checkpoint(db.engine, 'TRUNCATE')
+        assert busy == 0 and log_frames == checkpointed == 0  # WAL folded back and reset
+        try:
+            sqlite_tuning.checkpoint(db.engine, 'NOW')
+            assert False, "unknown checkpoint mode accepted"
+        except ValueError:
+            pass
+        print("✅ WAL checkpoint truncates the log")
+
+
+if __name__ == "__main__":
+    test_sqlite_profile_pragmas()
+    test_sqlite_maintenance()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test script for the cached staff authorization and joined roster loading
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from models import db, Staff, Student, StudioClass, ClassInstance, ClassEnrollment
+from db_helpers import create_test_app
+from services.attendance_service import AttendanceService
+from services.class_service import ClassService
+from services.staff_authorization_service import StaffAuthorizationService
+from datetime import datetime, timedelta
+
+
+def test_staff_authorization_cache():
+    """Roster access follows assignment changes and loads students in one query"""
+    app = create_test_app()
+    StaffAuthorizationService.clear()
+
+    with app.app_context():
+        instructor = Staff(clerk_user_id='auth_instructor', email='instructor@example.com', name='Instructor', role='staff')
+        helper = Staff(clerk_user_id='auth_helper', email='helper@example.com', name='Helper', role='staff')
+        db.session.add_all([instructor, helper])
+        db.session.commit()
+
+        start_time = datetime.utcnow() + timedelta(days=1)
+        studio_class = StudioClass(class_name='Roster Class', start_time=start_time, duration=60, instructor_id=instructor.id, max_capacity=10)
+        db.session.add(studio_class)
+        db.session.commit()
+
+        instance = ClassInstance(
+            instance_id=f"{studio_class.id}_{start_time.strftime('%Y%m%d%H%M')}",
+            class_id=studio_class.id,
+            start_time=start_time,
+            end_time=start_time + timedelta(hours=1),
+            max_capacity=10
+        )
+        db.session.add(instance)
+        for i in range(4):
+            student = Student(clerk_user_id=f'auth_student_{i}', email=f'student{i}@example.com', name=f'Student {i}', role='student')
+            db.session.add(student)
+            db.session.flush()
+            db.session.add(ClassEnrollment(student_id=student.id, instance_id=instance.instance_id, status='enrolled'))
+        db.session.commit()
+
+        attendance_service = AttendanceService()
+        class_service = ClassService()
+
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        attendance_service.get_class_roster(instance.instance_id, instructor.id)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        roster = attendance_service.get_class_roster(instance.instance_id, instructor.id)
+        event.remove(db.engine, 'before_cursor_execute', listener)
+        assert roster['total_enrolled'] == 4
+        assert [s['name'] for s in roster['students']] == [f'Student {i}' for i in range(4)]
+        assert len(statements) <= 3, statements
+        print(f"✅ Roster loaded with {len(statements)} queries")
+
+        try:
+            attendance_service.get_class_roster(instance.instance_id, helper.id)
+            assert False, "Unassigned staff should not see the roster"
+        except ValueError:
+            print("✅ Unassigned staff rejected")
+
+        class_service.add_staff_to_class(studio_class.id, helper.id)
+        assert attendance_service.get_class_roster(instance.instance_id, helper.id)['total_enrolled'] == 4
+        print("✅ Assignment invalidates the cached class ids")
+
+        class_service.remove_staff_from_class(studio_class.id, helper.id)
+        assert not StaffAuthorizationService().is_authorized(helper.id, studio_class.id)
+        print("✅ Removal invalidates the cached class ids")
+
+        class_service.change_class_instructor(studio_class.id, helper.id)
+        assert StaffAuthorizationService().is_authorized(helper.id, studio_class.id)
+        assert not StaffAuthorizationService().is_authorized(instructor.id, studio_class.id)
+        print("✅ Instructor change invalidates both instructors")
+
+    StaffAuthorizationService.clear()
+
+
+if __name__ == "__main__":
+    test_staff_authorization_cache()
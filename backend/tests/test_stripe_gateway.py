@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Test script for the Stripe gateway against the in-process fake Stripe server
+"""
+
+import sys
+import os
+import json
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import stripe
+from models import db, Staff, Student, StudioClass, ClassInstance, ClassEnrollment, SlidingScaleOption, Payment
+from db_helpers import create_test_app
+from fake_stripe import FakeStripe
+from services.circuit_breaker import CircuitBreaker
+from services.payment_service import PaymentService
+from services.stripe_gateway import StripeGateway, StripeUnavailableError, set_stripe_gateway
+from services.webhook_queue_service import WebhookQueueService
+from datetime import datetime, timedelta
+
+CHECKOUT_PARAMS = {
+    'mode': 'payment',
+    'success_url': 'http://localhost/success',
+    'cancel_url': 'http://localhost/cancel',
+    'line_items': [{'price_data': {'currency': 'usd', 'unit_amount': 1500, 'product_data': {'name': 'Drop-in'}}, 'quantity': 1}],
+    'metadata': {'payment_id': 1},
+}
+
+
+def test_gateway_reuses_connections_and_retries_idempotently():
+    """Calls share keep-alive connections and a retried create yields one session"""
+    with FakeStripe() as fake:
+        gateway = StripeGateway('sk_test_fake', api_base=fake.url, backoff=0.01)
+
+        session = gateway.create_checkout_session(CHECKOUT_PARAMS)
+        assert session.metadata['payment_id'] == '1' and session.amount_total == 1500
+        for _ in range(10):
+            assert gateway.retrieve_checkout_session(session.id).payment_status == 'unpaid'
+        assert len(fake.connections) == 1
+        print("✅ Eleven calls over one keep-alive connection")
+
+        # The first attempt is stored by the fake but answered with a 500
+        calls = []
+        original = gateway.client.v1.checkout.sessions.create
+        def flaky_create(params=None, options=None):
+            calls.append(options['idempotency_key'])
+            result = original(params=params, options=options)
+            if len(calls) == 1:
+                raise stripe.APIError("Injected failure", http_status=500)
+            return result
+        gateway.client.v1.checkout.sessions.create = flaky_create
+        retried = gateway.create_checkout_session(CHECKOUT_PARAMS)
+        assert len(calls) == 2 and calls[0] == calls[1]
+        assert len(fake.sessions) == 2 and retried.id in fake.sessions
+        print("✅ Retry reused the idempotency key")
+
+        try:
+            gateway.retrieve_checkout_session('cs_missing')
+            assert False, "expected InvalidRequestError"
+        except stripe.InvalidRequestError:
+            pass
+        assert gateway.breaker.state == CircuitBreaker.CLOSED
+        print("✅ Client errors are raised without retries")
+
+
+def test_circuit_breaker_and_deadline():
+    """Repeated failures open the circuit and slow responses stop at the deadline"""
+    with FakeStripe(failure_rate=1.0) as fake:
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.3)
+        gateway = StripeGateway('sk_test_fake', api_base=fake.url, backoff=0.01, max_retries=2, breaker=breaker)
+
+        for expected in ("failed after 3 attempts", "skipped"):
+            try:
+                gateway.retrieve_checkout_session('cs_any')
+                assert False, "expected StripeUnavailableError"
+            except StripeUnavailableError as e:
+                assert expected in str(e)
+        assert fake.requests_served == 3 and breaker.state == CircuitBreaker.OPEN
+        print("✅ Circuit opened after three failures and failed fast")
+
+        fake.failure_rate = 0.0
+        time.sleep(0.35)
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        session = gateway.create_checkout_session(CHECKOUT_PARAMS)
+        assert session.id and breaker.state == CircuitBreaker.CLOSED
+        print("✅ Trial call closed the circuit")
+
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure()
+        time.sleep(0.35)
+
+        def broken_request():
+            raise KeyError('unexpected')
+        try:
+            gateway._call('broken_request', broken_request)
+            assert False, "expected KeyError"
+        except KeyError:
+            pass
+        assert breaker.state == CircuitBreaker.OPEN
+        time.sleep(0.35)
+        session = gateway.create_checkout_session(CHECKOUT_PARAMS)
+        assert breaker.state == CircuitBreaker.CLOSED
+        print("✅ Unexpected error in the trial call re-opened the circuit")
+
+        fake.latency = 1.0
+        started = time.monotonic()
+        try:
+            gateway.retrieve_checkout_session(session.id, deadline=0.3)
+            assert False, "expected StripeUnavailableError"
+        except StripeUnavailableError:
+            pass
+        assert time.monotonic() - started < 0.8
+        print("✅ Slow call stopped at its deadline")
+
+
+def test_checkout_webhook_enrollment_flow():
+    """A drop-in checkout paid on the fake ends in an enrollment once the worker runs"""
+    app = create_test_app()
+    queue = WebhookQueueService()
+
+    def receive_webhook(payload, signature):
+        event = stripe.Webhook.construct_event(payload, signature, 'whsec_fake')
+        queue.enqueue(event['id'], event['type'], payload.decode('utf-8'))
+
+    with FakeStripe(on_event=receive_webhook) as fake, app.app_context():
+        set_stripe_gateway(StripeGateway('sk_test_fake', api_base=fake.url))
+        try:
+            instructor = Staff(clerk_user_id='gateway_instructor', email='instructor@example.com', name='Instructor', role='staff')
+            student = Student(clerk_user_id='gateway_student', email='student@example.com', role='student')
+            db.session.add_all([instructor, student])
+            db.session.flush()
+            start = datetime.utcnow() + timedelta(days=1)
+            studio_class = StudioClass(class_name='Heels', start_time=start, duration=60, instructor_id=instructor.id, max_capacity=5, recurrence_pattern='one-time')
+            db.session.add(studio_class)
+            db.session.flush()
+            instance = ClassInstance(instance_id=f'{studio_class.id}_gateway', class_id=studio_class.id, start_time=start, end_time=start + timedelta(hours=1), max_capacity=5)
+            option = SlidingScaleOption(tier_name='Drop-in', price_min=10, price_max=20, category='drop-in')
+            db.session.add_all([instance, option])
+            db.session.commit()
+
+            payment = PaymentService.create_payment(student.id, 15, option.id, instance.instance_id, 'Heels')
+            session = PaymentService.create_stripe_checkout_session(payment.id, 'http://localhost/success', 'http://localhost/cancel')
+            assert fake.sessions[session.id]['amount_total'] == 1500
+            fake.pay(session.id)
+
+            assert queue.process_pending()['processed'] == 1
+            assert db.session.get(Payment, payment.id).status == 'completed'
+            assert ClassEnrollment.query.filter_by(student_id=student.id, instance_id=instance.instance_id, payment_id=payment.id).count() == 1
+            print("✅ Checkout, webhook and enrollment ran end to end offline")
+        finally:
+            set_stripe_gateway(None)
+
+
+if __name__ == "__main__":
+    test_gateway_reuses_connections_and_retries_idempotently()
+    test_circuit_breaker_and_deadline()
+    test_checkout_webhook_enrollment_flow()
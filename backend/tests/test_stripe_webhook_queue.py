@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Test script for the durable Stripe webhook queue
+"""
+
+import sys
+import os
+import json
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db, Staff, Student, StudioClass, ClassInstance, ClassEnrollment, SlidingScaleOption, Payment, Membership, StripeWebhookEvent
+from db_helpers import create_test_app
+from services.webhook_queue_service import WebhookQueueService
+from services.user_service import UserService
+from services.membership_service import MembershipService
+from datetime import datetime, timedelta
+
+
+def checkout_completed(event_id, payment_id):
+    return json.dumps({
+        'id': event_id,
+        'type': 'checkout.session.completed',
+        'data': {'object': {'id': f'cs_{event_id}', 'metadata': {'payment_id': str(payment_id)}}}
+    })
+
+
+def test_enqueue_deduplicates_and_replay_is_idempotent():
+    """A redelivered event is stored once and replaying it does not activate a second membership"""
+    app = create_test_app()
+    service = WebhookQueueService()
+
+    with app.app_context():
+        student = Student(clerk_user_id='webhook_student', email='student@example.com', role='student')
+        option = SlidingScaleOption(tier_name='Monthly Membership', price_min=50, price_max=80, category='membership')
+        db.session.add_all([student, option])
+        db.session.commit()
+        payment = Payment(amount=50, student_id=student.id, sliding_scale_option_id=option.id, class_name='Monthly Membership')
+        db.session.add(payment)
+        db.session.commit()
+
+        assert service.enqueue('evt_membership', 'checkout.session.completed', checkout_completed('evt_membership', payment.id))
+        assert not service.enqueue('evt_membership', 'checkout.session.completed', checkout_completed('evt_membership', payment.id))
+        assert StripeWebhookEvent.query.count() == 1
+        assert db.session.get(Payment, payment.id).status == 'pending'
+        print("✅ Redelivered event queued once and nothing applied yet")
+
+        assert service.process_pending() == {'processed': 1, 'retrying': 0, 'failed': 0}
+        assert db.session.get(Payment, payment.id).status == 'completed'
+        assert db.session.get(Student, student.id).membership_id is not None
+        assert db.session.get(StripeWebhookEvent, 'evt_membership').status == 'processed'
+        print("✅ Worker applied the event")
+
+        assert service.replay(['evt_membership']) == 1
+        assert service.process_pending() == {'processed': 1, 'retrying': 0, 'failed': 0}
+        assert Membership.query.count() == 1
+        print("✅ Replay did not apply the payment twice")
+
+        UserService.invalidate_identity('webhook_student')
+        MembershipService.invalidate_membership('webhook_student')
+
+
+def test_failed_events_back_off_and_can_be_replayed():
+    """Handler errors are retried later, give up after MAX_ATTEMPTS and replay requeues them"""
+    app = create_test_app()
+    calls = []
+
+    def failing_handler(event):
+        calls.append(event['id'])
+        raise RuntimeError("database is locked")
+
+    service = WebhookQueueService(handler=failing_handler)
+
+    with app.app_context():
+        service.enqueue('evt_flaky', 'checkout.session.completed', json.dumps({'id': 'evt_flaky'}))
+
+        assert service.process_pending() == {'processed': 0, 'retrying': 1, 'failed': 0}
+        queued = db.session.get(StripeWebhookEvent, 'evt_flaky')
+        assert queued.status == 'pending' and queued.attempts == 1
+        assert queued.last_error == "database is locked"
+        assert service.process_pending() == {'processed': 0, 'retrying': 0, 'failed': 0}
+        print("✅ Failed event waits before its retry")
+
+        later = datetime.utcnow()
+        for attempt in range(2, WebhookQueueService.MAX_ATTEMPTS + 1):
+            later += timedelta(hours=1)
+            service.process_pending(now=later)
+        db.session.expire_all()
+        assert db.session.get(StripeWebhookEvent, 'evt_flaky').status == 'failed'
+        assert len(calls) == WebhookQueueService.MAX_ATTEMPTS
+        assert service.process_pending(now=later + timedelta(days=1)) == {'processed': 0, 'retrying': 0, 'failed': 0}
+        print("✅ Event marked failed after MAX_ATTEMPTS")
+
+        service.handler = lambda event: True
+        assert service.replay() == 1
+        assert service.process_pending() == {'processed': 1, 'retrying': 0, 'failed': 0}
+        db.session.expire_all()
+        assert db.session.get(StripeWebhookEvent, 'evt_flaky').last_error is None
+        print("✅ Failed events replayed")
+
+
+def test_failed_booking_leaves_payment_pending_for_retry():
+    """A drop-in payment whose booking fails stays pending, so the queued event can retry it"""
+    app = create_test_app()
+    service = WebhookQueueService()
+
+    with app.app_context():
+        instructor = Staff(clerk_user_id='webhook_instructor', email='instructor@example.com', name='Instructor', role='staff')
+        student = Student(clerk_user_id='webhook_dropin', email='dropin@example.com', role='student')
+        option = SlidingScaleOption(tier_name='Drop-in', price_min=10, price_max=20, category='drop-in')
+        db.session.add_all([instructor, student, option])
+        db.session.flush()
+        start = datetime.utcnow() + timedelta(days=1)
+        studio_class = StudioClass(class_name='Floorwork', start_time=start, duration=60, instructor_id=instructor.id, max_capacity=0, recurrence_pattern='one-time')
+        db.session.add(studio_class)
+        db.session.flush()
+        instance = ClassInstance(instance_id=f'{studio_class.id}_webhook', class_id=studio_class.id, start_time=start, end_time=start + timedelta(hours=1), max_capacity=0)
+        db.session.add(instance)
+        db.session.flush()
+        payment = Payment(amount=10, student_id=student.id, sliding_scale_option_id=option.id, instance_id=instance.instance_id, class_name='Floorwork')
+        db.session.add(payment)
+        db.session.commit()
+
+        service.enqueue('evt_full', 'checkout.session.completed', checkout_completed('evt_full', payment.id))
+        assert service.process_pending() == {'processed': 0, 'retrying': 1, 'failed': 0}
+        db.session.expire_all()
+        assert db.session.get(Payment, payment.id).status == 'pending'
+        assert ClassEnrollment.query.count() == 0
+        print("✅ Failed booking rolled back the payment completion")
+
+        instance.max_capacity = 10
+        db.session.commit()
+        assert service.process_pending(now=datetime.utcnow() + timedelta(hours=1)) == {'processed': 1, 'retrying': 0, 'failed': 0}
+        db.session.expire_all()
+        assert db.session.get(Payment, payment.id).status == 'completed'
+        assert ClassEnrollment.query.filter_by(student_id=student.id, payment_id=payment.id).count() == 1
+        print("✅ Retry completed the payment and booked the class")
+
+
+if __name__ == "__main__":
+    test_enqueue_deduplicates_and_replay_is_idempotent()
+    test_failed_events_back_off_and_can_be_replayed()
+    test_failed_booking_leaves_payment_pending_for_retry()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test script for streaming bulk user import
+"""
+
+import sys
+import os
+import io
+import json
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db, User, Student
+from db_helpers import create_test_app
+from services.user_import_service import UserImportService, read_rows
+
+
+def test_user_import():
+    """Rows are inserted in chunks, conflicts are skipped or updated and bad rows are reported"""
+    app = create_test_app()
+    service = UserImportService()
+
+    with app.app_context():
+        db.session.add(Student(clerk_user_id='import_existing', email='old@example.com', name='Old Name', role='student'))
+        db.session.commit()
+
+        lines = ["clerk_user_id,email,name,role"]
+        lines += [f"import_{i},user{i}@example.com,User {i},{'staff' if i % 10 == 0 else 'student'}" for i in range(25)]
+        lines += ["import_existing,new@example.com,New Name,student", "import_bad,,Bad,teacher", "import_3,dup@example.com,Dup,student"]
+        csv_data = io.BytesIO("\n".join(lines).encode())
+
+        summary = service.import_users(read_rows(csv_data, 'csv'), chunk_size=10)
+        assert summary['processed'] == 28
+        assert summary['inserted'] == 25
+        assert summary['skipped'] == 2  # existing user and the second import_3 (already inserted by an earlier chunk)
+        assert [error['row'] for error in summary['errors']] == [27]
+        assert User.query.filter_by(clerk_user_id='import_0').first().discriminator == 'staff'
+        assert User.query.filter_by(clerk_user_id='import_existing').first().name == 'Old Name'
+        print("✅ CSV imported in chunks with conflicts skipped")
+
+        ndjson_data = io.BytesIO("\n".join([
+            json.dumps({'clerk_user_id': 'import_existing', 'email': 'new@example.com', 'name': 'New Name', 'role': 'student'}),
+            "{not json",
+            json.dumps({'clerk_user_id': 'import_ndjson', 'role': 'management'}),
+        ]).encode())
+        summary = service.import_users(read_rows(ndjson_data, 'ndjson'), on_conflict='update')
+        assert (summary['inserted'], summary['updated'], summary['failed']) == (1, 1, 1)
+        db.session.expire_all()
+        assert User.query.filter_by(clerk_user_id='import_existing').first().name == 'New Name'
+        print("✅ NDJSON import updates existing users on request")
+
+        partial_data = io.BytesIO("\n".join([
+            "clerk_user_id,email,name,role",
+            "import_existing,,Partial Name,student",
+            "import_1,user1@example.com,User 1,student",
+        ]).encode())
+        summary = service.import_users(read_rows(partial_data, 'csv'), on_conflict='update')
+        assert (summary['updated'], summary['skipped']) == (1, 1)
+        db.session.expire_all()
+        existing = User.query.filter_by(clerk_user_id='import_existing').first()
+        assert (existing.email, existing.name) == ('new@example.com', 'Partial Name')
+        print("✅ Partial rows keep stored fields and unchanged rows are not counted as updates")
+
+
+if __name__ == "__main__":
+    test_user_import()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Test script for keyset-paginated, projected user listing
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from models import db, Student, Staff
+from db_helpers import create_test_app
+from services.user_service import UserService
+from dtos.user_dto import UserDTO
+
+
+def test_user_pagination():
+    """Pages follow the id cursor, filters apply and projections load only requested columns"""
+    app = create_test_app()
+    service = UserService()
+
+    with app.app_context():
+        db.session.add_all([Staff(clerk_user_id=f'page_staff_{i}', email=f'staff{i}@example.com', name=f'Staff {i}', role='staff') for i in range(2)])
+        db.session.add_all([Student(clerk_user_id=f'page_student_{i}', email=f'student{i}@example.com', name=f'Student {i}', role='student') for i in range(5)])
+        db.session.commit()
+
+        seen = []
+        cursor = None
+        while True:
+            page = service.get_users_page(cursor=cursor, limit=3)
+            seen.extend(user.id for user in page['users'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        assert seen == sorted(seen) and len(seen) == 7
+        print("✅ Cursor walks every user exactly once")
+
+        page = service.get_users_page(limit=10, user_type='student')
+        assert [user.discriminator for user in page['users']] == ['student'] * 5
+        print("✅ Type filter applied")
+
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        db.session.expire_all()
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        page = service.get_users_page(limit=10, role='staff', fields=['id', 'name'])
+        projected = [UserDTO.project(user, ['id', 'name']) for user in page['users']]
+        event.remove(db.engine, 'before_cursor_execute', listener)
+        assert projected == [{'id': user.id, 'name': f'Staff {i}'} for i, user in enumerate(page['users'])]
+        assert len(statements) == 1 and 'users.email' not in statements[0], statements
+        print("✅ Projection selects only the requested columns")
+
+        try:
+            service.get_users_page(limit=0)
+            assert False, "limit=0 should be rejected"
+        except ValueError:
+            print("✅ Invalid limit rejected")
+
+
+if __name__ == "__main__":
+    test_user_pagination()
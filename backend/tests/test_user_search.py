@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Test script for FTS5-backed instructor and user search
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db, Staff, Student
+from db_helpers import create_test_app
+from services.user_service import UserService
+
+
+def test_user_search():
+    """Prefix search ranks name matches first and follows inserts, updates and deletes"""
+    app = create_test_app()
+    service = UserService()
+
+    with app.app_context():
+        jane = Staff(clerk_user_id='search_jane', email='jane.doe@example.com', name='Jane Doe', role='staff')
+        dojo = Staff(clerk_user_id='search_dojo', email='janedojo@example.com', name='Mary Smith', role='staff')
+        janet = Student(clerk_user_id='search_janet', email='janet@example.com', name='Janet Lee', role='student')
+        db.session.add_all([jane, dojo, janet])
+        db.session.commit()
+
+        assert [u.name for u in service.search_instructors('jan')] == ['Jane Doe', 'Mary Smith']
+        print("✅ Name prefix matches rank before email matches")
+
+        assert [u.name for u in service.search_instructors('jane do')] == ['Jane Doe']
+        assert [u.name for u in service.search_users('jan', user_type='student')] == ['Janet Lee']
+        assert len(service.search_users('jan', limit=1)) == 1
+        print("✅ Multi-word queries, type filter and limit applied")
+
+        dojo.name = 'Mary Janeway'
+        db.session.commit()
+        assert 'Mary Janeway' in [u.name for u in service.search_instructors('janeway')]
+        db.session.delete(jane)
+        db.session.commit()
+        assert 'Jane Doe' not in [u.name for u in service.search_instructors('jane')]
+        print("✅ Search index follows updates and deletes")
+
+        assert len(service.search_instructors('')) == 1
+        assert service.search_instructors('%%') == []
+        print("✅ Empty and punctuation-only queries handled")
+
+
+if __name__ == "__main__":
+    test_user_search()
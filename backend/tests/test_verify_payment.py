@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test script for verify-payment answering from the database
+"""
+
+import sys
+import os
+import threading
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db, Staff, Student, StudioClass, ClassInstance, ClassEnrollment, SlidingScaleOption, Payment
+from db_helpers import USING_SQLITE, create_test_app
+from fake_stripe import FakeStripe
+from services.payment_service import PaymentService
+from services.stripe_gateway import StripeGateway, set_stripe_gateway
+from datetime import datetime, timedelta
+
+# Concurrent verify-payment threads share one SQLite file; wait for its write lock
+ENGINE_OPTIONS = {'connect_args': {'timeout': 30}} if USING_SQLITE else None
+
+
+def seed_drop_in(students):
+    instructor = Staff(clerk_user_id='verify_instructor', email='instructor@example.com', name='Instructor', role='staff')
+    db.session.add(instructor)
+    db.session.flush()
+    start = datetime.utcnow() + timedelta(days=1)
+    studio_class = StudioClass(class_name='Floorwork', start_time=start, duration=60, instructor_id=instructor.id, max_capacity=10, recurrence_pattern='one-time')
+    db.session.add(studio_class)
+    db.session.flush()
+    instance = ClassInstance(instance_id=f'{studio_class.id}_verify', class_id=studio_class.id, start_time=start, end_time=start + timedelta(hours=1), max_capacity=10)
+    option = SlidingScaleOption(tier_name='Drop-in', price_min=10, price_max=20, category='drop-in')
+    db.session.add_all([instance, option] + [
+        Student(clerk_user_id=f'verify_student_{i}', email=f'student{i}@example.com', role='student') for i in range(students)
+    ])
+    db.session.commit()
+    return [s.id for s in Student.query.order_by(Student.id)], instance.instance_id, option.id
+
+
+def checkout(student_id, instance_id, option_id):
+    payment = PaymentService.create_payment(student_id, 10, option_id, instance_id, 'Floorwork')
+    session = PaymentService.create_stripe_checkout_session(payment.id, 'http://localhost/success', 'http://localhost/cancel')
+    return payment.id, session.id
+
+
+def test_verify_payment_short_circuits_completed_payments():
+    """Stripe is only asked while the payment is pending"""
+    app = create_test_app(ENGINE_OPTIONS)
+
+    with FakeStripe() as fake, app.app_context():
+        set_stripe_gateway(StripeGateway('sk_test_fake', api_base=fake.url))
+        try:
+            student_ids, instance_id, option_id = seed_drop_in(1)
+            payment_id, session_id = checkout(student_ids[0], instance_id, option_id)
+            assert PaymentService.get_payment_by_session_id(session_id).id == payment_id
+
+            calls = fake.requests_served
+            assert PaymentService.verify_payment(session_id) is None
+            assert fake.requests_served == calls + 1
+            print("✅ Unpaid session checked with Stripe")
+
+            fake.pay(session_id)
+            payment = PaymentService.verify_payment(session_id)
+            assert payment.status == 'completed'
+            assert ClassEnrollment.query.filter_by(payment_id=payment_id).count() == 1
+            calls = fake.requests_served
+            for _ in range(3):
+                assert PaymentService.verify_payment(session_id).id == payment_id
+            assert fake.requests_served == calls
+            assert ClassEnrollment.query.filter_by(payment_id=payment_id).count() == 1
+            print("✅ Completed payment answered from the database")
+
+            event = {'type': 'checkout.session.completed', 'data': {'object': {'id': session_id, 'metadata': {'payment_id': str(payment_id)}}}}
+            assert PaymentService.handle_webhook_event(event)
+            assert ClassEnrollment.query.filter_by(payment_id=payment_id).count() == 1
+            print("✅ Late webhook did not book the class again")
+        finally:
+            set_stripe_gateway(None)
+
+
+def test_concurrent_verifications_share_one_stripe_call():
+    """Simultaneous redirects for one session make a single Stripe call and one enrollment"""
+    app = create_test_app(ENGINE_OPTIONS)
+
+    with FakeStripe(latency=0.2) as fake:
+        set_stripe_gateway(StripeGateway('sk_test_fake', api_base=fake.url))
+        try:
+            with app.app_context():
+                student_ids, instance_id, option_id = seed_drop_in(1)
+                payment_id, session_id = checkout(student_ids[0], instance_id, option_id)
+            fake.pay(session_id)
+            calls = fake.requests_served
+
+            results, errors = [], []
+            def verify():
+                with app.app_context():
+                    try:
+                        results.append(PaymentService.verify_payment(session_id).status)
+                    except Exception as e:
+                        errors.append(e)
+            threads = [threading.Thread(target=verify) for _ in range(6)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            assert not errors and results == ['completed'] * 6
+            assert fake.requests_served == calls + 1
+            with app.app_context():
+                assert ClassEnrollment.query.filter_by(payment_id=payment_id).count() == 1
+            print("✅ Six concurrent verifications made one Stripe call")
+        finally:
+            set_stripe_gateway(None)
+
+
+if __name__ == "__main__":
+    test_verify_payment_short_circuits_completed_payments()
+    test_concurrent_verifications_share_one_stripe_call()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Apply queued Stripe webhook events
+
+/webhook/stripe only verifies and stores events; this worker applies them (marking
+payments completed, booking classes, activating memberships) in a separate process.
+The database must be up to date (`flask --app app db upgrade`).
+
+Usage:
+    python webhook_worker.py                      # poll for queued events forever
+    python webhook_worker.py --once               # apply everything that is due and exit
+    python webhook_worker.py --replay evt_123     # queue specific events again, then apply them
+    python webhook_worker.py --replay-failed      # queue every failed event again, then apply them
+
+Settings (environment variables):
+    WEBHOOK_POLL_INTERVAL     seconds between polls when the queue is empty (default 2)
+"""
+
+import sys
+import os
+import time
+import argparse
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from services.webhook_queue_service import WebhookQueueService
+
+
+def drain(service):
+    """Apply due events until none are left; returns the number applied"""
+    total = 0
+    while True:
+        counts = service.process_pending()
+        applied = sum(counts.values())
+        if applied:
+            print(f"[webhook_worker] ✅ processed {counts['processed']}, retrying {counts['retrying']}, failed {counts['failed']}")
+        total += applied
+        if not applied:
+            return total
+
+
+def run_forever(service):
+    interval = float(os.getenv('WEBHOOK_POLL_INTERVAL', '2'))
+    print(f"[webhook_worker] 🕒 Polling for Stripe events every {interval}s")
+    while True:
+        try:
+            with app.app_context():
+                drain(service)
+        except Exception as e:
+            print(f"[webhook_worker] ❌ {e}")
+        time.sleep(interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply queued Stripe webhook events")
+    parser.add_argument('--once', action='store_true', help="apply everything that is due and exit")
+    parser.add_argument('--replay', nargs='+', metavar='EVENT_ID', help="queue these events again (implies --once)")
+    parser.add_argument('--replay-failed', action='store_true', help="queue all failed events again (implies --once)")
+    args = parser.parse_args()
+
+    service = WebhookQueueService()
+    with app.app_context():
+        if args.replay or args.replay_failed:
+            requeued = service.replay(args.replay)
+            print(f"[webhook_worker] 🔁 Queued {requeued} events again")
+        if args.once or args.replay or args.replay_failed:
+            drain(service)
+
+    if not (args.once or args.replay or args.replay_failed):
+        run_forever(service)